@@ -0,0 +1,308 @@
+import os
+import csv
+import json
+import glob
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from config import FFT_SIZE, FFT_WINDOW, FFT_OVERLAP, ANALYSIS_WORKERS, ANALYSIS_SEGMENTS, ANALYSIS_THUMBNAIL_SIZE
+from spectrum import SpectrumEngine
+from recording import recording_paths, open_recording, FORMAT_NAME, META_SUFFIX
+
+SUMMARY_FIELDS = ("file", "path", "channel", "duration_s", "samples", "sample_rate", "missed_samples", "min",
+                  "max", "mean", "rms", "peak", "crest_factor", "dominant_hz", "dominant_magnitude",
+                  "thumbnail")  # 汇总表的列
+
+
+def find_recordings(inputs):
+    """
+    展开命令行给出的记录：目录中所有记录的元数据文件、通配符和单个记录路径。
+
+    :param inputs: 路径、目录或通配符列表。
+    :return: 按名称排序、去重后的记录元数据文件路径列表。
+    """
+    from chunked_recording import CHUNKED_FORMAT_NAME
+
+    found = set()
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            candidates = glob.glob(os.path.join(pattern, '*' + META_SUFFIX))
+        else:
+            candidates = [recording_paths(path)[1] for path in (glob.glob(pattern) or [pattern])]
+        for meta_path in candidates:
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    format_name = json.load(f).get("format")
+            except (OSError, ValueError):
+                continue  # 不是记录的元数据（例如分析结果），或者文件不存在
+            if format_name in (FORMAT_NAME, CHUNKED_FORMAT_NAME):
+                found.add(os.path.abspath(meta_path))
+    return sorted(found)
+
+
+def analyze_recording(path, thumbnail_dir=None, fft_size=FFT_SIZE, window=FFT_WINDOW, overlap=FFT_OVERLAP,
+                      segments=ANALYSIS_SEGMENTS, thumbnail_size=ANALYSIS_THUMBNAIL_SIZE, thumbnail_name=None):
+    """
+    流式分析一个记录：平均频谱、主频、最小/最大值、均值、RMS、峰值和缩略图。
+
+    频谱使用与实时显示相同的 SpectrumEngine（Welch 模式）：每次读取 segments 个相互重叠的分段，
+    批量计算后按分段数累加功率，得到整个记录所有分段的平均频谱，相邻两次读取之间的分段连续、不重复。
+    统计量和缩略图的最小/最大值包络在同一次读取中累计，每个样本只参与一次，内存占用与记录长度无关。
+    可以在子进程中运行，返回值只包含小数组，便于在进程之间传递。
+
+    :param path: 记录的基本路径或任一记录文件路径。
+    :param thumbnail_dir: 缩略图输出目录，为 None 时不生成缩略图。
+    :param fft_size: FFT 长度。
+    :param window: 窗函数名称。
+    :param overlap: 分段重叠比例。
+    :param segments: 每次读取的分段数。
+    :param thumbnail_size: 缩略图尺寸 (宽, 高)，单位为像素。
+    :param thumbnail_name: 缩略图文件名（不含后缀），为 None 时使用记录名称。
+    :return: 结果字典，包括每个通道的统计量、平均幅度谱 spectrum（形状为 (频点数, 通道数)）和频率轴 freqs。
+    """
+    start_time = time.perf_counter()
+    reader = open_recording(path)
+    count, channels = len(reader), reader.channels
+    engines = [SpectrumEngine(fft_size, reader.sample_rate, window, "welch", segments, overlap) for _ in range(channels)]
+    hop = engines[0].hop_size
+    span = engines[0].samples_needed  # 每次读取 segments 个分段所需的样本数
+    power = np.zeros((engines[0].bin_count, channels))
+    segment_count = 0
+    minimum = np.full(channels, np.inf)
+    maximum = np.full(channels, -np.inf)
+    total = np.zeros(channels)
+    squares = np.zeros(channels)
+    width = thumbnail_size[0]
+    edges = np.linspace(0, count, width + 1).astype(np.intp)  # 缩略图每个像素列的样本范围，与 EnvelopeDecimator 相同
+    envelope_min = np.full((width, channels), np.inf)
+    envelope_max = np.full((width, channels), -np.inf)
+
+    position = 0
+    while position < count:
+        block = reader.read(position, span).reshape(-1, channels)
+        last = position + span >= count
+        fresh = block if last else block[:hop * segments]  # 下一次读取从 position + hop * segments 开始
+        wide = fresh.astype(np.float64)
+        minimum = np.minimum(minimum, fresh.min(axis=0))
+        maximum = np.maximum(maximum, fresh.max(axis=0))
+        total += wide.sum(axis=0)
+        squares += np.square(wide).sum(axis=0)
+        _accumulate_envelope(fresh, position, edges, envelope_min, envelope_max)
+        if len(block) >= fft_size or position == 0:
+            used = max(1, (len(block) - fft_size) // hop + 1)  # 本次计算的分段数，不足一个分段时补零算一个
+            for channel, engine in enumerate(engines):
+                power[:, channel] += np.square(engine.update(block[:, channel])) * used
+            segment_count += used
+        if last:
+            break
+        position += hop * segments
+
+    result = {
+        "file": os.path.splitext(os.path.basename(reader.data_path))[0],
+        "path": reader.data_path,
+        "sample_rate": reader.sample_rate,
+        "samples": count,
+        "channels": channels,
+        "duration_s": count / reader.sample_rate,
+        "missed_samples": sum(missed for _, missed in reader.gaps),
+        "freqs": engines[0].freqs,
+        "spectrum": np.sqrt(power / max(segment_count, 1)),
+        "segments": segment_count,
+        "channel_stats": [],
+        "thumbnail": None,
+    }
+    for channel, engine in enumerate(engines):
+        # 平均频谱写回引擎，用引擎的 peak() 查找主频（不含直流分量）
+        engine.magnitude[:] = result["spectrum"][:, channel]
+        dominant_hz, dominant_magnitude = engine.peak()
+        rms = float(np.sqrt(squares[channel] / count)) if count else 0.0
+        peak = float(max(abs(minimum[channel]), abs(maximum[channel]))) if count else 0.0
+        result["channel_stats"].append({
+            "min": float(minimum[channel]) if count else 0.0,
+            "max": float(maximum[channel]) if count else 0.0,
+            "mean": float(total[channel] / count) if count else 0.0,
+            "rms": rms,
+            "peak": peak,
+            "crest_factor": peak / rms if rms else None,
+            "dominant_hz": float(dominant_hz),
+            "dominant_magnitude": float(dominant_magnitude),
+        })
+    if thumbnail_dir is not None and count:
+        result["thumbnail"] = save_thumbnail(result, envelope_min, envelope_max, edges,
+                                             os.path.join(thumbnail_dir, (thumbnail_name or result["file"]) + '.png'),
+                                             thumbnail_size)
+    result["elapsed_s"] = time.perf_counter() - start_time
+    return result
+
+
+def _accumulate_envelope(samples, start, edges, envelope_min, envelope_max):
+    """
+    把一块样本并入缩略图的最小/最大值包络，跨块的像素列取两块的极值。
+
+    :param samples: 样本数组，形状为 (样本数, 通道数)。
+    :param start: 第一个样本的序号。
+    :param edges: 每个像素列的起始样本序号，末尾为记录的样本数。
+    :param envelope_min: 每个像素列的最小值，就地更新。
+    :param envelope_max: 每个像素列的最大值，就地更新。
+    """
+    stop = start + len(samples)
+    first = max(np.searchsorted(edges, start, side='right') - 1, 0)
+    last = min(np.searchsorted(edges, stop, side='left'), len(envelope_min))
+    # 只计算非空的像素列（样本数少于宽度时有空列），第一列可能从上一块开始
+    columns = np.arange(first, last)
+    columns = columns[edges[columns + 1] > edges[columns]]
+    local = np.maximum(edges[columns], start) - start
+    envelope_min[columns] = np.minimum(envelope_min[columns], np.minimum.reduceat(samples, local, axis=0))
+    envelope_max[columns] = np.maximum(envelope_max[columns], np.maximum.reduceat(samples, local, axis=0))
+
+
+def save_thumbnail(result, envelope_min, envelope_max, edges, path, size=ANALYSIS_THUMBNAIL_SIZE):
+    """
+    生成缩略图：上方为整个记录的最小/最大值包络，下方为平均频谱（dB）。
+    只使用 Matplotlib 的 Agg 后端，不导入 Qt，可以在工作进程中运行。
+
+    :param result: analyze_recording() 的结果字典。
+    :param envelope_min: 每个像素列的最小值，形状为 (宽度, 通道数)。
+    :param envelope_max: 每个像素列的最大值。
+    :param edges: 每个像素列的起始样本序号。
+    :param path: PNG 文件路径。
+    :param size: 缩略图尺寸 (宽, 高)，单位为像素。
+    :return: PNG 文件路径。
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    dpi = 100
+    figure = Figure(figsize=(size[0] / dpi, size[1] / dpi), dpi=dpi)
+    FigureCanvasAgg(figure)
+    axes = figure.subplots(2, 1)
+    valid = np.isfinite(envelope_min[:, 0])  # 样本数少于宽度时有空的像素列
+    seconds = edges[:-1][valid] / result["sample_rate"]
+    spectrum_db = 20 * np.log10(np.maximum(result["spectrum"], 1e-12))
+    for channel in range(result["channels"]):
+        axes[0].fill_between(seconds, envelope_min[valid, channel], envelope_max[valid, channel],
+                             linewidth=0, alpha=0.7)
+        axes[1].plot(result["freqs"], spectrum_db[:, channel], linewidth=0.6)
+    axes[0].set_xlim(0, result["duration_s"])
+    axes[1].set_xlim(0, result["sample_rate"] / 2)
+    axes[0].set_title(result["file"], fontsize=7)
+    for ax in axes:
+        ax.tick_params(labelsize=6)
+    figure.tight_layout(pad=0.3)
+    figure.savefig(path)
+    return path
+
+
+def analyze_batch(paths, out_dir, workers=ANALYSIS_WORKERS, thumbnails=True, progress=None, **options):
+    """
+    在进程池中并行分析多个记录，每个记录一个任务，并把结果写入汇总表。
+
+    频谱计算和解压都不释放 GIL 或只部分释放，因此使用进程池（spawn 方式），
+    各进程独立读取自己的记录，只把统计量和平均频谱传回主进程。workers 为 1 时在当前进程中依次分析。
+
+    输出文件（位于 out_dir）：
+        analysis.csv        汇总表，每个记录的每个通道一行，列见 SUMMARY_FIELDS
+        analysis.json       同样的汇总表，另含分析设置和失败的记录
+        spectra.npz         频率轴 freqs_<序号> 和平均幅度谱 spectrum_<序号>，序号与汇总表的顺序一致，
+                            files 和 paths 为对应的记录名称和数据文件路径
+        <序号>_<记录名称>.png  缩略图（thumbnails 为 True 时），序号为记录在 paths 中的位置，
+                            不同目录下的同名记录不会互相覆盖
+
+    :param paths: 记录路径列表。
+    :param out_dir: 输出目录，不存在时创建。
+    :param workers: 工作进程数，None 表示 CPU 核数。
+    :param thumbnails: 是否生成缩略图。
+    :param progress: 每完成一个记录调用一次 progress(已完成数, 总数, 结果或异常)，可选。
+    :param options: 传给 analyze_recording() 的其他参数（fft_size、window、overlap、segments）。
+    :return: (按 paths 顺序排列的结果列表, {失败的记录路径: 错误信息})。
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    thumbnail_dir = out_dir if thumbnails else None
+    workers = min(workers or os.cpu_count() or 1, max(len(paths), 1))
+    results, errors = {}, {}
+
+    def finished(path, outcome):
+        if isinstance(outcome, Exception):
+            errors[path] = str(outcome)
+        else:
+            results[path] = outcome
+        if progress is not None:
+            progress(len(results) + len(errors), len(paths), outcome)
+
+    names = {path: f"{index:05d}_{os.path.splitext(os.path.basename(path))[0]}" for index, path in enumerate(paths, 1)}
+    if workers == 1:
+        for path in paths:
+            try:
+                outcome = analyze_recording(path, thumbnail_dir, thumbnail_name=names[path], **options)
+            except Exception as e:
+                outcome = e
+            finished(path, outcome)
+    else:
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = {executor.submit(analyze_recording, path, thumbnail_dir, thumbnail_name=names[path],
+                                       **options): path for path in paths}
+            for future in as_completed(futures):
+                finished(futures[future], future.exception() or future.result())
+
+    ordered = [results[path] for path in paths if path in results]
+    write_summary(ordered, errors, out_dir, options)
+    return ordered, errors
+
+
+def summary_rows(results):
+    """
+    把分析结果展开为汇总表的行，每个记录的每个通道一行。
+
+    :param results: analyze_recording() 的结果列表。
+    :return: 行字典列表，键见 SUMMARY_FIELDS。
+    """
+    rows = []
+    for result in results:
+        for channel, stats in enumerate(result["channel_stats"]):
+            row = {key: result.get(key) for key in ("file", "path", "duration_s", "samples", "sample_rate",
+                                                    "missed_samples")}
+            row.update(stats, channel=channel + 1,
+                       thumbnail=os.path.basename(result["thumbnail"]) if result["thumbnail"] else "")
+            rows.append(row)
+    return rows
+
+
+def write_summary(results, errors, out_dir, options=None):
+    """
+    写出汇总表（CSV 和 JSON）和平均频谱。
+
+    :param results: analyze_recording() 的结果列表。
+    :param errors: {失败的记录路径: 错误信息}。
+    :param out_dir: 输出目录。
+    :param options: 分析设置，记录在 JSON 中。
+    """
+    rows = summary_rows(results)
+    with open(os.path.join(out_dir, 'analysis.csv'), 'w', newline='') as f:
+        writer = csv.DictWriter(f, SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    with open(os.path.join(out_dir, 'analysis.json'), 'w', encoding='utf-8') as f:
+        json.dump({"options": options or {}, "recordings": rows, "errors": errors}, f, ensure_ascii=False, indent=2)
+    spectra = {}
+    for index, result in enumerate(results):
+        spectra[f"freqs_{index}"] = result["freqs"]
+        spectra[f"spectrum_{index}"] = result["spectrum"].astype(np.float32)
+    np.savez(os.path.join(out_dir, 'spectra.npz'), files=np.array([r["file"] for r in results]),
+             paths=np.array([r["path"] for r in results]), **spectra)
+
+
+def format_table(results):
+    """
+    把汇总表格式化为便于在终端阅读的文本表格，记录以相对当前目录的路径显示，过长时保留末尾。
+
+    :param results: analyze_recording() 的结果列表。
+    :return: 文本表格。
+    """
+    header = f'{"recording":40s} {"ch":>2s} {"dur (s)":>9s} {"rms":>10s} {"peak":>10s} {"mean":>10s} {"dominant (Hz)":>14s}'
+    lines = [header, '-' * len(header)]
+    for row in summary_rows(results):
+        name = os.path.splitext(os.path.relpath(row["path"]))[0]
+        lines.append(f'{name[-40:]:40s} {row["channel"]:2d} {row["duration_s"]:9.2f} {row["rms"]:10.4g} '
+                     f'{row["peak"]:10.4g} {row["mean"]:10.4g} {row["dominant_hz"]:14.1f}')
+    return '\n'.join(lines)
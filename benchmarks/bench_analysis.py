@@ -0,0 +1,93 @@
+"""
+离线批量分析的基准测试。
+
+生成一批模拟信号记录，用不同的工作进程数运行 analysis.analyze_batch，测量墙钟时间、
+吞吐量（百万样本/秒）以及相对单进程的加速比和并行效率（加速比 / 进程数）。
+进程池的启动（spawn 子进程并导入 numpy、Matplotlib）包含在计时内，记录数少时会压低加速比。
+
+在仓库根目录运行：
+
+    python -m benchmarks.bench_analysis
+    python -m benchmarks.bench_analysis --files 32 --seconds 4 --workers 1 2 4 8 --no-thumbnails
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime
+
+from config import SAMPLE_RATE
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def make_recordings(directory, files, seconds, channels):
+    """
+    写入一批模拟信号记录。
+
+    :param directory: 输出目录。
+    :param files: 记录数。
+    :param seconds: 每个记录的时长（秒）。
+    :param channels: 通道数。
+    :return: 记录路径列表。
+    """
+    from recording import RecordingWriter
+    from signal_generator import SimulatedSignalGenerator
+
+    generator = SimulatedSignalGenerator(channels=channels)
+    block = generator.generate_block(int(seconds * SAMPLE_RATE))
+    paths = []
+    for index in range(files):
+        path = os.path.join(directory, f"bench_{index + 1:05d}")
+        with RecordingWriter(path, SAMPLE_RATE, channels=channels, summary=False) as writer:
+            writer.write(block)
+        paths.append(writer.meta_path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline batch analysis benchmark")
+    parser.add_argument("--files", type=int, default=16, help="number of recordings (default: 16)")
+    parser.add_argument("--seconds", type=float, default=2.0, help="length of each recording in seconds (default: 2)")
+    parser.add_argument("--channels", type=int, default=1, help="channels per recording (default: 1)")
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, os.cpu_count() or 1}),
+                        help="worker counts to compare (default: 1, 2 and the CPU count)")
+    parser.add_argument("--no-thumbnails", action="store_true", help="skip the PNG thumbnails")
+    parser.add_argument("--output", help="JSON result file (default: benchmarks/results/analysis-<time>.json)")
+    args = parser.parse_args()
+
+    from analysis import analyze_batch
+    from benchmarks.bench_pipeline import environment
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_recordings(directory, args.files, args.seconds, args.channels)
+        samples = args.files * int(args.seconds * SAMPLE_RATE) * args.channels
+        for workers in args.workers:
+            start = time.perf_counter()
+            analyzed, errors = analyze_batch(paths, os.path.join(directory, f"out-{workers}"), workers,
+                                             not args.no_thumbnails)
+            elapsed = time.perf_counter() - start
+            if errors:
+                raise SystemExit(f"analysis failed: {errors}")
+            results[workers] = {"seconds": elapsed, "msamples_per_s": samples / elapsed / 1e6}
+            baseline = results[args.workers[0]]["seconds"] * args.workers[0]
+            results[workers]["speedup"] = baseline / elapsed
+            results[workers]["efficiency"] = results[workers]["speedup"] / workers
+            print(f"{workers:3d} worker(s): {elapsed:7.2f} s  {results[workers]['msamples_per_s']:7.1f} M samples/s  "
+                  f"speedup {results[workers]['speedup']:5.2f}  efficiency {results[workers]['efficiency']:.0%}",
+                  flush=True)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"analysis-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "files": args.files, "seconds": args.seconds,
+                   "channels": args.channels, "thumbnails": not args.no_thumbnails, "results": results}, f, indent=2)
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+分块压缩记录的基准测试。
+
+对每种压缩编码和预处理组合，把同一段信号写入 ChunkedRecordingWriter，测量压缩比和写入速度，
+并与实时数据率（采样率 × 4 字节）比较；再用最快的组合比较不同工作数的线程池和进程池。
+测试两种信号：
+
+    simulated   模拟信号发生器的输出（正弦 + 高斯噪声，完整 float32 精度，尾数接近随机）
+    adc16       同一信号量化到 16 位 ADC 的分辨率后再转为 float32，接近真实采集卡的数据
+
+在仓库根目录运行：
+
+    python -m benchmarks.bench_compression
+    python -m benchmarks.bench_compression --seconds 4 --workers 1 2 4 --output compression.json
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime
+import numpy as np
+
+from config import SAMPLE_RATE, SAVE_CHUNK_SAMPLES
+from chunked_recording import ChunkedRecordingWriter, ChunkedRecordingReader, make_executor, CODECS, PREPROCESSORS
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+FULL_SCALE = 10.0  # adc16 信号的满量程（与 Y_AXIS_RANGE 一致）
+
+
+def make_signals(seconds):
+    """
+    生成测试信号。
+
+    :param seconds: 信号时长（秒）。
+    :return: 以信号名称为键的 float32 数组字典。
+    """
+    from signal_generator import SimulatedSignalGenerator
+
+    generator = SimulatedSignalGenerator()
+    simulated = generator.generate_block(int(seconds * SAMPLE_RATE)).reshape(-1).astype(np.float32)
+    step = 2 * FULL_SCALE / 65536
+    adc16 = (np.round(simulated / step) * step).astype(np.float32)
+    return {"simulated": simulated, "adc16": adc16}
+
+
+def write_once(samples, directory, codec, preprocess, executor, block_size=65536):
+    """
+    按保存器的块大小把样本写入一个压缩记录，并确认读回的数据与原始数据一致。
+
+    :return: (写入耗时（秒）, 压缩比, 是否无损)。
+    """
+    path = os.path.join(directory, f"bench-{codec}-{preprocess.replace('+', '-')}")
+    start = time.perf_counter()
+    writer = ChunkedRecordingWriter(path, SAMPLE_RATE, codec=codec, preprocess=preprocess, executor=executor)
+    for offset in range(0, len(samples), block_size):
+        writer.write(samples[offset:offset + block_size])
+    writer.close()
+    elapsed = time.perf_counter() - start
+    lossless = bool(np.array_equal(ChunkedRecordingReader(path).read(0, len(samples)), samples))
+    return elapsed, writer.compression_ratio(), lossless
+
+
+def bench_codecs(signals, directory, workers):
+    """
+    每种编码和预处理组合的压缩比和写入速度。
+
+    :return: 结果字典：信号名称 -> "编码/预处理" -> 指标。
+    """
+    realtime = SAMPLE_RATE * 4 / 1e6
+    results = {}
+    executor = make_executor(workers, "thread")
+    try:
+        for name, samples in signals.items():
+            results[name] = {}
+            for codec in CODECS:
+                for preprocess in PREPROCESSORS:
+                    elapsed, ratio, lossless = write_once(samples, directory, codec, preprocess, executor)
+                    mb_per_s = samples.nbytes / elapsed / 1e6
+                    results[name][f"{codec}/{preprocess}"] = {
+                        "ratio": ratio, "mb_per_s": mb_per_s, "realtime_factor": mb_per_s / realtime,
+                        "lossless": lossless}
+                    print(f"{name:9s} {codec:4s} {preprocess:13s} ratio {ratio:5.2f}  "
+                          f"{mb_per_s:7.1f} MB/s  ({mb_per_s / realtime:5.1f}x real time)  lossless {lossless}",
+                          flush=True)
+    finally:
+        executor.shutdown()
+    return results
+
+
+def bench_executors(samples, directory, codec, preprocess, worker_counts):
+    """
+    同一编码下不同工作数的线程池和进程池的写入速度。
+
+    :return: 结果字典："thread/N" 或 "process/N" -> MB/s。
+    """
+    results = {}
+    for kind in ("thread", "process"):
+        for workers in worker_counts:
+            executor = make_executor(workers, kind)
+            try:
+                write_once(samples[:SAVE_CHUNK_SAMPLES * workers], directory, codec, preprocess, executor)  # 预热
+                elapsed, _, _ = write_once(samples, directory, codec, preprocess, executor)
+            finally:
+                executor.shutdown()
+            results[f"{kind}/{workers}"] = samples.nbytes / elapsed / 1e6
+            print(f"{codec}/{preprocess} {kind:7s} x{workers}: {results[f'{kind}/{workers}']:.1f} MB/s", flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunked compressed recording benchmark")
+    parser.add_argument("--seconds", type=float, default=2.0, help="seconds of signal to compress (default: 2)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1],
+                        help="worker counts to compare (default: 1 and the CPU count)")
+    parser.add_argument("--output", help="JSON result file (default: benchmarks/results/compression-<time>.json)")
+    args = parser.parse_args()
+
+    from benchmarks.bench_pipeline import environment
+
+    signals = make_signals(args.seconds)
+    with tempfile.TemporaryDirectory() as directory:
+        codecs = bench_codecs(signals, directory, max(args.workers))
+        executors = bench_executors(signals["adc16"], directory, "zlib", "shuffle", sorted(set(args.workers)))
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"compression-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "seconds": args.seconds, "codecs": codecs,
+                   "executors": executors}, f, indent=2)
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+USB 数据包解码微基准测试。
+
+对比逐样本 struct.unpack 的旧解码方式与基于 np.frombuffer 的批量解码方式，
+输出两者每秒解码的样本数。在仓库根目录运行：
+
+    python -m benchmarks.bench_decode
+"""
+import struct
+import time
+from array import array
+from collections import deque
+import numpy as np
+from ring_buffer import RingBuffer
+from usb_reader import decode_samples
+
+
+def legacy_decode(data, queue):
+    """旧版 USBReader.run 中的逐样本解码循环。"""
+    for i in range(0, len(data), 4):
+        if i + 4 <= len(data):
+            float_val = struct.unpack('<f', data[i:i+4])[0]
+            queue.append(float_val)
+
+
+def vectorized_decode(data, ring):
+    """批量解码并写入环形缓冲区。"""
+    ring.write(decode_samples(data))
+
+
+def make_packets(packet_size, packet_count):
+    """生成随机 float32 数据包，类型与 pyusb 的 dev.read 返回值一致。"""
+    samples = np.random.uniform(-1, 1, packet_size // 4 * packet_count).astype('<f4')
+    raw = samples.tobytes()
+    return [array('B', raw[i:i + packet_size]) for i in range(0, len(raw), packet_size)]
+
+
+def bench(decode, sink, packets, duration=1.0):
+    """
+    在给定时长内循环解码数据包。
+
+    :return: 每秒解码的样本数。
+    """
+    decoded = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        for packet in packets:
+            decode(packet, sink)
+            decoded += len(packet) // 4
+    return decoded / (time.perf_counter() - start)
+
+
+def main():
+    for packet_size in (64, 512, 16384):
+        packets = make_packets(packet_size, 256)
+        legacy = bench(legacy_decode, deque(maxlen=10000), packets)
+        vectorized = bench(vectorized_decode, RingBuffer(10000), packets)
+        print(f"packet {packet_size:>6} B: legacy {legacy / 1e6:8.2f} MS/s   "
+              f"vectorized {vectorized / 1e6:8.2f} MS/s   speedup x{vectorized / legacy:.1f}")
+
+
+if __name__ == "__main__":
+    main()
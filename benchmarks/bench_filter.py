@@ -0,0 +1,147 @@
+"""
+流式滤波与抽取的基准测试。
+
+对每个滤波链，把模拟信号按 USB 读取器的块大小逐块送入 dsp_filter.FilterChain，测量吞吐量
+（百万输入样本/秒）和相对实时采样率的倍数；并比较多相抽取（只计算保留的输出样本）
+与先以全速率 FIR 滤波再每 M 个取一个的做法。
+
+同时检查正确性：任意切分块得到的输出与整段一次处理的输出一致（块边界无失真），
+IIR 级与逐样本差分方程的参考实现一致。
+
+在仓库根目录运行：
+
+    python -m benchmarks.bench_filter
+    python -m benchmarks.bench_filter --seconds 8 --block 16384 --chains "dc,decimate:16" "notch:50"
+"""
+import os
+import json
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from config import SAMPLE_RATE
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_CHAINS = ["dc", "notch:50", "iir-lowpass:10000", "lowpass:10000", "decimate:16",
+                  "dc,notch:50,decimate:16", "dc,notch:50,lowpass:10000,decimate:16",
+                  "decimate:16,dc,notch:50,lowpass:10000:63"]
+
+
+def run_chain(chain, signal, block):
+    """
+    把信号逐块送入滤波链。
+
+    :param chain: FilterChain 实例。
+    :param signal: 输入信号。
+    :param block: 块大小（样本数），可以是列表，按顺序循环使用。
+    :return: (输出数组, 耗时（秒）)。
+    """
+    sizes = block if isinstance(block, (list, tuple)) else [block]
+    outputs = []
+    start = time.perf_counter()
+    position, k = 0, 0
+    while position < len(signal):
+        size = sizes[k % len(sizes)]
+        outputs.append(chain.process(signal[position:position + size]))
+        position += size
+        k += 1
+    return np.concatenate(outputs), time.perf_counter() - start
+
+
+def reference_biquad(stage, signal):
+    """
+    逐样本计算 IIR 差分方程，初始状态与 IIRFilter 相同（第一个样本的稳态）。
+
+    :param stage: IIRFilter 实例。
+    :param signal: 一维输入信号。
+    :return: float64 输出数组。
+    """
+    b, a = stage.b, stage.a
+    x1 = x2 = float(signal[0])
+    y1 = y2 = x1 * stage.dc_gain
+    output = np.empty(len(signal))
+    for n, x in enumerate(signal.astype(np.float64)):
+        y = b[0] * x + b[1] * x1 + b[2] * x2 - a[1] * y1 - a[2] * y2
+        x2, x1, y2, y1 = x1, x, y1, y
+        output[n] = y
+    return output
+
+
+def polyphase_comparison(signal, factor, block):
+    """
+    比较多相抽取与先全速率滤波再抽取的耗时，两者使用相同的抗混叠滤波器，输出应一致。
+
+    :param signal: 输入信号。
+    :param factor: 抽取倍数。
+    :param block: 块大小（样本数）。
+    :return: 结果字典。
+    """
+    from dsp_filter import FilterChain, FIRFilter, parse_filter_chain
+
+    polyphase = parse_filter_chain(f"decimate:{factor}", SAMPLE_RATE)
+    coefficients = polyphase.stages[0][1].coefficients
+    full_rate = FilterChain([("lowpass", FIRFilter(coefficients), SAMPLE_RATE)], SAMPLE_RATE)
+    fast, fast_time = run_chain(polyphase, signal, block)
+    slow, slow_time = run_chain(full_rate, signal, block)
+    return {"factor": factor, "taps": len(coefficients),
+            "polyphase_msamples_per_s": len(signal) / fast_time / 1e6,
+            "filter_then_downsample_msamples_per_s": len(signal) / slow_time / 1e6,
+            "speedup": slow_time / fast_time,
+            "max_difference": float(np.max(np.abs(fast - slow[::factor])))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming filter and decimation benchmark")
+    parser.add_argument("--seconds", type=float, default=4.0, help="signal length in seconds (default: 4)")
+    parser.add_argument("--block", type=int, default=65536, help="samples per block (default: 65536)")
+    parser.add_argument("--chains", nargs="+", default=DEFAULT_CHAINS, help="filter chains to measure")
+    parser.add_argument("--output", help="JSON result file (default: benchmarks/results/filter-<time>.json)")
+    args = parser.parse_args()
+
+    from dsp_filter import IIRFilter, parse_filter_chain
+    from signal_generator import SimulatedSignalGenerator
+    from benchmarks.bench_pipeline import environment
+
+    signal = SimulatedSignalGenerator().generate_block(int(args.seconds * SAMPLE_RATE))
+    results = {"chains": {}}
+    for spec in args.chains:
+        chain = parse_filter_chain(spec, SAMPLE_RATE)
+        output, elapsed = run_chain(chain, signal, args.block)
+        chain.reset()
+        split, _ = run_chain(chain, signal, [1, 7, 1000, 4093, 65536])
+        rate = len(signal) / elapsed
+        results["chains"][spec] = {"description": chain.describe(), "msamples_per_s": rate / 1e6,
+                                   "realtime_factor": rate / SAMPLE_RATE,
+                                   "block_split_difference": float(np.max(np.abs(output - split)))}
+        print(f"{spec:45s} {rate / 1e6:8.1f} M samples/s  {rate / SAMPLE_RATE:7.0f}x real time  "
+              f"block split diff {results['chains'][spec]['block_split_difference']:.1e}", flush=True)
+
+    for factor in (4, 16, 64):
+        result = results.setdefault("polyphase", {})[factor] = polyphase_comparison(signal, factor, args.block)
+        print(f"decimate x{factor:<3d} ({result['taps']} taps): polyphase {result['polyphase_msamples_per_s']:7.1f}, "
+              f"filter then downsample {result['filter_then_downsample_msamples_per_s']:7.1f} M samples/s  "
+              f"speedup {result['speedup']:5.1f}  max diff {result['max_difference']:.1e}", flush=True)
+
+    # 逐样本参考只用前 0.2 秒，否则 Python 循环太慢
+    reference = signal[:int(0.2 * SAMPLE_RATE)]
+    for spec in ("dc", "notch:50", "iir-lowpass:10000", "iir-bandpass:1000:5000"):
+        stage = parse_filter_chain(spec, SAMPLE_RATE).stages[0][1]
+        stage = IIRFilter(stage.b, stage.a)
+        output = np.concatenate([stage.process(reference[i:i + 4096]) for i in range(0, len(reference), 4096)])
+        error = float(np.max(np.abs(output[:, 0] - reference_biquad(stage, reference))))
+        results.setdefault("iir_reference_error", {})[spec] = error
+        print(f"{spec:25s} max error vs. per-sample reference {error:.1e}", flush=True)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"filter-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "seconds": args.seconds, "block": args.block, **results}, f, indent=2)
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
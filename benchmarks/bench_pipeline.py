@@ -0,0 +1,418 @@
+"""
+采集 → 显示 → 保存流水线的无界面基准测试。
+
+不需要显示器和 USB 硬件：USBReader 连接 fake_usb 中的模拟设备，PlotCanvas 使用 Qt 的 offscreen 平台。
+测量以下指标，并把结果写入 JSON 文件，便于在版本之间比较：
+
+    usb_decode      USBReader 读取 + 解码的持续吞吐量（样本/秒）
+    get_data        读取器满速写入、其他线程同时读取时 get_data() 的延迟
+    plot            PlotCanvas.update_plot 的单帧耗时
+    saver           WaveformSaver 的写入速度（MB/s）
+    isolation       主线程持续占用 GIL 时，线程内和独立进程（ProcessReader）采集的实际速率
+    trigger         Trigger.scan 的向量化边沿查找与逐样本循环的吞吐量（样本/秒）
+    summary         摘要索引的构建吞吐量，以及由索引和由原始样本绘制整段记录概览的耗时
+
+在仓库根目录运行：
+
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --only plot saver --output results.json
+"""
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+from datetime import datetime
+from threading import Thread, Event
+import numpy as np
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from config import VENDOR_ID, SAMPLE_RATE, QUEUE_MAXLEN, X_AXIS_RANGE
+from benchmarks.fake_usb import FakeUSBDevice, install_fake_usb
+
+BENCHMARKS = ("usb_decode", "get_data", "plot", "saver", "isolation", "trigger", "summary")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentiles(values):
+    """
+    计算耗时样本的统计量。
+
+    :param values: 耗时列表（秒）。
+    :return: 以毫秒为单位的 mean、p50、p95、p99、max 字典。
+    """
+    values = np.asarray(values) * 1000
+    return {
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
+
+
+def bench_usb_decode(duration, packet_size=512):
+    """
+    不限速的模拟设备下 USBReader 的持续吞吐量。
+
+    :return: 结果字典。
+    """
+    from usb_reader import USBReader
+
+    with install_fake_usb(FakeUSBDevice(packet_size=packet_size, signal="ramp")):
+        reader = USBReader(VENDOR_ID)
+        reader.start()
+        time.sleep(0.2)  # 预热
+        start_cursor, start = reader.get_cursor(), time.perf_counter()
+        time.sleep(duration)
+        samples = reader.get_cursor() - start_cursor
+        elapsed = time.perf_counter() - start
+        reader.stop()
+        reader.join()
+        latest = reader.get_latest(1024)
+        del reader
+    # ramp 信号相邻样本差为 1（取模回绕处除外），用于确认解码结果正确
+    steps = np.diff(latest)
+    return {
+        "packet_size": packet_size,
+        "samples_per_s": samples / elapsed,
+        "mb_per_s": samples * 4 / elapsed / 1e6,
+        "realtime_factor": samples / elapsed / SAMPLE_RATE,
+        "continuous": bool(np.all((steps == 1) | (steps < 0))),
+    }
+
+
+def bench_get_data(duration, contenders=2):
+    """
+    读取器满速写入、另有 contenders 个线程不停读取时，get_data() 的延迟分布。
+
+    :return: 结果字典。
+    """
+    from usb_reader import USBReader
+
+    with install_fake_usb(FakeUSBDevice(signal="noise")):
+        reader = USBReader(VENDOR_ID)
+        reader.start()
+        stop = Event()
+
+        def contend():
+            while not stop.is_set():
+                reader.get_latest(X_AXIS_RANGE)
+
+        threads = [Thread(target=contend, daemon=True) for _ in range(contenders)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        latencies = []
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            start = time.perf_counter()
+            reader.get_data()
+            latencies.append(time.perf_counter() - start)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        reader.stop()
+        reader.join()
+        del reader
+    result = {"contenders": contenders, "calls": len(latencies), "samples_per_call": QUEUE_MAXLEN}
+    result.update(percentiles(latencies))
+    return result
+
+
+def bench_plot(duration, x_ranges=(X_AXIS_RANGE, 65536)):
+    """
+    PlotCanvas.update_plot 在 offscreen 画布上的单帧耗时，分别测量 blit 和完整重绘。
+
+    :return: 结果字典，键为 "x<样本数>_blit" 或 "x<样本数>_full"。
+    """
+    from PySide6 import QtWidgets
+    from gui.plot_canvas import PlotCanvas
+    from signal_models import Tone, GaussianNoise
+    from signal_generator import SimulatedSignalGenerator
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    source = SimulatedSignalGenerator(models=[Tone(10000), GaussianNoise(0.1)])
+    results = {}
+    for use_blit in (True, False):
+        canvas = PlotCanvas()
+        canvas.resize(1200, 900)
+        canvas.show()
+        app.processEvents()
+        canvas.use_blit = use_blit
+        for artist in canvas.animated_artists:
+            artist.set_animated(use_blit)
+        canvas.needs_full_draw = True
+        for x_range in x_ranges:
+            canvas.set_x_axis_range(x_range)
+            count = canvas.samples_needed()
+            frame_times = []
+            end = time.perf_counter() + duration
+            while time.perf_counter() < end or len(frame_times) < 5:
+                data = source.generate_block(count)
+                start = time.perf_counter()
+                canvas.update_plot(data, 0)
+                frame_times.append(time.perf_counter() - start)
+                app.processEvents()
+            frame_times = frame_times[2:]  # 丢弃包含完整重绘的预热帧
+            result = {"frames": len(frame_times), "fps": len(frame_times) / sum(frame_times)}
+            result.update(percentiles(frame_times))
+            results[f"x{x_range}_{'blit' if use_blit else 'full'}"] = result
+        canvas.close()
+    return results
+
+
+class InstantSource:
+    """
+    无限快的数据源：消费者每次 read() 都得到一个缓冲区容量的新样本，
+    使保存基准只受 WaveformSaver 自身的速度限制。
+    """
+
+    sample_rate = SAMPLE_RATE
+
+    def __init__(self):
+        self.block = np.random.default_rng(0).uniform(-1, 1, QUEUE_MAXLEN).astype(np.float32)
+
+    def add_consumer(self, name, policy="drop"):
+        return self
+
+    def read(self):
+        return self.block, 0
+
+    def close(self):
+        pass
+
+    def get_device_info(self):
+        return {"product": "InstantSource"}
+
+
+def bench_saver(duration, segment_count=4):
+    """
+    WaveformSaver 记录约 duration 秒数据（按采样率计）的写入速度。
+
+    :return: 结果字典。
+    """
+    from waveform_saver import WaveformSaver
+
+    saver = WaveformSaver(InstantSource())
+    saver.poll_interval = 0
+    record_time = max(duration, 1.0) / segment_count
+    with tempfile.TemporaryDirectory() as path, redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        saver.start_saving(path, "bench", record_time, segment_count)
+        saver.save_thread.join()
+        elapsed = time.perf_counter() - start
+        written = sum(os.path.getsize(f) for f in saver.saved_files)
+    return {
+        "segments": segment_count,
+        "samples": saver.samples_recorded,
+        "mb_per_s": written / elapsed / 1e6,
+        "realtime_factor": saver.samples_recorded / elapsed / SAMPLE_RATE,
+    }
+
+
+def bench_isolation(duration, load_threads=2):
+    """
+    模拟绘图负载：load_threads 个线程执行纯 Python 计算、持续争用 GIL，
+    比较模拟信号源在本进程线程中和在独立进程中运行时的实际采集速率，以及 get_latest() 的延迟。
+
+    :return: 结果字典，键为 "thread" 和 "process"。
+    """
+    from signal_generator import SimulatedSignalGenerator
+    from process_reader import ProcessReader
+
+    def load(stop):
+        while not stop.is_set():
+            sum(i * i for i in range(20000))
+
+    results = {}
+    for mode in ("thread", "process"):
+        reader = ProcessReader(SimulatedSignalGenerator) if mode == "process" else SimulatedSignalGenerator()
+        reader.start()
+        time.sleep(0.5)  # 预热（子进程启动、导入模块）
+        stop = Event()
+        threads = [Thread(target=load, args=(stop,), daemon=True) for _ in range(load_threads)]
+        for thread in threads:
+            thread.start()
+        start_cursor, start = reader.get_cursor(), time.perf_counter()
+        latencies = []
+        while time.perf_counter() - start < duration:
+            call = time.perf_counter()
+            reader.get_latest(X_AXIS_RANGE)
+            latencies.append(time.perf_counter() - call)
+            time.sleep(0.01)
+        samples = reader.get_cursor() - start_cursor
+        elapsed = time.perf_counter() - start
+        stop.set()
+        for thread in threads:
+            thread.join()
+        reader.stop()
+        reader.join()
+        result = {"load_threads": load_threads, "realtime_factor": samples / elapsed / SAMPLE_RATE}
+        result.update(percentiles(latencies))
+        results[mode] = result
+    return results
+
+
+def bench_trigger(duration, block_size=25600):
+    """
+    按每帧新样本数（50 ms）分块扫描带噪声的正弦信号，比较 Trigger.scan 与逐样本循环的吞吐量，
+    并确认两者找到的触发点相同。
+
+    :return: 结果字典。
+    """
+    from trigger import Trigger
+
+    rng = np.random.default_rng(0)
+    t = np.arange(SAMPLE_RATE, dtype=np.float64)
+    signal = (np.sin(2 * np.pi * 10000 * t / SAMPLE_RATE) + rng.normal(0, 0.1, len(t))).astype(np.float32)
+    blocks = [signal[k:k + block_size] for k in range(0, len(signal), block_size)]
+    level, hysteresis = 0.5, 0.1
+
+    def loop_scan(samples, armed):
+        found = []
+        for k, value in enumerate(samples):
+            if value < level - hysteresis:
+                armed = True
+            elif value >= level and armed:
+                found.append(k)
+                armed = False
+        return found, armed
+
+    def vectorized_pass():
+        trigger = Trigger(level, hysteresis=hysteresis)
+        found, offset = [], 0
+        for block in blocks:
+            found.extend(int(k) for k in trigger.scan(block, offset))
+            offset += len(block)
+        return found
+
+    def loop_pass():
+        found, offset, armed = [], 0, False
+        for block in blocks:
+            index, armed = loop_scan(block, armed)
+            found.extend(offset + k for k in index)
+            offset += len(block)
+        return found
+
+    results = {"block_size": block_size}
+    for name, scan_pass in (("vectorized", vectorized_pass), ("loop", loop_pass)):
+        passes = 0
+        start = time.perf_counter()
+        while True:
+            found = scan_pass()
+            passes += 1
+            # 逐样本循环很慢，只扫描一遍
+            if name == "loop" or time.perf_counter() - start >= duration / 2:
+                break
+        results[f"{name}_samples_per_s"] = passes * len(signal) / (time.perf_counter() - start)
+        results[f"{name}_triggers"] = found
+    results["speedup"] = results["vectorized_samples_per_s"] / results["loop_samples_per_s"]
+    results["identical"] = results.pop("vectorized_triggers") == results.pop("loop_triggers")
+    return results
+
+
+def bench_summary(duration, buckets=1500, seconds=20.0):
+    """
+    写入 seconds 秒的模拟信号记录，测量：SummaryBuilder 单独更新的吞吐量（样本/秒），
+    打开索引并取出整段记录 buckets 个桶的包络的耗时，以及读取全部原始样本并用 EnvelopeDecimator 抽取的耗时。
+    两种概览的最小值、最大值应当一致。
+
+    :return: 结果字典。
+    """
+    from recording import RecordingWriter, open_recording
+    from summary_index import SummaryBuilder, open_summary
+    from decimation import EnvelopeDecimator
+    from signal_generator import SimulatedSignalGenerator
+
+    block = SimulatedSignalGenerator().generate_block(int(SAMPLE_RATE * 2))
+    repeats = max(1, int(seconds / 2))
+    results = {"recording_seconds": 2.0 * repeats, "buckets": buckets}
+
+    builder, updates = SummaryBuilder(), 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration / 2:
+        for offset in range(0, len(block), 65536):
+            builder.update(block[offset:offset + 65536])
+        updates += 1
+    results["build_samples_per_s"] = updates * len(block) / (time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as path:
+        base = os.path.join(path, "bench")
+        with RecordingWriter(base, SAMPLE_RATE) as writer:
+            for _ in range(repeats):
+                for offset in range(0, len(block), 65536):
+                    writer.write(block[offset:offset + 65536])
+        start = time.perf_counter()
+        index = open_summary(base, build=False)
+        level, _, minimum, maximum = index.envelope(0, index.sample_count, buckets)
+        results["index_overview_ms"] = (time.perf_counter() - start) * 1000
+        results["index_level"] = level
+
+        start = time.perf_counter()
+        samples = open_recording(base).read(0, index.sample_count)
+        decimator = EnvelopeDecimator(buckets)
+        _, envelope = decimator.decimate(samples)
+        results["raw_overview_ms"] = (time.perf_counter() - start) * 1000
+    results["speedup"] = results["raw_overview_ms"] / results["index_overview_ms"]
+    results["same_extremes"] = bool(np.isclose(minimum.min(), envelope.min()) and np.isclose(maximum.max(), envelope.max()))
+    return results
+
+
+def environment():
+    """
+    记录运行环境，便于比较不同版本和机器上的结果。
+
+    :return: 环境信息字典。
+    """
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                  text=True, cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except OSError:
+        revision = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "sample_rate": SAMPLE_RATE,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless pipeline benchmarks")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS),
+                        help="benchmarks to run (default: all)")
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per measurement")
+    parser.add_argument("--output", help="JSON result file (default: benchmarks/results/pipeline-<time>.json)")
+    args = parser.parse_args()
+
+    runners = {"usb_decode": bench_usb_decode, "get_data": bench_get_data, "plot": bench_plot, "saver": bench_saver,
+               "isolation": bench_isolation, "trigger": bench_trigger,
+               "summary": bench_summary}
+    results = {}
+    for name in args.only:
+        print(f"running {name} ...", flush=True)
+        results[name] = runners[name](args.duration)
+        print(json.dumps(results[name], indent=2))
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"pipeline-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "duration": args.duration, "results": results}, f, indent=2)
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+GUI 启动耗时基准测试。
+
+每次测量都在新的 Python 进程中进行（模块导入和 Matplotlib 初始化不会被缓存），
+使用模拟信号和 Qt 的 offscreen 平台，从进程开始计时，记录：
+
+    imported        导入 PySide6 和 gui.app_window 完成
+    constructed     AppWindow 创建完成
+    window_shown    show() 返回，窗口开始显示
+    plot_ready      绘图画布创建完成
+    first_frame     第一帧绘制完成
+    tree_ready      保存面板的目录树模型创建完成
+
+只依赖 AppWindow(reader, use_simulated_signal, show_connection_info) 和 canvas.frame_time，
+可以在旧版本上运行以比较结果。在仓库根目录运行：
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --output startup.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from datetime import datetime
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+STAGES = ("imported", "constructed", "window_shown", "plot_ready", "first_frame", "tree_ready")
+RUN_TIMEOUT = 60.0  # 单次测量的最长时间（秒）
+
+
+def measure_once():
+    """
+    在当前进程中启动一次主窗口，等待第一帧绘制完成后退出，并输出各阶段耗时。
+
+    :return: 各阶段相对进程开始计时的耗时字典（秒）。
+    """
+    start = time.perf_counter()
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6 import QtWidgets, QtCore
+    from signal_generator import SimulatedSignalGenerator
+
+    app = QtWidgets.QApplication(sys.argv[:1])
+    from gui.app_window import AppWindow
+    times = {"imported": time.perf_counter() - start}
+
+    reader = SimulatedSignalGenerator()
+    reader.start()
+    window = AppWindow(reader, True, True)
+    times["constructed"] = time.perf_counter() - start
+    window.show()
+    times["window_shown"] = time.perf_counter() - start
+
+    def poll():
+        now = time.perf_counter() - start
+        canvas = getattr(window, "canvas", None)
+        if canvas is not None:
+            times.setdefault("plot_ready", now)
+            if canvas.frame_time is not None:
+                times.setdefault("first_frame", now)
+        if getattr(window.save_panel, "directory_model", None) is not None:
+            times.setdefault("tree_ready", now)
+        if all(stage in times for stage in STAGES) or now > RUN_TIMEOUT:
+            app.quit()
+
+    timer = QtCore.QTimer()
+    timer.timeout.connect(poll)
+    timer.start(1)
+    app.exec()
+    timer.stop()
+    window.close()
+    reader.stop()
+    reader.join()
+    return times
+
+
+def summarize(runs):
+    """
+    计算每个阶段在多次测量中的中位数、最小值和最大值。
+
+    :param runs: measure_once() 的结果列表。
+    :return: 以阶段名为键、以毫秒为单位的统计字典。
+    """
+    import numpy as np
+
+    summary = {}
+    for stage in STAGES:
+        values = np.array([run[stage] for run in runs if stage in run]) * 1000
+        if len(values):
+            summary[stage] = {"median_ms": float(np.median(values)), "min_ms": float(values.min()),
+                              "max_ms": float(values.max())}
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GUI startup time benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="number of fresh processes to start (default: 5)")
+    parser.add_argument("--output", help="JSON result file (default: benchmarks/results/startup-<time>.json)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # 子进程：测量一次，最后一行输出 JSON 结果
+        print(json.dumps(measure_once()), flush=True)
+        return
+
+    from benchmarks.bench_pipeline import environment
+
+    runs = []
+    for index in range(args.runs):
+        wall_start = time.perf_counter()
+        completed = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+                                   capture_output=True, text=True, timeout=RUN_TIMEOUT + 30,
+                                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        if completed.returncode != 0:
+            print(completed.stderr)
+            raise SystemExit(f"run {index + 1} failed with exit code {completed.returncode}")
+        times = json.loads(completed.stdout.strip().splitlines()[-1])
+        times["wall"] = time.perf_counter() - wall_start  # 含解释器启动和退出
+        runs.append(times)
+        print(f"run {index + 1}: " + "  ".join(f"{stage} {times[stage] * 1000:.0f} ms"
+                                               for stage in STAGES if stage in times), flush=True)
+
+    summary = summarize(runs)
+    print(json.dumps(summary, indent=2))
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"startup-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "runs": runs, "summary": summary}, f, indent=2)
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
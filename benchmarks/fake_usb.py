@@ -0,0 +1,141 @@
+"""
+用于基准测试的模拟 USB 设备。
+
+FakeUSBDevice 模拟 pyusb 设备的 read() 接口，按配置的包长、信号波形和速率返回 float32 数据流；
+install_fake_usb() 临时替换 usb.core.find 等函数，使 USBReader 无需硬件即可运行。
+"""
+import time
+from contextlib import contextmanager
+import numpy as np
+import usb.core
+import usb.util
+
+
+class FakeEndpoint:
+    """模拟 IN 端点描述符。"""
+
+    def __init__(self, packet_size):
+        self.bEndpointAddress = 0x81
+        self.wMaxPacketSize = packet_size
+
+
+class FakeContext:
+    """模拟 pyusb 的设备上下文，使读取器对象在补丁恢复后被回收时 dispose_resources() 也能正常执行。"""
+
+    def dispose(self, device, close_handle=True):
+        pass
+
+
+class FakeUSBDevice:
+    """
+    模拟 USB 设备，每次 read() 把一段连续的 float32 数据写入调用方的缓冲区。
+
+    :param packet_size: 端点最大包长（字节）。
+    :param signal: 数据波形，"ramp"（递增序号，便于检查连续性）、"sine" 或 "noise"。
+    :param sample_rate: 数据产生速率（样本/秒），为 None 时不限速。
+    :param timeout_every: 每隔多少次读取模拟一次超时（errno 110），0 表示从不超时。
+    :param sequence: 每个数据包是否以 32 位序号开头（与 USB_SEQUENCE_COUNTER 对应）。
+    :param drop_every: 带序号时每隔多少个数据包模拟丢失一个包（序号跳过 1），0 表示不丢包。
+    """
+
+    idProduct = 0x0001
+    manufacturer = "Fake"
+    product = "Fake USB Device"
+    serial_number = "0000"
+
+    def __init__(self, packet_size=512, signal="ramp", sample_rate=None, timeout_every=0, sequence=False, drop_every=0):
+        if signal not in ("ramp", "sine", "noise"):
+            raise ValueError(f'未知的信号波形: {signal}')
+        self.endpoint = FakeEndpoint(packet_size)
+        self.signal = signal
+        self.sample_rate = sample_rate
+        self.timeout_every = timeout_every
+        self.sequence = sequence
+        self.drop_every = drop_every
+        self.packet_count = 0  # 已发送的数据包数（含模拟丢失的包）
+        self.sample_count = 0  # 已产生的样本数
+        self.read_count = 0  # read() 调用次数
+        self.start = None  # 第一次读取的时间，用于限速
+        self._rng = np.random.default_rng(0)
+        self._ctx = FakeContext()
+
+    def set_configuration(self):
+        pass
+
+    def get_active_configuration(self):
+        return {(0, 0): self}
+
+    def _samples(self, count):
+        """生成接下来的 count 个样本。"""
+        if self.signal == "ramp":
+            # 对 2^24 取模，保证序号在 float32 中精确表示
+            return (np.arange(self.sample_count, self.sample_count + count) % (1 << 24)).astype('<f4')
+        if self.signal == "sine":
+            return np.sin(0.01 * np.arange(self.sample_count, self.sample_count + count)).astype('<f4')
+        return self._rng.uniform(-1, 1, count).astype('<f4')
+
+    def read(self, address, buffer, timeout=None):
+        """
+        填充 buffer 并返回写入的字节数，接口与 usb.core.Device.read(address, buffer) 一致。
+        """
+        self.read_count += 1
+        if self.timeout_every and self.read_count % self.timeout_every == 0:
+            raise usb.core.USBError('Operation timed out', errno=110)
+        if self.sequence:
+            return self._read_sequenced(buffer)
+        count = len(buffer) // 4
+        if self.sample_rate:
+            if self.start is None:
+                self.start = time.perf_counter()
+            delay = self.start + (self.sample_count + count) / self.sample_rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        memoryview(buffer)[:count * 4] = self._samples(count).tobytes()
+        self.sample_count += count
+        return count * 4
+
+    def _read_sequenced(self, buffer):
+        """
+        以带序号的数据包填充 buffer，每个包为 4 字节序号加 (packet_size - 4) // 4 个样本。
+        """
+        packet_size = self.endpoint.wMaxPacketSize
+        packets = len(buffer) // packet_size
+        per_packet = (packet_size - 4) // 4
+        sequence = self.packet_count + np.arange(packets)
+        if self.drop_every:
+            sequence += sequence // self.drop_every  # 每 drop_every 个包跳过一个序号
+        self.packet_count += packets
+        frames = np.zeros((packets, packet_size), dtype=np.uint8)
+        frames[:, :4] = sequence.astype('<u4').view(np.uint8).reshape(packets, 4)
+        frames[:, 4:4 + per_packet * 4] = self._samples(packets * per_packet).view(np.uint8).reshape(packets, -1)
+        self.sample_count += packets * per_packet
+        memoryview(buffer)[:frames.nbytes] = frames.tobytes()
+        return frames.nbytes
+
+
+def _fake_find(devices, find_all=False, **kwargs):
+    """模拟 usb.core.find()：find_all 时返回全部模拟设备，否则返回第一个。"""
+    return iter(devices) if find_all else devices[0]
+
+
+def _fake_find_descriptor(interface, find_all=False, **kwargs):
+    """模拟 usb.util.find_descriptor()，interface 为模拟设备返回的接口（即设备本身）。"""
+    return iter([interface.endpoint]) if find_all else interface.endpoint
+
+
+@contextmanager
+def install_fake_usb(device):
+    """
+    在上下文中用模拟设备替换 pyusb 的设备查找函数，退出时恢复。
+
+    :param device: FakeUSBDevice 实例，或多个实例的列表（模拟同一厂商 ID 下的多个设备）。
+    """
+    devices = device if isinstance(device, (list, tuple)) else [device]
+    saved = usb.core.find, usb.util.find_descriptor, usb.util.dispose_resources
+    usb.core.find = lambda **kwargs: _fake_find(devices, **kwargs)
+    usb.util.find_descriptor = _fake_find_descriptor
+    usb.util.dispose_resources = lambda dev: None
+    try:
+        yield device
+    finally:
+        usb.core.find, usb.util.find_descriptor, usb.util.dispose_resources = saved
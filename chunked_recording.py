@@ -0,0 +1,347 @@
+import os
+import bz2
+import json
+import lzma
+import zlib
+import struct
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+from config import (SAVE_COMPRESSION_LEVEL, SAVE_PREPROCESS, SAVE_CHUNK_SAMPLES, SAVE_COMPRESSION_WORKERS,
+                    SAVE_COMPRESSION_EXECUTOR, SAVE_SUMMARY)
+from recording import RecordingWriter, RecordingReader, recording_paths, SAMPLE_DTYPE
+
+CHUNKED_FORMAT_NAME = 'float32-le-chunked'  # 分块压缩记录的格式名称
+CHUNKED_DATA_SUFFIX = '.f32z'  # 分块压缩数据文件后缀
+CHUNK_MAGIC = b'WFCK'  # 每块头部的标识
+CHUNK_HEADER = struct.Struct('<4sIII')  # 块头部：标识、压缩后字节数、帧数、压缩数据的 CRC32
+
+CODECS = {
+    "zlib": (lambda data, level: zlib.compress(data, level), zlib.decompress),
+    "lzma": (lambda data, level: lzma.compress(data, preset=level), lzma.decompress),
+    "bz2": (lambda data, level: bz2.compress(data, max(1, level)), bz2.decompress),
+}  # 编码名称 -> (压缩函数, 解压函数)，均为标准库实现
+PREPROCESSORS = ("none", "delta", "shuffle", "delta+shuffle")  # 支持的预处理
+EXECUTORS = ("thread", "process")  # 支持的并行压缩方式
+
+
+def _check_options(codec, preprocess):
+    """
+    检查压缩编码和预处理名称。
+
+    :param codec: 压缩编码名称。
+    :param preprocess: 预处理名称。
+    :raises ValueError: 当名称未知时抛出异常。
+    """
+    if codec not in CODECS:
+        raise ValueError(f'未知的压缩编码: {codec}，可选: {", ".join(CODECS)}')
+    if preprocess not in PREPROCESSORS:
+        raise ValueError(f'未知的预处理: {preprocess}，可选: {", ".join(PREPROCESSORS)}')
+
+
+def encode_chunk(samples, codec, level, preprocess):
+    """
+    预处理并压缩一块样本。
+
+    delta 对 float32 的位模式（按 uint32）沿时间轴做差分，取模回绕，可以精确还原；
+    shuffle 把每个样本的 4 个字节按字节位置分组存放，符号和指数字节集中在一起，更容易压缩。
+
+    :param samples: float32 样本数组，形状为 (帧数,) 或 (帧数, 通道数)。
+    :param codec: 压缩编码名称。
+    :param level: 压缩级别。
+    :param preprocess: 预处理名称。
+    :return: 压缩后的字节串。
+    """
+    data = np.ascontiguousarray(samples, dtype=SAMPLE_DTYPE).view('<u4')
+    if preprocess in ("delta", "delta+shuffle"):
+        delta = np.empty_like(data)
+        delta[:1] = data[:1]
+        np.subtract(data[1:], data[:-1], out=delta[1:])
+        data = delta
+    if preprocess in ("shuffle", "delta+shuffle"):
+        data = data.view(np.uint8).reshape(-1, SAMPLE_DTYPE.itemsize).T.copy()
+    return CODECS[codec][0](data.tobytes(), level)
+
+
+def decode_chunk(payload, frames, channels, codec, preprocess):
+    """
+    解压一块样本并还原预处理，是 encode_chunk() 的逆过程。
+
+    :param payload: 压缩后的字节串。
+    :param frames: 帧数。
+    :param channels: 通道数。
+    :param codec: 压缩编码名称。
+    :param preprocess: 预处理名称。
+    :return: float32 样本数组，多通道时形状为 (帧数, 通道数)。
+    """
+    raw = np.frombuffer(CODECS[codec][1](payload), dtype=np.uint8)
+    if preprocess in ("shuffle", "delta+shuffle"):
+        raw = raw.reshape(SAMPLE_DTYPE.itemsize, -1).T.copy()
+    data = raw.view('<u4').reshape((frames, channels) if channels > 1 else frames)
+    if preprocess in ("delta", "delta+shuffle"):
+        data = np.cumsum(data, axis=0, dtype=np.uint32)
+    return data.view(SAMPLE_DTYPE)
+
+
+def make_executor(workers=SAVE_COMPRESSION_WORKERS, executor=SAVE_COMPRESSION_EXECUTOR):
+    """
+    创建并行压缩用的线程池或进程池，可以在多个 ChunkedRecordingWriter 之间共用。
+
+    :param workers: 工作线程（进程）数，None 表示 CPU 核数。
+    :param executor: thread 或 process。
+    :return: concurrent.futures 执行器，用完后应调用其 shutdown()。
+    :raises ValueError: 当并行方式未知时抛出异常。
+    """
+    workers = workers or os.cpu_count() or 1
+    if executor == "thread":
+        return ThreadPoolExecutor(workers, thread_name_prefix='compress')
+    if executor == "process":
+        return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+    raise ValueError(f'未知的并行压缩方式: {executor}，可选: {", ".join(EXECUTORS)}')
+
+
+class ChunkedRecordingWriter(RecordingWriter):
+    """
+    分块压缩的波形记录写入器，接口与 RecordingWriter 相同。
+
+    样本流按 chunk_samples 帧切成定长块，每块经过可选的预处理后交给线程池或进程池压缩，
+    压缩完成的块按顺序追加到 .f32z 数据文件。每块前有 16 字节头部（标识、压缩后字节数、帧数、CRC32），
+    元数据的 chunks 列表记录每块头部在文件中的偏移、压缩后字节数和帧数，
+    读取任意时间范围时只需解压覆盖该范围的块。记录异常中断、元数据未更新时，读取器按块头部重建块表。
+
+    等待压缩的块数超过 2 倍工作数时 write() 会等待最早的块完成，内存占用有上限。
+    write() 返回后传入的数组即可复用（样本已复制到块缓冲区）。
+
+    :param path: 记录的基本路径。
+    :param sample_rate: 采样率（Hz）。
+    :param device_info: 设备信息字典。
+    :param start_time: 记录起始时间（Unix 时间戳）。
+    :param channels: 通道数。
+    :param codec: 压缩编码：zlib、lzma 或 bz2。
+    :param level: 压缩级别。
+    :param preprocess: 预处理：none、delta、shuffle 或 delta+shuffle。
+    :param chunk_samples: 每块的帧数。
+    :param executor: 共用的执行器（见 make_executor()），为 None 时按配置创建一个线程池，关闭记录时一并关闭。
+    :param summary: 是否生成摘要索引（见 RecordingWriter）。
+    """
+
+    format_name = CHUNKED_FORMAT_NAME
+    data_suffix = CHUNKED_DATA_SUFFIX
+
+    def __init__(self, path, sample_rate, device_info=None, start_time=None, channels=1, codec="zlib",
+                 level=SAVE_COMPRESSION_LEVEL, preprocess=SAVE_PREPROCESS, chunk_samples=SAVE_CHUNK_SAMPLES,
+                 executor=None, summary=SAVE_SUMMARY):
+        """
+        初始化 ChunkedRecordingWriter 类，创建数据文件并写入初始元数据。
+
+        :param path: 记录的基本路径。
+        :param sample_rate: 采样率（Hz）。
+        :param device_info: 设备信息字典。
+        :param start_time: 记录起始时间（Unix 时间戳）。
+        :param channels: 通道数。
+        :param codec: 压缩编码。
+        :param level: 压缩级别。
+        :param preprocess: 预处理。
+        :param chunk_samples: 每块的帧数。
+        :param executor: 共用的执行器，为 None 时自行创建线程池。
+        :param summary: 是否生成摘要索引。
+        :raises ValueError: 当压缩编码或预处理未知时抛出异常。
+        """
+        _check_options(codec, preprocess)
+        self.codec = codec  # 压缩编码
+        self.level = level  # 压缩级别
+        self.preprocess = preprocess  # 预处理
+        self.chunk_samples = max(1, int(chunk_samples))  # 每块的帧数
+        self.own_executor = executor is None  # 执行器是否由本对象创建
+        self.executor = make_executor(executor="thread") if executor is None else executor
+        self.max_in_flight = 2 * getattr(self.executor, '_max_workers', os.cpu_count() or 1)  # 最多等待压缩的块数
+        self.in_flight = deque()  # 等待压缩完成的 (future, 帧数)，按块顺序排列
+        self.chunks = []  # 块表：[头部偏移, 压缩后字节数, 帧数]
+        self.file_offset = 0  # 数据文件当前长度
+        super().__init__(path, sample_rate, device_info, start_time, channels, summary)
+        self.metadata["compression"] = {
+            "codec": codec,
+            "level": level,
+            "preprocess": preprocess,
+            "chunk_samples": self.chunk_samples,
+            "compressed_bytes": 0,  # 数据文件字节数（含块头部）
+        }
+        self.metadata["chunks"] = self.chunks
+        self._write_metadata()
+        shape = self.chunk_samples if self.channels == 1 else (self.chunk_samples, self.channels)
+        self.chunk = np.empty(shape, dtype=SAMPLE_DTYPE)  # 正在填充的块
+        self.fill = 0  # 当前块已填充的帧数
+
+    def write(self, samples):
+        """
+        追加一块样本，填满的块交给执行器压缩。
+
+        :param samples: 样本数组，多通道时形状为 (样本数, channels)。
+        :raises ValueError: 当样本的通道数与记录不一致时抛出异常。
+        """
+        samples = np.asarray(samples, dtype=SAMPLE_DTYPE)
+        if (samples.shape[1] if samples.ndim > 1 else 1) != self.channels:
+            raise ValueError(f'样本通道数与记录不一致: {samples.shape}, 记录为 {self.channels} 通道')
+        if self.channels == 1:
+            samples = samples.reshape(-1)
+        offset = 0
+        while offset < len(samples):
+            count = min(self.chunk_samples - self.fill, len(samples) - offset)
+            self.chunk[self.fill:self.fill + count] = samples[offset:offset + count]
+            self.fill += count
+            offset += count
+            if self.fill == self.chunk_samples:
+                self._submit()
+        self.sample_count += len(samples)
+        if self.summary is not None:
+            self.summary.update(samples)
+
+    def _submit(self):
+        """
+        把当前块交给执行器压缩，换一个新的块缓冲区，并写出已完成的块。
+        """
+        chunk, frames = self.chunk[:self.fill], self.fill
+        future = self.executor.submit(encode_chunk, chunk, self.codec, self.level, self.preprocess)
+        self.in_flight.append((future, frames))
+        self.chunk = np.empty_like(self.chunk)
+        self.fill = 0
+        self._drain()
+
+    def _drain(self, wait_all=False):
+        """
+        按块顺序写出已压缩完成的块；等待的块过多或 wait_all 为 True 时等待最早的块完成。
+
+        :param wait_all: 是否等待并写出所有块。
+        """
+        while self.in_flight and (wait_all or len(self.in_flight) > self.max_in_flight or self.in_flight[0][0].done()):
+            future, frames = self.in_flight.popleft()
+            payload = future.result()
+            self.data_file.write(CHUNK_HEADER.pack(CHUNK_MAGIC, len(payload), frames, zlib.crc32(payload)))
+            self.data_file.write(payload)
+            self.chunks.append([self.file_offset, len(payload), frames])
+            self.file_offset += CHUNK_HEADER.size + len(payload)
+
+    def close(self):
+        """
+        压缩并写出剩余的样本，关闭数据文件并更新元数据中的样本数和块表。
+        """
+        if self.data_file.closed:
+            return
+        try:
+            if self.fill:
+                self._submit()
+            self._drain(wait_all=True)
+        finally:
+            if self.own_executor:
+                self.executor.shutdown()
+            self.metadata["compression"]["compressed_bytes"] = self.file_offset
+            super().close()
+
+    def compression_ratio(self):
+        """
+        :return: 原始样本字节数与压缩后字节数之比，尚未写出任何块时为 None。
+        """
+        written = sum(frames for _, _, frames in self.chunks) * self.channels * SAMPLE_DTYPE.itemsize
+        return written / self.file_offset if self.file_offset else None
+
+
+class ChunkedRecordingReader(RecordingReader):
+    """
+    分块压缩记录读取器，接口与 RecordingReader 相同。
+
+    read() 根据块表只解压覆盖所请求范围的块，最近解压的一块会被缓存，顺序读取小块时不会重复解压。
+    元数据中的块表不完整（记录异常中断）时，按数据文件中的块头部重建块表，截断或损坏的末尾块被忽略。
+
+    :param path: 记录的基本路径或任一记录文件路径。
+    """
+
+    def __init__(self, path):
+        """
+        初始化 ChunkedRecordingReader 类，读取元数据和块表。
+
+        :param path: 记录的基本路径或任一记录文件路径。
+        :raises ValueError: 当记录格式不受支持时抛出异常。
+        """
+        self.data_path, self.meta_path = recording_paths(path, CHUNKED_DATA_SUFFIX)
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            self.metadata = json.load(f)
+        if self.metadata.get("format") != CHUNKED_FORMAT_NAME:
+            raise ValueError(f'不支持的记录格式: {self.metadata.get("format")}')
+
+        self.sample_rate = self.metadata["sample_rate"]  # 采样率
+        self.channels = self.metadata.get("channels", 1)  # 通道数
+        self.start_time = self.metadata["start_time"]  # 起始时间
+        self.device_info = self.metadata.get("device_info", {})  # 设备信息
+        self.gaps = self.metadata.get("gaps", [])  # 丢失样本的位置，元素为 [样本偏移, 丢失样本数]
+        compression = self.metadata["compression"]
+        _check_options(compression["codec"], compression["preprocess"])
+        self.codec = compression["codec"]  # 压缩编码
+        self.preprocess = compression["preprocess"]  # 预处理
+        self.chunk_samples = compression["chunk_samples"]  # 每块的帧数
+        self.chunks = self.metadata.get("chunks", [])  # 块表：[头部偏移, 压缩后字节数, 帧数]
+        end = self.chunks[-1][0] + CHUNK_HEADER.size + self.chunks[-1][1] if self.chunks else 0
+        if end != os.path.getsize(self.data_path) or \
+                sum(frames for _, _, frames in self.chunks) != self.metadata.get("sample_count"):
+            self.chunks = self._scan_chunks()  # 记录未正常关闭
+        self.sample_count = sum(frames for _, _, frames in self.chunks)
+        self._cache = (None, None)  # 最近解压的 (块序号, 样本)
+
+    def _scan_chunks(self):
+        """
+        按块头部扫描数据文件，重建块表。
+
+        :return: 块表。
+        """
+        chunks = []
+        size = os.path.getsize(self.data_path)
+        offset = 0
+        with open(self.data_path, 'rb') as f:
+            while offset + CHUNK_HEADER.size <= size:
+                f.seek(offset)
+                magic, length, frames, _ = CHUNK_HEADER.unpack(f.read(CHUNK_HEADER.size))
+                if magic != CHUNK_MAGIC or offset + CHUNK_HEADER.size + length > size:
+                    break
+                chunks.append([offset, length, frames])
+                offset += CHUNK_HEADER.size + length
+        return chunks
+
+    def read_chunk(self, index):
+        """
+        解压一块样本，并校验 CRC32。
+
+        :param index: 块序号。
+        :return: float32 样本数组。
+        :raises ValueError: 当块数据损坏时抛出异常。
+        """
+        if self._cache[0] == index:
+            return self._cache[1]
+        offset, length, frames = self.chunks[index]
+        with open(self.data_path, 'rb') as f:
+            f.seek(offset)
+            magic, _, _, crc = CHUNK_HEADER.unpack(f.read(CHUNK_HEADER.size))
+            payload = f.read(length)
+        if magic != CHUNK_MAGIC or zlib.crc32(payload) != crc:
+            raise ValueError(f'记录第 {index} 块数据损坏: {self.data_path}')
+        samples = decode_chunk(payload, frames, self.channels, self.codec, self.preprocess)
+        self._cache = (index, samples)
+        return samples
+
+    def read(self, start, count):
+        """
+        读取从 start 开始的 count 个样本，只解压覆盖该范围的块。
+
+        :param start: 起始样本序号。
+        :param count: 样本数，超出记录末尾的部分会被截断。
+        :return: float32 样本数组（副本），多通道时形状为 (样本数, channels)。
+        """
+        start = max(0, start)
+        stop = min(start + max(0, count), self.sample_count)
+        if stop <= start:
+            shape = (0,) if self.channels == 1 else (0, self.channels)
+            return np.empty(shape, dtype=SAMPLE_DTYPE)
+        first, last = start // self.chunk_samples, (stop - 1) // self.chunk_samples
+        parts = [self.read_chunk(index) for index in range(first, last + 1)]
+        data = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        offset = first * self.chunk_samples
+        return np.array(data[start - offset:stop - offset])
@@ -1,6 +1,47 @@
 VENDOR_ID = 0x1234 # 设备的供应商 ID 和产品 ID
 SHOW_CONNECTION_INFO = True  # 是否显示连接信息
-QUEUE_MAXLEN = 10000  # 缓存队列长度
+QUEUE_MAXLEN = 524288  # 环形缓冲区长度（样本数），约 1 秒的数据
 X_AXIS_RANGE = 500  # x 轴范围
 Y_AXIS_RANGE = (-10, 10)  # y 轴范围
 SAMPLE_RATE = 512000  # 采样率
+USB_TRANSFER_SIZE = 65536  # 单次批量传输请求的字节数（向上取整为 wMaxPacketSize 的整数倍）
+USB_TRANSFER_QUEUE_DEPTH = 4  # 传输缓冲区池大小，解码滞后时最多可缓存的已完成传输数
+SAVE_BLOCK_SIZE = 65536  # 保存时写入线程每次处理的样本块大小
+FFT_SIZE = 8192  # 频谱 FFT 长度
+FFT_WINDOW = 'hann'  # 频谱窗函数：rectangular、hann、flattop、blackmanharris
+FFT_AVERAGING = 'none'  # 频谱平均模式：none、linear、exponential、peak、welch
+FFT_AVERAGE_COUNT = 8  # 参与平均的帧数或 Welch 分段数
+FFT_OVERLAP = 0.5  # Welch 分段重叠比例
+BLIT_RENDERING = True  # 绘图时缓存静态背景，只重绘曲线和文字
+WATERFALL_FFT_SIZE = 1024  # 瀑布图每列的 FFT 长度
+WATERFALL_HOP = 16384  # 瀑布图相邻两列之间的样本间隔
+WATERFALL_HISTORY = 300  # 瀑布图保留的列数（历史深度）
+WATERFALL_DB_RANGE = (-100, 0)  # 瀑布图颜色映射范围（dB）
+METRICS_WINDOW = 2.0  # 运行指标（速率、耗时）的滑动窗口长度（秒）
+RING_BLOCK_TIMEOUT = 2.0  # block 溢出策略下写入方等待落后消费者的最长时间（秒）
+SAVE_OVERFLOW_POLICY = 'drop'  # 保存落后时的策略：drop（记录缺口）、block（阻塞采集）、spill（暂存到磁盘，无损）
+USB_SEQUENCE_COUNTER = False  # 设备的每个数据包是否以 32 位小端序号开头，启用后检查序号连续性
+USB_CHANNELS = 1  # 设备每帧交织的通道数，数据流按 (样本数, 通道数) 解码
+ACQUISITION_PROCESS = False  # 是否在独立进程中运行读取器，样本经共享内存环形缓冲区传给 GUI 和保存器
+SAVE_ROOT = None  # 保存面板目录树的根目录，None 表示程序所在目录；文件系统模型只监视该目录
+TRIGGER_MODE = 'off'  # 触发模式：off（自由运行）、auto（超时无触发时自由运行）、normal（只在触发时刷新）、single（触发一次后停止）
+TRIGGER_EDGE = 'rising'  # 触发边沿：rising、falling
+TRIGGER_LEVEL = 0.0  # 触发电平
+TRIGGER_HYSTERESIS = 0.1  # 触发迟滞：上升沿需先低于 电平-迟滞 才能再次触发，下降沿对称
+TRIGGER_POSITION = 0.5  # 触发点在时域窗口中的位置（之前为预触发样本）
+TRIGGER_AUTO_TIMEOUT = 0.2  # auto 模式下超过该时间（秒）没有触发则自由运行
+SAVE_COMPRESSION = None  # 保存时的压缩编码：None（不压缩，写 .f32）、zlib、lzma、bz2（分块压缩，写 .f32z）
+SAVE_COMPRESSION_LEVEL = 1  # 压缩级别，级别越高压缩率越高、速度越慢
+SAVE_PREPROCESS = 'shuffle'  # 压缩前的预处理：none、delta、shuffle、delta+shuffle
+SAVE_CHUNK_SAMPLES = 65536  # 压缩记录每块的样本数（帧数），随机读取时以块为单位解压
+SAVE_COMPRESSION_WORKERS = None  # 并行压缩的工作线程（进程）数，None 表示 CPU 核数
+SAVE_COMPRESSION_EXECUTOR = 'thread'  # 并行压缩方式：thread（zlib、lzma、bz2 压缩时释放 GIL）或 process
+SAVE_SUMMARY = True  # 记录时是否同时生成多分辨率摘要索引（<name>.sum），用于快速浏览长记录
+SUMMARY_BLOCK = 4096  # 摘要索引最细一级每个桶的样本数（帧数）
+SUMMARY_FACTOR = 16  # 摘要索引相邻两级的桶大小之比
+ANALYSIS_WORKERS = None  # 离线批量分析的工作进程数，None 表示 CPU 核数
+ANALYSIS_SEGMENTS = 64  # 离线分析每次读取并批量计算的 Welch 分段数
+ANALYSIS_THUMBNAIL_SIZE = (480, 240)  # 离线分析缩略图的尺寸（像素）
+FILTER_CHAIN = None  # 读取器与显示、保存之间的流式滤波链，None 表示不滤波，例如 "dc,notch:50,decimate:16"（见 dsp_filter.parse_filter_chain）
+FILTER_TAPS_PER_PHASE = 24  # 抽取滤波器每个多相分支的抽头数，总抽头数为 该值 × 抽取倍数 + 1
+FILTER_TRANSITION = 0.8  # 抽取滤波器默认截止频率占输出奈奎斯特频率的比例
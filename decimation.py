@@ -0,0 +1,79 @@
+import numpy as np
+
+
+class EnvelopeDecimator:
+    """
+    最小/最大值包络抽取器，用于绘制大量样本的时域波形。
+
+    将数据窗口均分为若干个桶，每个桶输出最小值和最大值两个点，
+    因此即使只剩约 2 倍像素宽度的点数，单个样本的尖峰仍然可见。
+    桶的边界和输出数组按 (样本数, 桶数, 通道数) 缓存，只有其中之一改变时才重新分配。
+    多通道数据（形状为 (样本数, 通道数)）沿第 0 轴一次性抽取所有通道。
+
+    :param bucket_count: 桶的数量，通常取绘图区域的像素宽度。
+    """
+
+    def __init__(self, bucket_count):
+        """
+        初始化 EnvelopeDecimator 类。
+
+        :param bucket_count: 桶的数量。
+        """
+        self.bucket_count = max(1, int(bucket_count))
+        self._sample_count = None  # 当前缓存对应的样本数
+        self._channel_shape = ()  # 当前缓存对应的通道维度
+        self._starts = None  # 每个桶的起始下标
+        self.x = None  # 输出的 x 坐标（样本序号）
+        self.y = None  # 输出的 y 坐标（交替的最小值和最大值）
+        self._min = None
+        self._max = None
+
+    def set_bucket_count(self, bucket_count):
+        """
+        修改桶的数量，下一次抽取时重新分桶。
+
+        :param bucket_count: 桶的数量。
+        """
+        bucket_count = max(1, int(bucket_count))
+        if bucket_count != self.bucket_count:
+            self.bucket_count = bucket_count
+            self._sample_count = None
+
+    def needs_decimation(self, sample_count):
+        """
+        判断给定样本数是否需要抽取。
+
+        :param sample_count: 样本数。
+        :return: 样本数超过 2 倍桶数时返回 True。
+        """
+        return sample_count > 2 * self.bucket_count
+
+    def _rebin(self, sample_count, channel_shape=()):
+        """
+        根据样本数和通道维度重新计算桶边界和输出数组。
+
+        :param sample_count: 样本数。
+        :param channel_shape: 通道维度，单通道为 ()，多通道为 (通道数,)。
+        """
+        self._sample_count = sample_count
+        self._channel_shape = channel_shape
+        self._starts = np.linspace(0, sample_count, self.bucket_count + 1).astype(np.intp)[:-1]
+        self.x = np.repeat(self._starts, 2).astype(np.float64)
+        self.y = np.empty((2 * self.bucket_count,) + channel_shape)
+        self._min = np.empty((self.bucket_count,) + channel_shape)
+        self._max = np.empty((self.bucket_count,) + channel_shape)
+
+    def decimate(self, data):
+        """
+        对数据做最小/最大值抽取。
+
+        :param data: 样本数组，形状为 (样本数,) 或 (样本数, 通道数)，样本数应大于 2 倍桶数。
+        :return: (x, y)，x 长度为 2 倍桶数，y 的第 0 轴长度为 2 倍桶数；返回的数组在下一次调用时会被覆盖。
+        """
+        if len(data) != self._sample_count or data.shape[1:] != self._channel_shape:
+            self._rebin(len(data), data.shape[1:])
+        np.minimum.reduceat(data, self._starts, axis=0, out=self._min)
+        np.maximum.reduceat(data, self._starts, axis=0, out=self._max)
+        self.y[0::2] = self._min
+        self.y[1::2] = self._max
+        return self.x, self.y
@@ -0,0 +1,412 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from config import FILTER_TAPS_PER_PHASE, FILTER_TRANSITION
+from spectrum import make_window
+
+FILTER_STAGES = ("lowpass", "highpass", "bandpass", "iir-lowpass", "iir-highpass", "iir-bandpass", "notch", "dc",
+                 "decimate")  # 支持的滤波级，用法见 parse_filter_chain()
+DEFAULT_FIR_TAPS = 255  # 不抽取的 FIR 滤波器默认阶数（抽头数）
+DEFAULT_Q = 0.7071  # IIR 低通、高通的默认品质因数（Butterworth）
+DEFAULT_NOTCH_Q = 30.0  # 陷波器的默认品质因数
+DEFAULT_DC_CUTOFF = 1.0  # 去直流高通的默认截止频率（Hz）
+IIR_BLOCK = 4096  # IIR 滤波器批量 FFT 卷积的子块长度（样本数）
+
+
+def design_lowpass(cutoff, sample_rate, taps):
+    """
+    用加窗 sinc 法设计线性相位 FIR 低通滤波器，窗函数为 Blackman-Harris（旁瓣约 -92 dB）。
+
+    :param cutoff: 截止频率（Hz，-6 dB 点）。
+    :param sample_rate: 采样率（Hz）。
+    :param taps: 抽头数，取奇数时群时延为整数个样本。
+    :return: float64 系数数组，直流增益为 1。
+    :raises ValueError: 当截止频率不在 (0, 奈奎斯特频率) 内时抛出异常。
+    """
+    if not 0 < cutoff < sample_rate / 2:
+        raise ValueError(f'截止频率必须在 0 到 {sample_rate / 2:g} Hz 之间: {cutoff:g}')
+    taps = max(1, int(taps))
+    window = make_window("blackmanharris", max(taps - 1, 1))
+    window = np.append(window, window[0])[:taps]  # 周期窗补上末尾样本，得到对称窗
+    n = np.arange(taps) - (taps - 1) / 2
+    coefficients = np.sinc(2 * cutoff / sample_rate * n) * window
+    return coefficients / coefficients.sum()
+
+
+def design_highpass(cutoff, sample_rate, taps):
+    """
+    用谱反转由 FIR 低通得到 FIR 高通滤波器。
+
+    :param cutoff: 截止频率（Hz）。
+    :param sample_rate: 采样率（Hz）。
+    :param taps: 抽头数，会被调整为奇数。
+    :return: float64 系数数组。
+    """
+    taps = int(taps) | 1
+    coefficients = -design_lowpass(cutoff, sample_rate, taps)
+    coefficients[taps // 2] += 1
+    return coefficients
+
+
+def design_bandpass(low, high, sample_rate, taps):
+    """
+    用两个 FIR 低通之差设计 FIR 带通滤波器，并把中心频率处的增益归一化为 1。
+
+    :param low: 下截止频率（Hz）。
+    :param high: 上截止频率（Hz）。
+    :param sample_rate: 采样率（Hz）。
+    :param taps: 抽头数。
+    :return: float64 系数数组。
+    :raises ValueError: 当截止频率不满足 0 < low < high < 奈奎斯特频率时抛出异常。
+    """
+    if not 0 < low < high:
+        raise ValueError(f'带通的下截止频率必须小于上截止频率: {low:g}, {high:g}')
+    coefficients = design_lowpass(high, sample_rate, taps) - design_lowpass(low, sample_rate, taps)
+    center = (low + high) / 2 / sample_rate
+    gain = abs(np.sum(coefficients * np.exp(-2j * np.pi * center * np.arange(len(coefficients)))))
+    return coefficients / gain
+
+
+def design_biquad(kind, frequency, sample_rate, q):
+    """
+    按 RBJ Audio EQ Cookbook 设计二阶 IIR 滤波器（biquad）。
+
+    :param kind: lowpass、highpass、bandpass（中心频率处增益为 1）或 notch。
+    :param frequency: 截止频率或中心频率（Hz）。
+    :param sample_rate: 采样率（Hz）。
+    :param q: 品质因数。
+    :return: (b, a)，a[0] 已归一化为 1。
+    :raises ValueError: 当频率或品质因数无效时抛出异常。
+    """
+    if not 0 < frequency < sample_rate / 2:
+        raise ValueError(f'频率必须在 0 到 {sample_rate / 2:g} Hz 之间: {frequency:g}')
+    if q <= 0:
+        raise ValueError(f'品质因数必须为正数: {q:g}')
+    omega = 2 * np.pi * frequency / sample_rate
+    cos, alpha = np.cos(omega), np.sin(omega) / (2 * q)
+    if kind == "lowpass":
+        b = [(1 - cos) / 2, 1 - cos, (1 - cos) / 2]
+    elif kind == "highpass":
+        b = [(1 + cos) / 2, -(1 + cos), (1 + cos) / 2]
+    elif kind == "bandpass":
+        b = [alpha, 0.0, -alpha]
+    elif kind == "notch":
+        b = [1.0, -2 * cos, 1.0]
+    else:
+        raise ValueError(f'未知的 biquad 类型: {kind}')
+    a = np.array([1 + alpha, -2 * cos, 1 - alpha])
+    return np.array(b) / a[0], a / a[0]
+
+
+def design_dc_blocker(cutoff, sample_rate):
+    """
+    设计去直流的一阶 IIR 高通滤波器 y[n] = x[n] - x[n-1] + r·y[n-1]。
+
+    :param cutoff: 截止频率（Hz）。
+    :param sample_rate: 采样率（Hz）。
+    :return: (b, a)。
+    :raises ValueError: 当截止频率无效时抛出异常。
+    """
+    if not 0 < cutoff < sample_rate / 2:
+        raise ValueError(f'截止频率必须在 0 到 {sample_rate / 2:g} Hz 之间: {cutoff:g}')
+    r = np.exp(-2 * np.pi * cutoff / sample_rate)
+    return np.array([1.0, -1.0, 0.0]), np.array([1.0, -r, 0.0])
+
+
+class FIRFilter:
+    """
+    流式 FIR 滤波器，可同时按整数倍抽取。
+
+    保存上一块末尾的 taps-1 个输入样本，逐块滤波的结果与一次滤波整个信号相同，块边界没有失真。
+    抽取时只计算保留下来的输出样本（多相抽取），计算量为不抽取时的 1/decimation；
+    输出样本对应的输入位置跨块连续，块长度不必是抽取倍数的整数倍。
+    第一块之前的历史样本取第一个样本的值（而不是 0），直流分量不会在开头产生阶跃。
+
+    :param coefficients: 滤波器系数。
+    :param channels: 通道数。
+    :param decimation: 抽取倍数，1 表示不抽取。
+    """
+
+    def __init__(self, coefficients, channels=1, decimation=1):
+        """
+        初始化 FIRFilter 类。
+
+        :param coefficients: 滤波器系数。
+        :param channels: 通道数。
+        :param decimation: 抽取倍数。
+        """
+        self.coefficients = np.asarray(coefficients, dtype=np.float64)
+        self.reversed = self.coefficients[::-1].copy()  # 与滑动窗口按时间顺序相乘的系数
+        self.channels = int(channels)
+        self.decimation = max(1, int(decimation))
+        self.reset()
+
+    def reset(self):
+        """
+        清除历史样本和抽取相位，在输入不连续时调用。
+        """
+        self.history = None  # 上一块末尾的 taps-1 个样本，形状为 (taps-1, channels)
+        self.phase = 0  # 本块中第一个输出样本对应的输入下标
+
+    def process(self, samples):
+        """
+        滤波（并抽取）一块样本。
+
+        :param samples: 样本数组，形状为 (样本数, channels)。
+        :return: float64 输出数组，形状为 (输出样本数, channels)。
+        """
+        samples = np.asarray(samples, dtype=np.float64).reshape(-1, self.channels)
+        if len(samples) == 0:
+            return samples.copy()  # 前一级抽取后可能没有输出样本
+        taps = len(self.coefficients)
+        if self.history is None:
+            self.history = np.repeat(samples[:1], taps - 1, axis=0)
+        data = np.concatenate((self.history, samples))
+        if self.decimation == 1:
+            output = np.empty((len(samples), self.channels))
+            for channel in range(self.channels):
+                output[:, channel] = np.convolve(data[:, channel], self.coefficients, mode='valid')
+        else:
+            # 第 k 个输出使用 data[j:j + taps]，j = phase + k * decimation，只取出需要的窗口
+            windows = sliding_window_view(data, taps, axis=0)[self.phase::self.decimation]
+            output = windows @ self.reversed
+        self.history = data[len(data) - (taps - 1):]
+        self.phase = (self.phase - len(samples)) % self.decimation
+        return output
+
+
+class IIRFilter:
+    """
+    流式二阶（或一阶）IIR 滤波器，差分方程为 y[n] = b0·x[n] + b1·x[n-1] + b2·x[n-2] - a1·y[n-1] - a2·y[n-2]。
+
+    不逐样本循环：先算出前馈部分 v = b * x（带上一块末尾的两个输入），再把 v 切成 IIR_BLOCK 长的子块，
+    所有子块一次批量 FFT 卷积反馈部分的冲激响应（截断到子块长度），得到各子块的零状态响应；
+    前一子块末尾的两个输出通过两个预先算好的初始条件响应叠加上去，子块之间只传递这两个值。
+    冲激响应由极点的闭式解得到，子块内只需要子块长度那么长，因此结果是精确的（只有浮点舍入误差），
+    窄带陷波器的极点很靠近单位圆也不需要截断。计算量与块长成线性关系，读取落后时的大块不会更慢。
+    第一块之前按第一个样本的稳态初始化。
+
+    :param b: 前馈系数 (b0, b1, b2)。
+    :param a: 反馈系数 (1, a1, a2)。
+    :param channels: 通道数。
+    :raises ValueError: 当滤波器不稳定时抛出异常。
+    """
+
+    def __init__(self, b, a, channels=1):
+        """
+        初始化 IIRFilter 类。
+
+        :param b: 前馈系数。
+        :param a: 反馈系数。
+        :param channels: 通道数。
+        :raises ValueError: 当滤波器不稳定时抛出异常。
+        """
+        self.b = np.asarray(b, dtype=np.float64)
+        self.a = np.asarray(a, dtype=np.float64)
+        self.channels = int(channels)
+        if self.a[2] == 0:
+            self.poles = np.array([-self.a[1]], dtype=np.complex128)
+        else:
+            self.poles = np.roots(self.a).astype(np.complex128)
+        if np.any(np.abs(self.poles) >= 1):
+            raise ValueError(f'IIR 滤波器不稳定，极点: {self.poles}')
+        self.dc_gain = self.b.sum() / self.a.sum()  # 直流增益，用于稳态初始化
+        self.kernels = {}  # 子块长度 -> (冲激响应的频谱, y[-1] 的初始条件响应, y[-2] 的初始条件响应)
+        self.reset()
+
+    def reset(self):
+        """
+        清除滤波器状态，在输入不连续时调用。
+        """
+        self.x_history = None  # 上一块末尾的两个输入 (x[-2], x[-1])
+        self.y_history = None  # 上一块末尾的两个输出 (y[-2], y[-1])
+
+    def impulse_response(self, count):
+        """
+        反馈部分 1 / (1 + a1·z^-1 + a2·z^-2) 的前 count 个冲激响应样本。
+
+        :param count: 样本数。
+        :return: float64 数组。
+        """
+        n = np.arange(count)
+        if len(self.poles) == 1:
+            return np.real(self.poles[0] ** n)
+        p1, p2 = self.poles
+        if abs(p1 - p2) < 1e-9:
+            return np.real((n + 1) * p1 ** n)  # 重极点
+        return np.real((p1 ** (n + 1) - p2 ** (n + 1)) / (p1 - p2))
+
+    def kernel(self, block):
+        """
+        子块长度为 block 时的卷积核，按长度缓存。
+
+        零输入时，初始输出 y[-1]、y[-2] 等效于输入 e[0] = -a1·y[-1] - a2·y[-2]、e[1] = -a2·y[-1]，
+        其响应为 e 与冲激响应 h 的卷积。
+
+        :param block: 子块长度。
+        :return: (h 的 rfft（长度 2·block）, y[-1] 为 1 时的响应, y[-2] 为 1 时的响应)。
+        """
+        if block not in self.kernels:
+            h = self.impulse_response(block)
+            delayed = np.concatenate(([0.0], h[:-1]))
+            self.kernels[block] = (np.fft.rfft(h, 2 * block), -self.a[1] * h - self.a[2] * delayed, -self.a[2] * h)
+        return self.kernels[block]
+
+    def process(self, samples):
+        """
+        滤波一块样本。
+
+        :param samples: 样本数组，形状为 (样本数, channels)。
+        :return: float64 输出数组，形状与输入相同。
+        """
+        samples = np.asarray(samples, dtype=np.float64).reshape(-1, self.channels)
+        count = len(samples)
+        if count == 0:
+            return samples.copy()
+        if self.x_history is None:
+            self.x_history = np.repeat(samples[:1], 2, axis=0)
+            self.y_history = self.x_history * self.dc_gain
+        data = np.concatenate((self.x_history, samples))
+        block = min(IIR_BLOCK, 1 << (count - 1).bit_length())
+        blocks = -(-count // block)
+        forward = np.zeros((blocks * block, self.channels))
+        forward[:count] = self.b[0] * data[2:] + self.b[1] * data[1:-1] + self.b[2] * data[:-2]
+        spectrum, response_1, response_2 = self.kernel(block)
+        forward = forward.reshape(blocks, block, self.channels)
+        output = np.fft.irfft(np.fft.rfft(forward, 2 * block, axis=1) * spectrum[:, None], 2 * block, axis=1)[:, :block]
+        # 依次传递子块之间的状态：每个子块之前的 y[-1]、y[-2]
+        state_1 = np.empty((blocks, self.channels))
+        state_2 = np.empty((blocks, self.channels))
+        state_2[0], state_1[0] = self.y_history
+        for k in range(1, blocks):
+            tail = output[k - 1, -2:] + state_1[k - 1] * response_1[-2:, None] + state_2[k - 1] * response_2[-2:, None]
+            state_2[k], state_1[k] = tail
+        output += state_1[:, None] * response_1[:, None] + state_2[:, None] * response_2[:, None]
+        output = output.reshape(-1, self.channels)[:count]
+        self.x_history = data[-2:]
+        self.y_history = np.concatenate((self.y_history, output))[-2:]
+        return output
+
+
+class FilterChain:
+    """
+    按顺序串联的流式滤波级，逐块处理多通道样本，各级的状态跨块保留。
+
+    :param stages: 滤波级列表，每级为 (名称, FIRFilter 或 IIRFilter, 该级之后的采样率)。
+    :param sample_rate: 输入采样率（Hz）。
+    :param channels: 通道数。
+    """
+
+    def __init__(self, stages, sample_rate, channels=1):
+        """
+        初始化 FilterChain 类。
+
+        :param stages: 滤波级列表。
+        :param sample_rate: 输入采样率（Hz）。
+        :param channels: 通道数。
+        """
+        self.stages = stages
+        self.input_rate = sample_rate  # 输入采样率
+        self.channels = channels  # 通道数
+        self.decimation = int(np.prod([getattr(stage, 'decimation', 1) for _, stage, _ in stages]))  # 总抽取倍数
+        self.output_rate = (sample_rate // self.decimation if sample_rate % self.decimation == 0
+                            else sample_rate / self.decimation)  # 输出采样率，能整除时保持整数
+
+    def reset(self):
+        """
+        清除所有级的状态，在输入不连续时调用。
+        """
+        for _, stage, _ in self.stages:
+            stage.reset()
+
+    def process(self, samples):
+        """
+        依次通过所有滤波级。
+
+        :param samples: 样本数组，形状为 (样本数,) 或 (样本数, channels)。
+        :return: float32 输出数组，单通道时为一维数组，多通道时形状为 (输出样本数, channels)。
+        """
+        data = np.asarray(samples).reshape(-1, self.channels)
+        for _, stage, _ in self.stages:
+            data = stage.process(data)
+        data = data.astype(np.float32)
+        return data[:, 0] if self.channels == 1 else data
+
+    def describe(self):
+        """
+        :return: 可读的滤波链说明，例如 "dc > lowpass (255 taps) > decimate x16 -> 32000 Hz"。
+        """
+        parts = []
+        for name, stage, _ in self.stages:
+            if name == "decimate":
+                parts.append(f'decimate x{stage.decimation} ({len(stage.coefficients)} taps)')
+            elif isinstance(stage, FIRFilter):
+                parts.append(f'{name} ({len(stage.coefficients)} taps)')
+            else:
+                parts.append(name)
+        return ' > '.join(parts) + f' -> {self.output_rate:g} Hz'
+
+
+def parse_filter_chain(spec, sample_rate, channels=1):
+    """
+    按文本说明构造滤波链。各级用逗号分隔，参数用冒号分隔，频率单位为 Hz，
+    每级的频率相对于该级的输入采样率（即前面各级抽取之后的采样率）检查：
+
+        lowpass:F[:TAPS]            FIR 低通（线性相位）
+        highpass:F[:TAPS]           FIR 高通
+        bandpass:F1:F2[:TAPS]       FIR 带通
+        iir-lowpass:F[:Q]           二阶 IIR 低通
+        iir-highpass:F[:Q]          二阶 IIR 高通
+        iir-bandpass:F1:F2          二阶 IIR 带通，中心频率 sqrt(F1·F2)
+        notch:F[:Q]                 二阶 IIR 陷波器
+        dc[:F]                      一阶 IIR 去直流（默认 1 Hz）
+        decimate:M[:CUTOFF]         抗混叠 FIR 低通（默认截止为输出奈奎斯特频率的 FILTER_TRANSITION 倍）后按 M 倍抽取
+
+    例如 "dc,notch:50,decimate:16" 把 512 kHz 的信号去直流、滤除 50 Hz 工频后降到 32 kHz。
+
+    :param spec: 滤波链说明。
+    :param sample_rate: 输入采样率（Hz）。
+    :param channels: 通道数。
+    :return: FilterChain 实例。
+    :raises ValueError: 当说明无法解析或参数无效时抛出异常。
+    """
+    stages = []
+    rate = sample_rate
+    for text in spec.split(','):
+        name, *args = [part.strip() for part in text.strip().split(':')]
+        if name not in FILTER_STAGES:
+            raise ValueError(f'未知的滤波级: {name}，可选: {", ".join(FILTER_STAGES)}')
+        try:
+            values = [float(arg) for arg in args]
+        except ValueError:
+            raise ValueError(f'滤波级参数必须是数字: {text}')
+        expected = {"bandpass": (2, 3), "iir-bandpass": (2, 2), "dc": (0, 1)}.get(name, (1, 2))
+        if not expected[0] <= len(values) <= expected[1]:
+            raise ValueError(f'滤波级 {name} 需要 {expected[0]} 到 {expected[1]} 个参数: {text}')
+        if name == "decimate":
+            factor = int(values[0])
+            if factor < 1 or factor != values[0]:
+                raise ValueError(f'抽取倍数必须是正整数: {values[0]:g}')
+            cutoff = values[1] if len(values) > 1 else FILTER_TRANSITION * rate / factor / 2
+            stage = FIRFilter(design_lowpass(cutoff, rate, FILTER_TAPS_PER_PHASE * factor + 1), channels, factor)
+            rate /= factor
+        elif name in ("lowpass", "highpass"):
+            taps = int(values[1]) if len(values) > 1 else DEFAULT_FIR_TAPS
+            design = design_lowpass if name == "lowpass" else design_highpass
+            stage = FIRFilter(design(values[0], rate, taps), channels)
+        elif name == "bandpass":
+            taps = int(values[2]) if len(values) > 2 else DEFAULT_FIR_TAPS
+            stage = FIRFilter(design_bandpass(values[0], values[1], rate, taps), channels)
+        elif name == "iir-bandpass":
+            low, high = values
+            if not 0 < low < high:
+                raise ValueError(f'带通的下截止频率必须小于上截止频率: {low:g}, {high:g}')
+            center = np.sqrt(low * high)
+            stage = IIRFilter(*design_biquad("bandpass", center, rate, center / (high - low)), channels)
+        elif name == "dc":
+            stage = IIRFilter(*design_dc_blocker(values[0] if values else DEFAULT_DC_CUTOFF, rate), channels)
+        else:
+            kind = "notch" if name == "notch" else name[len("iir-"):]
+            q = values[1] if len(values) > 1 else (DEFAULT_NOTCH_Q if kind == "notch" else DEFAULT_Q)
+            stage = IIRFilter(*design_biquad(kind, values[0], rate, q), channels)
+        stages.append((name, stage, rate))
+    return FilterChain(stages, sample_rate, channels)
@@ -0,0 +1,185 @@
+import time
+import numpy as np
+from threading import Thread, Event
+from config import QUEUE_MAXLEN
+from ring_buffer import RingBuffer, BufferedReader
+from dsp_filter import parse_filter_chain
+
+
+class FilteredConsumer:
+    """
+    滤波后样本的消费者，由 FilteredReader.add_consumer() 创建。
+
+    除输出缓冲区本身溢出错过的样本外，read() 还报告滤波线程读取数据源时丢失的样本（换算为输出样本数）。
+    数据源的缺口在对应的输出位置报告：read() 在缺口处截断，缺口之后的样本留到下一次 read() 返回，
+    保存器因此把缺口记录在记录中的准确位置。
+
+    :param reader: 所属的 FilteredReader。
+    :param consumer: 输出缓冲区上的 RingConsumer。
+    """
+
+    def __init__(self, reader, consumer):
+        """
+        初始化 FilteredConsumer 类。
+
+        :param reader: 所属的 FilteredReader。
+        :param consumer: 输出缓冲区上的 RingConsumer。
+        """
+        self.reader = reader
+        self.consumer = consumer
+        self.cursor = consumer.cursor  # 下一个要返回的样本的绝对序号
+        self.missed = 0  # 累计错过的样本数
+        self.pending = None  # 缺口之后尚未返回的样本
+        # 注册之前的缺口与本消费者无关
+        self.next_gap = sum(1 for position, _ in list(reader.gaps) if position <= self.cursor)
+
+    def read(self, max_count=None):
+        """
+        读取新样本，读到数据源的缺口时截断。
+
+        :param max_count: 最多读取的样本数，为 None 时读取全部。
+        :return: (新样本数组, 自上次读取以来错过的样本数，包括数据源的缺口)。
+        """
+        if self.pending is not None:
+            start, data, missed = self.cursor, self.pending, 0
+            if max_count is not None:
+                data = data[:max_count]
+            self.pending = self.pending[len(data):] if len(self.pending) > len(data) else None
+        else:
+            data, missed = self.consumer.read(max_count)
+            start = self.consumer.cursor - len(data)
+        gaps = self.reader.gaps
+        while self.next_gap < len(gaps):
+            position, count = gaps[self.next_gap]
+            if position <= start:
+                missed += count
+                self.next_gap += 1
+            elif position < start + len(data):
+                rest = data[position - start:]
+                self.pending = rest if self.pending is None else np.concatenate((rest, self.pending))
+                data = data[:position - start]
+                break
+            else:
+                break
+        self.cursor = start + len(data)
+        self.missed += missed
+        return data, missed
+
+    def close(self):
+        """
+        注销输出缓冲区上的消费者。
+        """
+        self.consumer.close()
+
+
+class FilteredReader(BufferedReader, Thread):
+    """
+    滤波读取器类，位于读取器的环形缓冲区与 GUI、保存器之间，把样本流逐块滤波、抽取后写入自己的环形缓冲区。
+
+    本线程作为数据源的一个消费者读取新样本，经 FilterChain 处理后写入输出缓冲区；
+    接口与 USBReader 相同，采样率为抽取后的采样率，因此绘图、频谱和保存都以降低后的速率运行。
+    滤波器状态跨块保留，块边界没有失真。本线程在数据源上的溢出策略为 policy：block 和 spill 下
+    不丢样本，保存器使用这两种策略时应与之一致；drop 下本线程落后时数据源会丢弃样本，
+    此时滤波器状态被清除（计数器 filter_resets），缺口按输出样本数记入 gaps，
+    并由 add_consumer() 返回的消费者在对应位置报告。运行指标与数据源共享，滤波耗时记为 filter。
+
+    :param source: 被滤波的读取器。
+    :param spec: 滤波链说明，见 dsp_filter.parse_filter_chain()。
+    :param policy: 读取数据源的溢出策略：drop、block 或 spill，见 RingConsumer。
+    :param poll_interval: 没有新样本时的等待时间（秒）。
+    """
+
+    def __init__(self, source, spec, policy="drop", poll_interval=0.005):
+        """
+        初始化 FilteredReader 类。
+
+        :param source: 被滤波的读取器。
+        :param spec: 滤波链说明。
+        :param policy: 读取数据源的溢出策略。
+        :param poll_interval: 没有新样本时的等待时间（秒）。
+        :raises ValueError: 当滤波链说明无效时抛出异常。
+        """
+        super().__init__(daemon=True)
+        self.source = source  # 被滤波的读取器
+        self.spec = spec  # 滤波链说明
+        self.channels = getattr(source, 'channels', 1)  # 通道数
+        self.chain = parse_filter_chain(spec, source.sample_rate, self.channels)  # 滤波链
+        self.sample_rate = self.chain.output_rate  # 抽取后的采样率
+        self.poll_interval = poll_interval
+        self.metrics = source.metrics  # 运行指标，与数据源共享
+        self.data_buffer = RingBuffer(QUEUE_MAXLEN, metrics=self.metrics, channels=self.channels)  # 滤波后的样本
+        self.gaps = []  # 数据源的缺口，元素为 (缺口之后第一个输出样本的序号, 丢失的输出样本数)，只追加
+        # 在数据源启动之前注册，第一块样本也会被滤波
+        self.consumer = source.add_consumer("filter", policy)
+        self.stop_event = Event()  # 停止事件
+
+    def start(self):
+        """
+        启动数据源和滤波线程。
+        """
+        self.source.start()
+        super().start()
+
+    def run(self):
+        """
+        线程的主运行函数，读取数据源的新样本，滤波后写入输出缓冲区；数据源结束后处理完剩余样本再退出。
+        """
+        try:
+            while not self.stop_event.is_set():
+                source_alive = self.source.is_alive()
+                data, missed = self.consumer.read()
+                if missed:
+                    self.chain.reset()
+                    self.metrics.increment("filter_resets")
+                    lost = max(1, round(missed / self.chain.decimation))
+                    self.gaps.append((self.data_buffer.get_cursor(), lost))
+                if len(data):
+                    filter_start = time.perf_counter()
+                    output = self.chain.process(data)
+                    self.metrics.add_time("filter", time.perf_counter() - filter_start)
+                    if len(output):
+                        self.data_buffer.write(output)
+                elif not source_alive:
+                    break
+                else:
+                    time.sleep(self.poll_interval)
+        finally:
+            self.consumer.close()
+
+    def stop(self):
+        """
+        停止数据源和滤波线程。
+        """
+        self.source.stop()
+        self.stop_event.set()
+
+    def join(self, timeout=None):
+        """
+        等待滤波线程和数据源结束。
+
+        :param timeout: 每个线程的最长等待时间（秒）。
+        """
+        super().join(timeout)
+        self.source.join(timeout)
+
+    def add_consumer(self, name, policy="drop"):
+        """
+        注册一个读取滤波后新样本的消费者，错过的样本数包括数据源的缺口。
+
+        :param name: 消费者名称。
+        :param policy: 输出缓冲区的溢出策略：drop、block 或 spill，见 RingConsumer。
+        :return: FilteredConsumer 实例，用完后应调用其 close()。
+        """
+        return FilteredConsumer(self, self.data_buffer.add_consumer(name, policy))
+
+    def get_device_info(self):
+        """
+        获取数据源的设备信息，并附加滤波链和输出采样率。
+
+        :return: 包含设备信息的字典。
+        """
+        info = dict(self.source.get_device_info())
+        info["filter"] = self.chain.describe()  # 滤波链
+        info["source_sample_rate"] = self.source.sample_rate  # 滤波前的采样率
+        info["sample_rate"] = self.sample_rate  # 抽取后的采样率
+        return info
@@ -1,10 +1,13 @@
 from PySide6 import QtWidgets, QtCore
-from .plot_canvas import PlotCanvas
 from .connection_info_widget import ConnectionInfoWidget
 from .waveform_save_panel import WaveformSavePanel
-from config import X_AXIS_RANGE, Y_AXIS_RANGE
+from .processing_worker import ProcessingWorker, FrameProcessor
+from config import X_AXIS_RANGE, Y_AXIS_RANGE, FFT_WINDOW, FFT_AVERAGING, TRIGGER_MODE, TRIGGER_EDGE, TRIGGER_LEVEL
+from spectrum import WINDOW_COEFFICIENTS, AVERAGING_MODES
+from trigger import TRIGGER_MODES, TRIGGER_EDGES
 from waveform_saver import WaveformSaver
 import os
+import time
 
 class AppWindow(QtWidgets.QMainWindow):
     """
@@ -13,17 +16,24 @@ class AppWindow(QtWidgets.QMainWindow):
     :param reader: 一个数据读取器对象，必须实现 `get_data()` 和 `get_speed()` 方法。
     :param use_simulated_signal: 布尔值，指示是否使用模拟信号。
     :param show_connection_info: 布尔值，指示是否显示设备连接信息面板。
+    :param start_time: 程序启动时刻（time.perf_counter()），用于统计启动耗时，为 None 时从创建窗口开始计时。
+
+    绘图画布（Matplotlib）在窗口第一次显示之后才创建，窗口先以占位标签显示；
+    启动耗时（窗口显示、画布就绪、第一帧绘制）记录在 startup 字典中，并在第一帧之后打印一次。
     """
     
-    def __init__(self, reader, use_simulated_signal, show_connection_info):
+    def __init__(self, reader, use_simulated_signal, show_connection_info, start_time=None):
         """
         初始化 AppWindow 类。
 
         :param reader: 一个数据读取器对象，必须实现 `get_data()` 和 `get_speed()` 方法。
         :param use_simulated_signal: 布尔值，指示是否使用模拟信号。
         :param show_connection_info: 布尔值，指示是否显示设备连接信息面板。
+        :param start_time: 程序启动时刻（time.perf_counter()），为 None 时从创建窗口开始计时。
         """
         super().__init__()
+        self.start_time = time.perf_counter() if start_time is None else start_time
+        self.startup = {}  # 启动各阶段相对 start_time 的耗时（秒）：window_shown、plot_ready、first_frame
         self.reader = reader
         self.use_simulated_signal = use_simulated_signal
         self.show_connection_info = show_connection_info
@@ -78,6 +88,34 @@ class AppWindow(QtWidgets.QMainWindow):
         self.controls_layout.addWidget(self.y_max_input)
         self.controls_layout.addWidget(self.update_button)
 
+        # 频谱窗函数和平均模式
+        self.window_combo = QtWidgets.QComboBox()
+        self.window_combo.addItems(list(WINDOW_COEFFICIENTS))
+        self.window_combo.setCurrentText(FFT_WINDOW)
+        self.window_combo.currentTextChanged.connect(self.change_spectrum_window)
+        self.averaging_combo = QtWidgets.QComboBox()
+        self.averaging_combo.addItems(list(AVERAGING_MODES))
+        self.averaging_combo.setCurrentText(FFT_AVERAGING)
+        self.averaging_combo.currentTextChanged.connect(self.change_spectrum_averaging)
+        self.controls_layout.addWidget(QtWidgets.QLabel('Window:'))
+        self.controls_layout.addWidget(self.window_combo)
+        self.controls_layout.addWidget(QtWidgets.QLabel('Averaging:'))
+        self.controls_layout.addWidget(self.averaging_combo)
+
+        # 时域触发控制放在第二行：模式、边沿、电平，single 模式下用 Arm 重新布防
+        self.trigger_mode_combo = QtWidgets.QComboBox()
+        self.trigger_mode_combo.addItems(list(TRIGGER_MODES))
+        self.trigger_mode_combo.setCurrentText(TRIGGER_MODE)
+        self.trigger_mode_combo.currentTextChanged.connect(self.update_trigger)
+        self.trigger_edge_combo = QtWidgets.QComboBox()
+        self.trigger_edge_combo.addItems(list(TRIGGER_EDGES))
+        self.trigger_edge_combo.setCurrentText(TRIGGER_EDGE)
+        self.trigger_edge_combo.currentTextChanged.connect(self.update_trigger)
+        self.trigger_level_input = QtWidgets.QLineEdit(str(TRIGGER_LEVEL))
+        self.trigger_level_input.editingFinished.connect(self.update_trigger)
+        self.arm_button = QtWidgets.QPushButton('Arm')
+        self.arm_button.clicked.connect(self.arm_trigger)
+
         self.simulated_signal_checkbox = QtWidgets.QCheckBox('Use Simulated Signal')
         self.simulated_signal_checkbox.setChecked(self.use_simulated_signal)
         self.simulated_signal_checkbox.stateChanged.connect(self.toggle_simulated_signal)
@@ -85,16 +123,38 @@ class AppWindow(QtWidgets.QMainWindow):
 
         self.right_layout.addWidget(self.controls_widget)
 
-        # 绘图画布
-        self.canvas = PlotCanvas(self)
-        self.right_layout.addWidget(self.canvas, 1)  # 添加拉伸因子
+        self.trigger_controls_widget = QtWidgets.QWidget()
+        self.trigger_controls_widget.setSizePolicy(QtWidgets.QSizePolicy.Preferred, QtWidgets.QSizePolicy.Fixed)
+        self.trigger_controls_layout = QtWidgets.QHBoxLayout(self.trigger_controls_widget)
+        self.trigger_controls_layout.setContentsMargins(5, 0, 5, 5)
+        self.trigger_controls_layout.setSpacing(5)
+        self.trigger_controls_layout.addWidget(QtWidgets.QLabel('Trigger:'))
+        self.trigger_controls_layout.addWidget(self.trigger_mode_combo)
+        self.trigger_controls_layout.addWidget(QtWidgets.QLabel('Edge:'))
+        self.trigger_controls_layout.addWidget(self.trigger_edge_combo)
+        self.trigger_controls_layout.addWidget(QtWidgets.QLabel('Level:'))
+        self.trigger_controls_layout.addWidget(self.trigger_level_input)
+        self.trigger_controls_layout.addWidget(self.arm_button)
+        self.trigger_controls_layout.addStretch(1)
+        self.right_layout.addWidget(self.trigger_controls_widget)
+
+        # 绘图画布在窗口显示后由 init_plot() 创建，此前显示占位标签
+        self.canvas = None
+        self.plot_placeholder = QtWidgets.QLabel('Loading plots...')
+        self.plot_placeholder.setAlignment(QtCore.Qt.AlignCenter)
+        self.right_layout.addWidget(self.plot_placeholder, 1)  # 添加拉伸因子
 
         self.main_layout.addWidget(self.right_widget)
 
-        # 启动定时器定期更新图表
-        self.timer = QtCore.QTimer(self)
-        self.timer.timeout.connect(self.update_plot)
-        self.timer.start(50)
+        # 在独立线程中定期计算绘图帧，GUI 线程只负责绘制；帧计算不依赖画布，可以先于画布启动
+        self.processor = FrameProcessor(self.reader.sample_rate, X_AXIS_RANGE, self.reader.metrics,
+                                        getattr(self.reader, 'channels', 1))
+        self.processing_thread = QtCore.QThread(self)
+        self.processing_worker = ProcessingWorker(self.reader, self.processor, interval=50)
+        self.processing_worker.moveToThread(self.processing_thread)
+        self.processing_thread.started.connect(self.processing_worker.run)
+        self.processing_worker.frame_ready.connect(self.update_plot)
+        self.processing_thread.start()
 
         # 保存面板
         self.save_panel = WaveformSavePanel()
@@ -102,10 +162,47 @@ class AppWindow(QtWidgets.QMainWindow):
         self.save_panel.setSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Preferred)
         self.main_layout.addWidget(self.save_panel)
 
+        # 定期刷新保存进度和运行指标
+        self.progress_timer = QtCore.QTimer(self)
+        self.progress_timer.timeout.connect(self.update_save_progress)
+        if self.show_connection_info:
+            self.progress_timer.timeout.connect(self.update_metrics)
+        self.progress_timer.start(500)
+
+    def showEvent(self, event):
+        """
+        窗口第一次显示后，在事件循环的下一轮创建绘图画布。
+
+        :param event: 窗口显示事件。
+        """
+        super().showEvent(event)
+        if "window_shown" not in self.startup:
+            self.startup["window_shown"] = time.perf_counter() - self.start_time
+            QtCore.QTimer.singleShot(0, self.init_plot)
+
+    def init_plot(self):
+        """
+        导入 Matplotlib 并创建绘图画布，替换占位标签，然后应用控制面板中的坐标轴范围。
+        """
+        if self.canvas is not None:
+            return
+        from .plot_canvas import PlotCanvas
+
+        self.canvas = PlotCanvas(self, processor=self.processor, sample_rate=self.reader.sample_rate,
+                                 metrics=self.reader.metrics)
+        self.right_layout.replaceWidget(self.plot_placeholder, self.canvas)
+        self.plot_placeholder.deleteLater()
+        self.plot_placeholder = None
+        self.update_ranges()
+        self.startup["plot_ready"] = time.perf_counter() - self.start_time
+        self.update_plot()  # 处理线程在等待 GUI 取走画布创建之前的帧，不会再发出信号
+
     def update_ranges(self):
         """
         更新绘图的 X 和 Y 轴范围，根据用户输入的值进行设置。
         """
+        if self.canvas is None:
+            return
         x_range = int(self.x_range_input.text())
         y_min = float(self.y_min_input.text())
         y_max = float(self.y_max_input.text())
@@ -113,33 +210,99 @@ class AppWindow(QtWidgets.QMainWindow):
         self.canvas.set_x_axis_range(x_range)
         self.canvas.set_y_axis_range(y_min, y_max)
 
+    def change_spectrum_window(self, window):
+        """
+        切换频谱窗函数。
+
+        :param window: 窗函数名称。
+        """
+        self.processor.set_window(window)
+
+    def change_spectrum_averaging(self, mode):
+        """
+        切换频谱平均模式。
+
+        :param mode: 平均模式名称。
+        """
+        self.processor.set_averaging(mode)
+
+    def update_trigger(self):
+        """
+        按控制面板中的触发模式、边沿和电平更新时域触发设置。
+        """
+        try:
+            level = float(self.trigger_level_input.text())
+        except ValueError:
+            QtWidgets.QMessageBox.warning(self, "警告", "触发电平必须是数字")
+            return
+        self.processor.set_trigger(mode=self.trigger_mode_combo.currentText(),
+                                   edge=self.trigger_edge_combo.currentText(), level=level)
+        if self.canvas is not None:
+            self.canvas.update_trigger_markers()
+
+    def arm_trigger(self):
+        """
+        重新布防时域触发，single 模式下等待下一次触发。
+        """
+        self.processor.arm_trigger()
+
     def toggle_simulated_signal(self, state):
         print(f"Simulated signal {'enabled' if state == QtCore.Qt.Checked else 'disabled'}")
 
 
     def update_plot(self):
         """
-        定时更新绘图，获取新数据并刷新图表显示。
+        取走处理线程计算好的最新帧并刷新图表显示。
+
+        画布创建之前帧留在处理线程中（后续帧与它合并，single 模式的触发窗口不会丢失），
+        画布创建后立即取走。
+        """
+        if self.canvas is None:
+            return
+        frame = self.processing_worker.take_frame()
+        if frame is None:
+            return
+        self.canvas.render_frame(frame)
+        if "first_frame" not in self.startup:
+            self.startup["first_frame"] = time.perf_counter() - self.start_time
+            print("Startup: window shown {window_shown:.3f} s, plots ready {plot_ready:.3f} s, "
+                  "first frame {first_frame:.3f} s".format(**self.startup))
+
+    def update_save_progress(self):
+        """
+        刷新保存面板中的保存进度。
+        """
+        if self.waveform_saver.is_saving():
+            self.save_panel.set_progress(self.waveform_saver.get_progress())
+        else:
+            self.save_panel.set_progress(None)
+            error = self.waveform_saver.take_error()
+            if error is not None:
+                QtWidgets.QMessageBox.warning(self, "警告", f"保存失败：{error}")
+
+    def update_metrics(self):
+        """
+        刷新连接信息面板中的运行指标。
         """
-        data = self.reader.get_data()
-        speed = self.reader.get_speed()
-        self.canvas.update_plot(data, speed)
+        self.connection_info_widget.update_metrics(self.reader.metrics.snapshot())
 
-    def save_waveform_data(self, path, filename, record_time):
+    def save_waveform_data(self, path, filename, record_time, file_count, export_to_csv):
         """
-        保存波形数据到指定路径和文件名。
+        保存波形数据到指定路径，按文件数量连续分段记录。
 
         :param path: 保存路径。
-        :param filename: 保存的文件名。
-        :param record_time: 记录时间长度，单位为秒。
+        :param filename: 保存的基本文件名（不含后缀）。
+        :param record_time: 每个文件的记录时间长度，单位为秒。
+        :param file_count: 文件数量。
+        :param export_to_csv: 记录结束后是否额外导出 CSV 文件。
         """
         if self.waveform_saver.is_saving():
             QtWidgets.QMessageBox.warning(self, "警告", "已有保存任务正在进行")
             return
 
-        success = self.waveform_saver.start_saving(path, filename, record_time)
+        success = self.waveform_saver.start_saving(path, filename, record_time, file_count, export_to_csv)
         if success:
-            QtWidgets.QMessageBox.information(self, "信息", f"开始保存波形，时长：{record_time}秒")
+            QtWidgets.QMessageBox.information(self, "信息", f"开始保存波形，共 {file_count} 个文件，每个时长：{record_time}秒")
         else:
             QtWidgets.QMessageBox.warning(self, "警告", "无法开始保存任务")
 
@@ -149,6 +312,9 @@ class AppWindow(QtWidgets.QMainWindow):
 
         :param event: 窗口关闭事件。
         """
+        QtCore.QMetaObject.invokeMethod(self.processing_worker, "stop", QtCore.Qt.BlockingQueuedConnection)
+        self.processing_thread.quit()
+        self.processing_thread.wait()
         self.waveform_saver.stop_saving()
         self.reader.stop()
         event.accept()
@@ -1,8 +1,28 @@
 from PySide6 import QtWidgets
 
+
+def format_metric(name, value):
+    """
+    将一个运行指标格式化为显示文本。
+
+    :param name: 指标名称（见 PipelineMetrics.snapshot()）。
+    :param value: 指标值。
+    :return: 显示文本。
+    """
+    if value is None:
+        return 'N/A'
+    if name == 'bytes_per_s':
+        return f'{value / 1024:.2f} KB/s'
+    if name == 'samples_per_s':
+        return f'{value:.0f} S/s'
+    if name.endswith('_ms'):
+        return f'{value:.2f} ms'
+    return str(value)
+
+
 class ConnectionInfoWidget(QtWidgets.QWidget):
     """
-    设备连接信息显示部件，用于显示和更新 USB 设备的连接信息。
+    设备连接信息显示部件，用于显示和更新 USB 设备的连接信息和运行指标。
 
     :param device_info: 包含设备信息的字典。
     """
@@ -30,8 +50,27 @@ class ConnectionInfoWidget(QtWidgets.QWidget):
             label = QtWidgets.QLabel(f"{key.replace('_', ' ').title()}: {value}")
             layout.addWidget(label)
 
+        # 运行指标，标签在第一次收到对应指标时创建，之后只更新文本
+        layout.addWidget(QtWidgets.QLabel("<b>Pipeline Metrics:</b>"))
+        self.metrics_layout = QtWidgets.QVBoxLayout()
+        layout.addLayout(self.metrics_layout)
+        self.metrics_labels = {}
+
         layout.addStretch()  # 添加弹性空间，将信息顶置
 
+    def update_metrics(self, metrics):
+        """
+        刷新运行指标的显示。
+
+        :param metrics: 指标字典，通常来自 PipelineMetrics.snapshot()。
+        """
+        for key, value in metrics.items():
+            label = self.metrics_labels.get(key)
+            if label is None:
+                label = self.metrics_labels[key] = QtWidgets.QLabel()
+                self.metrics_layout.addWidget(label)
+            label.setText(f"{key.replace('_', ' ').title()}: {format_metric(key, value)}")
+
     def update_info(self, new_info):
         """
         更新设备信息并刷新显示。
@@ -50,3 +89,6 @@ class ConnectionInfoWidget(QtWidgets.QWidget):
             child = self.layout().takeAt(0)  # 移除子项
             if child.widget():
                 child.widget().deleteLater()  # 删除子项部件
+            elif child.layout():
+                for label in self.metrics_labels.values():
+                    label.deleteLater()  # 删除运行指标标签
@@ -2,18 +2,28 @@ import numpy as np
 import time
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-from config import X_AXIS_RANGE, Y_AXIS_RANGE, SAMPLE_RATE
+from config import X_AXIS_RANGE, Y_AXIS_RANGE, SAMPLE_RATE, BLIT_RENDERING, WATERFALL_DB_RANGE
+from spectrogram import WaterfallBuffer
+from .processing_worker import FrameProcessor
 
 class PlotCanvas(FigureCanvas):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, processor=None, sample_rate=SAMPLE_RATE, metrics=None, channels=1):
         self.x_range = X_AXIS_RANGE
-        self.fig = Figure(figsize=(8, 10), dpi=100)
-        self.axes = self.fig.subplots(2, 1)
+        self.fig = Figure(figsize=(8, 12), dpi=100)
+        self.axes = self.fig.subplots(3, 1)
         super(PlotCanvas, self).__init__(self.fig)
         self.setParent(parent)
 
         # Configured sampling rate
-        self.configured_sample_rate = SAMPLE_RATE
+        self.configured_sample_rate = sample_rate
+
+        # Spectrum and envelope computation; may run on a processing thread,
+        # in which case this canvas only renders the frames it produces
+        self.processor = processor or FrameProcessor(self.configured_sample_rate, self.x_range, metrics, channels)
+        self.channels = self.processor.channels
+
+        # Shared pipeline metrics (optional); render time is recorded per frame
+        self.metrics = metrics
 
         # Variables for sampling rate estimation
         self.last_update_time = time.time()
@@ -23,11 +33,28 @@ class PlotCanvas(FigureCanvas):
 
         self.init_time_domain_plot()
         self.init_frequency_domain_plot()
+        self.init_waterfall_plot()
 
         # Create a text object for metrics above the time domain plot, aligned to the left
         self.metrics_text = self.fig.text(0.01, 0.98, '', horizontalalignment='left', verticalalignment='top')
 
-        self.fig.tight_layout(rect=[0, 0.03, 1, 0.97])  # Adjust layout to make room for metrics text
+        # No tight_layout here: the figure is not at its final size yet, and resizeEvent
+        # lays it out (leaving room for the metrics text) once the canvas is placed
+        self.update_decimation()
+
+        # Blit rendering: static parts are cached after every full draw, and each frame
+        # only redraws the animated line and text artists on top of that background
+        self.use_blit = BLIT_RENDERING
+        self.animated_artists = self.time_lines + self.freq_lines + [self.waterfall_image, self.metrics_text, self.max_freq_text, self.trigger_text]
+        for artist in self.animated_artists:
+            artist.set_animated(self.use_blit)
+        self.background = None
+        self.needs_full_draw = True
+        self.mpl_connect('draw_event', self.on_draw)
+
+        # Frame time statistics (exponential moving average, in ms)
+        self.frame_time = None
+        self.full_draw_count = 0
 
     def init_time_domain_plot(self):
         self.axes[0].set_title('Time Domain Signal')
@@ -36,26 +63,115 @@ class PlotCanvas(FigureCanvas):
         self.axes[0].set_xlabel('Sample')
         self.axes[0].set_ylabel('Amplitude')
         self.xdata = np.linspace(0, self.x_range, self.x_range)
-        self.time_line, = self.axes[0].plot(self.xdata, np.zeros(self.x_range), 'r-')
+        # One trace per channel; a single channel keeps the original red trace
+        styles = ['r-'] if self.channels == 1 else ['-'] * self.channels
+        self.time_lines = [self.axes[0].plot(self.xdata, np.zeros(self.x_range), style, label=f'CH{k + 1}')[0]
+                           for k, style in enumerate(styles)]
+        if self.channels > 1:
+            self.axes[0].legend(loc='upper right')
+        # Trigger level and trigger point markers, shown while triggering is enabled
+        self.trigger_state = None
+        self.trigger_level_line = self.axes[0].axhline(0, color='gray', linestyle='--', linewidth=0.8)
+        self.trigger_point_line = self.axes[0].axvline(0, color='gray', linestyle=':', linewidth=0.8)
+        self.trigger_text = self.axes[0].text(0.02, 0.95, '', transform=self.axes[0].transAxes, verticalalignment='top')
+        self.update_trigger_markers()
+
+    def update_trigger_markers(self):
+        # Static artists: a change needs a full redraw to refresh the cached background
+        sweep = self.processor.sweep
+        visible = sweep.mode != 'off'
+        self.trigger_level_line.set_ydata([sweep.trigger.level] * 2)
+        self.trigger_point_line.set_xdata([sweep.pre_samples] * 2)
+        self.trigger_level_line.set_visible(visible)
+        self.trigger_point_line.set_visible(visible)
+        self.needs_full_draw = True
 
     def init_frequency_domain_plot(self):
         self.axes[1].set_title('Frequency Domain Spectrum')
-        self.freq_line, = self.axes[1].plot([], [])
+        engine = self.processor.spectrum_engine
+        self.freq_lines = [self.axes[1].plot(engine.freqs, np.zeros(engine.bin_count), label=f'CH{k + 1}')[0]
+                           for k in range(self.channels)]
+        if self.channels > 1:
+            self.axes[1].legend(loc='upper right')
         self.axes[1].set_xlim(0, self.configured_sample_rate / 2)
         self.axes[1].set_ylim(0, 100)
         self.axes[1].set_xlabel('Frequency (Hz)')
-        self.axes[1].set_ylabel('Magnitude')
+        self.axes[1].set_ylabel('Amplitude')
         self.max_freq_text = self.axes[1].text(0.02, 0.95, '', transform=self.axes[1].transAxes)
 
+    def init_waterfall_plot(self):
+        # Rolling spectrogram; the newest row is at the top
+        stft = self.processor.stft
+        self.waterfall = WaterfallBuffer(self.processor.waterfall_history, stft.bin_count, WATERFALL_DB_RANGE[0])
+        duration = self.waterfall.history * stft.hop / self.configured_sample_rate
+        self.axes[2].set_title('Spectrogram')
+        self.waterfall_image = self.axes[2].imshow(
+            self.waterfall.image, aspect='auto', origin='lower', interpolation='nearest',
+            extent=(0, self.configured_sample_rate / 2, -duration, 0),
+            vmin=WATERFALL_DB_RANGE[0], vmax=WATERFALL_DB_RANGE[1], cmap='viridis')
+        self.axes[2].set_xlabel('Frequency (Hz)')
+        self.axes[2].set_ylabel('Time (s)')
+
+    def samples_needed(self):
+        # Number of latest samples the time and frequency plots need per frame
+        return self.processor.samples_needed()
+
     def update_plot(self, data, speed):
-        self.receive_speed = speed
-        self.estimate_sample_rate(len(data))
-        self.update_time_domain(data)
-        self.update_frequency_domain(data)
+        # Synchronous path: compute and render on the calling thread
+        self.render_frame(self.processor.process(data, speed))
+
+    def render_frame(self, frame):
+        frame_start = time.perf_counter()
+        self.receive_speed = frame["speed"]
+        self.trigger_state = frame.get("trigger_state")
+        self.trigger_text.set_text('' if self.trigger_state in (None, 'off') else f'Trigger: {self.trigger_state}')
+        self.estimate_sample_rate(frame["new_sample_count"])
+        self.update_time_domain(frame)
+        self.update_frequency_domain(frame)
+        self.update_waterfall(frame)
         self.update_metrics_text()
-        self.draw()
+        self.render()
+        self.record_frame_time(time.perf_counter() - frame_start)
+        if self.metrics is not None:
+            self.metrics.add_time("render", time.perf_counter() - frame_start)
+
+    def render(self):
+        if not self.use_blit or self.needs_full_draw or self.background is None:
+            # Full redraw; on_draw recaptures the background afterwards
+            self.needs_full_draw = False
+            self.full_draw_count += 1
+            self.draw()
+            return
+        self.restore_region(self.background)
+        self.draw_animated_artists()
+        self.blit(self.fig.bbox)
+
+    def on_draw(self, event):
+        # Called after every full draw, including resizes triggered by Qt
+        if self.use_blit:
+            self.background = self.copy_from_bbox(self.fig.bbox)
+            self.draw_animated_artists()
+
+    def draw_animated_artists(self):
+        for artist in self.animated_artists:
+            self.fig.draw_artist(artist)
+
+    def record_frame_time(self, seconds):
+        milliseconds = seconds * 1000
+        if self.frame_time is None:
+            self.frame_time = milliseconds
+        else:
+            self.frame_time += (milliseconds - self.frame_time) * 0.1
+
+    def get_frame_stats(self):
+        # Smoothed frame time in ms, the frame rate it allows, and number of full redraws
+        fps = 1000 / self.frame_time if self.frame_time else None
+        return {"frame_time_ms": self.frame_time, "max_fps": fps, "full_draws": self.full_draw_count}
 
     def estimate_sample_rate(self, new_data_count):
+        # Counts only samples that arrived since the previous frame; unknown on the synchronous path
+        if new_data_count is None:
+            return
         current_time = time.time()
         time_diff = current_time - self.last_update_time
         
@@ -69,49 +185,76 @@ class PlotCanvas(FigureCanvas):
     def update_metrics_text(self):
         receive_speed_str = f'{self.receive_speed:.2f}' if self.receive_speed is not None else 'N/A'
         estimated_rate_str = f'{self.estimated_sample_rate:.2f}' if self.estimated_sample_rate is not None else 'N/A'
+        frame_time_str = f'{self.frame_time:.1f}' if self.frame_time is not None else 'N/A'
         
         metrics_str = (
             f'Receive Speed: {receive_speed_str} KB/s   '
             f'Configured Rate: {self.configured_sample_rate:.2f} Hz   '
-            f'Estimated Rate: {estimated_rate_str} Hz'
+            f'Estimated Rate: {estimated_rate_str} Hz   '
+            f'Frame Time: {frame_time_str} ms'
         )
         self.metrics_text.set_text(metrics_str)
 
-    def update_time_domain(self, data):
-        ydata = np.zeros(self.x_range)
-        if len(data) >= self.x_range:
-            ydata[:] = data[-self.x_range:]
-        else:
-            ydata[-len(data):] = data
-        self.time_line.set_ydata(ydata)
+    def update_decimation(self):
+        # Re-bin the envelope to the current pixel width of the time domain axes
+        self.processor.set_bucket_count(self.axes[0].bbox.width)
+
+    def resizeEvent(self, event):
+        super(PlotCanvas, self).resizeEvent(event)
+        self.fig.tight_layout(rect=[0, 0.03, 1, 0.97])  # Three stacked axes need the layout redone per size
+        self.update_decimation()
+
+    def update_time_domain(self, frame):
+        # Skip frames computed before an X range change, and keep the trace while waiting for a trigger
+        if frame["time_y"] is not None and frame["x_range"] == self.x_range:
+            for channel, line in enumerate(self.time_lines):
+                line.set_data(frame["time_x"], frame["time_y"][:, channel])
+
+    def update_frequency_domain(self, frame):
+        if frame["magnitude"] is not None:
+            peaks = frame["peaks"]
+            if len(peaks) == 1:
+                max_freq, max_mag = peaks[0]
+                self.max_freq_text.set_text(f'Max Frequency: {max_freq:.2f} Hz, Mag: {max_mag:.2f}')
+            else:
+                self.max_freq_text.set_text('   '.join(
+                    f'CH{k + 1}: {freq:.2f} Hz, {mag:.2f}' for k, (freq, mag) in enumerate(peaks)))
 
-    def update_frequency_domain(self, data):
-        if len(data) > 0:
-            fft_result = np.fft.fft(data)
-            fft_freq = np.fft.fftfreq(len(data), d=1/self.configured_sample_rate)
-            fft_mag = np.abs(fft_result)
+            for channel, line in enumerate(self.freq_lines):
+                line.set_ydata(frame["magnitude"][:, channel])
+            self.update_spectrum_ylim(max(mag for _, mag in peaks))
 
-            positive_freq_idxs = fft_freq > 0
-            positive_fft_freq = fft_freq[positive_freq_idxs]
-            positive_fft_mag = fft_mag[positive_freq_idxs]
+    def update_waterfall(self, frame):
+        rows = frame.get("waterfall_rows")
+        if rows is not None and len(rows):
+            self.waterfall.push(rows)
+            self.waterfall_image.set_data(self.waterfall.image)
 
-            max_idx = np.argmax(positive_fft_mag)
-            max_freq = positive_fft_freq[max_idx]
-            max_mag = positive_fft_mag[max_idx]
+    def update_spectrum_ylim(self, max_mag):
+        # Hysteresis: only rescale when the peak leaves the top of the axes
+        # or drops below a third of it, so the limits do not change every frame
+        top = self.axes[1].get_ylim()[1]
+        if max_mag > top or max_mag < top / 3:
+            self.axes[1].set_ylim(0, max(max_mag, 1e-6) * 1.5)
+            self.needs_full_draw = True
 
-            self.max_freq_text.set_text(f'Max Frequency: {max_freq:.2f} Hz, Mag: {max_mag:.2f}')
+    def set_spectrum_window(self, window):
+        self.processor.set_window(window)
 
-            self.freq_line.set_data(positive_fft_freq, positive_fft_mag)
-            self.axes[1].set_ylim(0, max_mag * 1.1)
-            self.axes[1].relim()
-            self.axes[1].autoscale_view()
+    def set_spectrum_averaging(self, mode):
+        self.processor.set_averaging(mode)
 
     def set_x_axis_range(self, x_range):
         self.x_range = x_range
+        self.processor.set_x_range(x_range)
         self.axes[0].set_xlim(0, x_range)
         self.xdata = np.linspace(0, x_range, x_range)
-        self.time_line.set_xdata(self.xdata)
-        self.time_line.set_ydata(np.zeros(x_range))
+        for line in self.time_lines:
+            line.set_data(self.xdata, np.zeros(x_range))
+        self.update_decimation()
+        self.update_trigger_markers()
+        self.needs_full_draw = True
 
     def set_y_axis_range(self, y_min, y_max):
-        self.axes[0].set_ylim(y_min, y_max)
\ No newline at end of file
+        self.axes[0].set_ylim(y_min, y_max)
+        self.needs_full_draw = True
\ No newline at end of file
@@ -0,0 +1,299 @@
+import time
+import numpy as np
+from threading import Lock
+from PySide6 import QtCore
+from config import X_AXIS_RANGE, SAMPLE_RATE, WATERFALL_HISTORY
+from spectrum import SpectrumEngine
+from spectrogram import IncrementalSTFT
+from decimation import EnvelopeDecimator
+from trigger import TriggeredSweep
+
+
+class FrameProcessor:
+    """
+    绘图帧计算器，负责频谱计算、瀑布图新列计算和时域波形抽取，不依赖 Qt 和 Matplotlib。
+
+    计算结果打包为一个字典（帧），其中的数组都是副本，可以安全地交给其他线程绘制。
+    配置修改和帧计算由同一把锁保护，GUI 线程可以随时修改配置。
+    每个通道各有一个频谱引擎（平均状态互相独立），时域包络一次抽取所有通道，
+    瀑布图只显示 waterfall_channel 指定的通道。
+    时域图可以按触发对齐（见 trigger.TriggeredSweep），触发设置同样由锁保护。
+
+    :param sample_rate: 采样率（Hz）。
+    :param x_range: 时域图显示的样本数。
+    :param metrics: PipelineMetrics 实例，可选，用于记录频谱计算耗时（fft）。
+    :param channels: 通道数。
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, x_range=X_AXIS_RANGE, metrics=None, channels=1):
+        """
+        初始化 FrameProcessor 类。
+
+        :param sample_rate: 采样率（Hz）。
+        :param x_range: 时域图显示的样本数。
+        :param metrics: PipelineMetrics 实例，可选。
+        :param channels: 通道数。
+        """
+        self.metrics = metrics  # 运行指标
+        self.lock = Lock()  # 保护配置和计算状态
+        self.channels = channels  # 通道数
+        self.spectrum_engines = [SpectrumEngine(sample_rate=sample_rate) for _ in range(channels)]  # 每个通道的频谱计算引擎
+        self.spectrum_engine = self.spectrum_engines[0]  # 第一个通道的引擎，提供频率轴等公共配置
+        self.waterfall_channel = 0  # 瀑布图显示的通道
+        self.decimator = EnvelopeDecimator(x_range)  # 时域包络抽取器，桶数由画布宽度决定，画布创建前不抽取
+        self.stft = IncrementalSTFT(sample_rate=sample_rate)  # 瀑布图的增量 STFT
+        self.waterfall_history = WATERFALL_HISTORY  # 每帧最多需要的瀑布图行数
+        self.x_range = x_range
+        self.xdata = np.linspace(0, x_range, x_range)  # 未抽取时的 x 坐标
+        self.sweep = TriggeredSweep(x_range)  # 时域图的触发
+
+    def samples_needed(self):
+        """
+        :return: 计算一帧所需的最新样本数。
+        """
+        with self.lock:
+            return max(self.x_range, self.spectrum_engine.samples_needed)
+
+    def set_x_range(self, x_range):
+        """
+        修改时域图显示的样本数。
+
+        :param x_range: 样本数。
+        """
+        with self.lock:
+            self.x_range = x_range
+            self.xdata = np.linspace(0, x_range, x_range)
+            self.sweep.x_range = x_range
+            self.sweep.reset()  # 暂存触发点的窗口按旧的样本数计算
+
+    def set_bucket_count(self, bucket_count):
+        """
+        修改时域包络的桶数，通常为绘图区域的像素宽度。
+
+        :param bucket_count: 桶数。
+        """
+        with self.lock:
+            self.decimator.set_bucket_count(bucket_count)
+
+    def set_window(self, window):
+        """
+        切换频谱窗函数。
+
+        :param window: 窗函数名称。
+        """
+        with self.lock:
+            for engine in self.spectrum_engines:
+                engine.set_window(window)
+
+    def set_averaging(self, mode):
+        """
+        切换频谱平均模式。
+
+        :param mode: 平均模式名称。
+        """
+        with self.lock:
+            for engine in self.spectrum_engines:
+                engine.set_averaging(mode)
+
+    def set_trigger(self, mode=None, level=None, edge=None, hysteresis=None, channel=None):
+        """
+        修改时域图的触发设置，为 None 的参数保持不变。修改后重新布防。
+
+        :param mode: 触发模式：off、auto、normal 或 single。
+        :param level: 触发电平。
+        :param edge: 触发边沿：rising 或 falling。
+        :param hysteresis: 迟滞。
+        :param channel: 触发通道。
+        :raises ValueError: 当设置无效时抛出异常。
+        """
+        with self.lock:
+            self.sweep.trigger.configure(level=level, edge=edge, hysteresis=hysteresis, channel=channel)
+            self.sweep.set_mode(self.sweep.mode if mode is None else mode)
+
+    def arm_trigger(self):
+        """
+        重新布防，single 模式下等待下一次触发。
+        """
+        with self.lock:
+            self.sweep.arm()
+
+    def update_trigger(self, new_samples, start, missed=0):
+        """
+        在新样本中查找触发点，决定本帧时域图的窗口。
+
+        :param new_samples: 自上一帧以来新到达的样本。
+        :param start: 新样本第一个样本的绝对序号。
+        :param missed: 新样本之前丢失的样本数，不为 0 时先清除触发状态。
+        :return: (触发状态, 窗口起始序号)，见 TriggeredSweep.update()。
+        """
+        with self.lock:
+            if missed:
+                self.sweep.reset()
+            return self.sweep.update(new_samples, start)
+
+    def process(self, data, speed=None, new_samples=None, trigger_state="off", window=None):
+        """
+        用最新的样本计算一帧。
+
+        :param data: 按时间顺序排列的最新样本，形状为 (样本数,) 或 (样本数, 通道数)。
+        :param speed: 读取器的接收速率（KB/s）。
+        :param new_samples: 自上一帧以来新到达的样本，用于计算瀑布图的新列；为 None 时不更新瀑布图。
+        :param trigger_state: 触发状态，见 TriggeredSweep.update()；waiting 和 stopped 时不更新时域图。
+        :param window: 触发对齐的时域窗口样本（x_range 个），为 None 时时域图显示 data 的最新样本。
+        :return: 帧字典，包含时域曲线、幅度谱、峰值频率、瀑布图新行等，按通道排列在最后一维。
+        """
+        start = time.perf_counter()
+        data = np.asarray(data).reshape(len(data), self.channels)  # 单通道数据也按 (样本数, 1) 处理
+        with self.lock:
+            x_range = self.x_range
+            if window is not None:
+                ydata = np.asarray(window).reshape(len(window), self.channels)
+            elif len(data) >= x_range:
+                ydata = data[len(data) - x_range:]
+            else:
+                ydata = np.zeros((x_range, data.shape[1]), dtype=np.float32)
+                ydata[x_range - len(data):] = data
+            if trigger_state in ("waiting", "stopped") or len(ydata) != x_range:
+                time_x = time_y = None  # 保持上一次的时域显示
+            elif self.decimator.needs_decimation(x_range):
+                time_x, time_y = self.decimator.decimate(ydata)
+                time_x, time_y = time_x.copy(), time_y.copy()
+            else:
+                time_x, time_y = self.xdata, ydata
+
+            fft_start = time.perf_counter()
+            magnitude = None
+            peaks = None
+            if len(data) > 0:
+                magnitude = np.empty((self.spectrum_engine.bin_count, data.shape[1]))
+                peaks = []
+                for channel, engine in enumerate(self.spectrum_engines[:data.shape[1]]):
+                    magnitude[:, channel] = engine.update(data[:, channel])
+                    peaks.append(engine.peak())
+
+        waterfall_rows = None
+        if new_samples is not None:
+            new_samples = np.asarray(new_samples).reshape(len(new_samples), self.channels)[:, self.waterfall_channel]
+            waterfall_rows = self.stft.process(new_samples, max_columns=self.waterfall_history)
+        if self.metrics is not None:
+            self.metrics.add_time("fft", time.perf_counter() - fft_start)
+
+        return {
+            "x_range": x_range,  # 计算时使用的时域样本数
+            "time_x": time_x,  # 时域曲线 x 坐标
+            "time_y": time_y,  # 时域曲线 y 坐标 (点数, 通道数)，保持上一次显示时为 None
+            "trigger_state": trigger_state,  # 触发状态
+            "magnitude": magnitude,  # 幅度谱 (频点数, 通道数)，无数据时为 None
+            "peaks": peaks,  # 每个通道的 (峰值频率, 峰值幅度)，无数据时为 None
+            "waterfall_rows": waterfall_rows,  # 瀑布图新行 (行数, 频点数)，单位 dB
+            "sample_count": len(data),  # 参与计算的样本数
+            "new_sample_count": None if new_samples is None else len(new_samples),  # 自上一帧以来的新样本数，未知时为 None
+            "speed": speed,  # 接收速率（KB/s）
+            "process_time": time.perf_counter() - start  # 计算耗时（秒）
+        }
+
+
+class ProcessingWorker(QtCore.QObject):
+    """
+    运行在独立 QThread 中的处理线程，定时从读取器取数据并计算绘图帧。
+
+    每帧只保留最新的结果：若 GUI 尚未取走上一帧，新帧直接替换它（旧帧被丢弃），
+    并且不会再次发出信号，因此绘图落后时不会在事件队列中堆积帧。
+    被丢弃帧中的瀑布图新行会合并到替换它的帧中，瀑布图不会出现缺口。
+
+    信号:
+        frame_ready(): 有新帧可取时发出，接收方应调用 take_frame() 获取。
+
+    :param reader: 数据读取器，需实现 get_latest()、add_consumer() 和 get_speed() 方法。
+    :param processor: FrameProcessor 实例。
+    :param interval: 计算间隔（毫秒）。
+    """
+
+    frame_ready = QtCore.Signal()
+
+    def __init__(self, reader, processor, interval=50):
+        """
+        初始化 ProcessingWorker 类。
+
+        :param reader: 数据读取器。
+        :param processor: FrameProcessor 实例。
+        :param interval: 计算间隔（毫秒）。
+        """
+        super().__init__()
+        self.reader = reader
+        self.processor = processor
+        self.interval = interval
+        self.timer = None  # 在工作线程中创建
+        self.frame_lock = Lock()  # 保护待取帧
+        self.pending_frame = None  # 尚未被 GUI 取走的最新帧
+        self.dropped_frames = 0  # 被新帧替换而未绘制的帧数
+        self.consumer = None  # 瀑布图读取新样本的环形缓冲区消费者
+
+    @QtCore.Slot()
+    def run(self):
+        """
+        在工作线程启动后调用，创建并启动定时器。
+        """
+        self.timer = QtCore.QTimer()
+        self.timer.timeout.connect(self.process_frame)
+        self.timer.start(self.interval)
+
+    @QtCore.Slot()
+    def stop(self):
+        """
+        停止定时器，需在工作线程中调用。
+        """
+        if self.timer is not None:
+            self.timer.stop()
+        if self.consumer is not None:
+            self.consumer.close()
+            self.consumer = None
+
+    def process_frame(self):
+        """
+        获取最新数据并计算一帧，交给 GUI 线程。
+        """
+        if self.consumer is None:
+            self.consumer = self.reader.add_consumer("waterfall")
+        new_samples, missed = self.consumer.read()
+        if missed:
+            self.processor.stft.reset()  # 样本不连续，丢弃跨越缺口的未完成列
+        x_range = self.processor.x_range
+        trigger_state, window_start = self.processor.update_trigger(
+            new_samples, self.consumer.cursor - len(new_samples), missed)
+        window = None
+        if window_start is not None:
+            # 触发窗口的样本都已到达，从环形缓冲区按绝对序号取出
+            start, window = self.reader.get_range(window_start, window_start + x_range)
+            if start != window_start or len(window) != x_range:
+                trigger_state, window = "waiting", None  # 窗口已被覆盖
+        data = self.reader.get_latest(self.processor.samples_needed())
+        frame = self.processor.process(data, self.reader.get_speed(), new_samples, trigger_state, window)
+        with self.frame_lock:
+            stale = self.pending_frame is not None
+            if stale:
+                self.dropped_frames += 1
+                if self.processor.metrics is not None:
+                    self.processor.metrics.increment("dropped_frames")
+                if frame["time_y"] is None:
+                    # 新帧保持时域显示，沿用被替换帧中的时域曲线，触发窗口不会因此丢失
+                    for key in ("x_range", "time_x", "time_y"):
+                        frame[key] = self.pending_frame[key]
+                previous_rows = self.pending_frame["waterfall_rows"]
+                rows = np.concatenate((previous_rows, frame["waterfall_rows"]))
+                frame["waterfall_rows"] = rows[-self.processor.waterfall_history:]
+                frame["new_sample_count"] += self.pending_frame["new_sample_count"]
+            self.pending_frame = frame
+        if not stale:
+            self.frame_ready.emit()
+
+    def take_frame(self):
+        """
+        取走最新的帧。
+
+        :return: 帧字典，没有新帧时返回 None。
+        """
+        with self.frame_lock:
+            frame = self.pending_frame
+            self.pending_frame = None
+            return frame
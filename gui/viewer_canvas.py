@@ -0,0 +1,129 @@
+import numpy as np
+import time
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+from matplotlib.widgets import SpanSelector
+from decimation import EnvelopeDecimator
+
+MIN_SPAN = 16  # Smallest span (samples) the detail plot zooms into
+ZOOM_STEP = 1.5  # Span change per mouse wheel step
+
+class ViewerCanvas(FigureCanvas):
+    def __init__(self, parent, reader, index):
+        self.fig = Figure(figsize=(8, 8), dpi=100)
+        self.axes = self.fig.subplots(2, 1, gridspec_kw={'height_ratios': [1, 2]})
+        super(ViewerCanvas, self).__init__(self.fig)
+        self.setParent(parent)
+
+        # Recording for full-resolution samples, summary index for everything coarser
+        self.reader = reader
+        self.index = index
+        self.sample_rate = reader.sample_rate
+        self.sample_count = len(reader)
+        self.channels = reader.channels
+        self.decimator = EnvelopeDecimator(1000)
+        self.span = (0, self.sample_count)
+        self.overview_time = None
+        self.detail_time = None
+        self.detail_source = ''
+
+        styles = ['r-'] if self.channels == 1 else ['-'] * self.channels
+        self.overview_lines = [self.axes[0].plot([], [], style, linewidth=0.8)[0] for style in styles]
+        self.detail_lines = [self.axes[1].plot([], [], style, linewidth=0.8, label=f'CH{k + 1}')[0]
+                             for k, style in enumerate(styles)]
+        if self.channels > 1:
+            self.axes[1].legend(loc='upper right')
+        duration = max(self.sample_count, 1) / self.sample_rate
+        self.axes[0].set_title('Overview (drag to select a span)')
+        self.axes[0].set_xlim(0, duration)
+        self.axes[0].set_xlabel('Time (s)')
+        self.axes[1].set_title(' ', fontsize=9)  # Reserve room for the span title in tight_layout
+        self.axes[1].set_xlabel('Time (s)')
+        self.axes[1].set_ylabel('Amplitude')
+        self.span_patch = self.axes[0].axvspan(0, duration, color='tab:blue', alpha=0.15)
+
+        # Dragging on the overview selects the detail span; the wheel zooms the detail plot
+        self.selector = SpanSelector(self.axes[0], self.on_select, 'horizontal', useblit=True,
+                                     props=dict(facecolor='tab:blue', alpha=0.3))
+        self.mpl_connect('scroll_event', self.on_scroll)
+        self.fig.tight_layout()
+
+    def pixel_width(self):
+        # Envelope buckets per plot: one per pixel of the axes
+        return max(1, int(self.axes[1].bbox.width))
+
+    def envelope(self, start, stop, buckets):
+        # Coarse spans come from the summary index; short ones from the recording itself
+        result = self.index.envelope(start, stop, buckets) if self.index.levels else None
+        if result is not None:
+            level, x, minimum, maximum = result
+            y = np.empty((2 * len(x), self.channels))
+            y[0::2] = minimum
+            y[1::2] = maximum
+            source = f'summary level {level} ({self.index.bucket_size(level)} samples/bucket)'
+            return np.repeat(x, 2) / self.sample_rate, y, source
+        data = self.reader.read(start, stop - start).reshape(-1, self.channels)
+        if self.decimator.needs_decimation(len(data)):
+            self.decimator.set_bucket_count(buckets)
+            x, y = self.decimator.decimate(data)
+            x, y = x + start, y.copy()
+        else:
+            x, y = start + np.arange(len(data), dtype=np.float64), data
+        return x / self.sample_rate, y, f'full resolution ({len(data)} samples read)'
+
+    def draw_overview(self):
+        frame_start = time.perf_counter()
+        if self.sample_count:
+            x, y, _ = self.envelope(0, self.sample_count, max(1, int(self.axes[0].bbox.width)))
+            for channel, line in enumerate(self.overview_lines):
+                line.set_data(x, y[:, channel])
+            self.set_ylim(self.axes[0], y)
+        self.overview_time = time.perf_counter() - frame_start
+        self.set_span(*self.span)
+
+    def set_span(self, start, stop):
+        # Clamp to the recording, keeping at least MIN_SPAN samples
+        span = min(max(int(stop - start), MIN_SPAN), max(self.sample_count, MIN_SPAN))
+        start = min(max(int(start), 0), max(self.sample_count - span, 0))
+        self.span = (start, start + span)
+        frame_start = time.perf_counter()
+        if self.sample_count:
+            x, y, self.detail_source = self.envelope(start, start + span, self.pixel_width())
+            for channel, line in enumerate(self.detail_lines):
+                line.set_data(x, y[:, channel])
+            self.set_ylim(self.axes[1], y)
+            stats = self.index.stats(start, start + span) if self.index.levels else None
+        else:
+            stats = None
+        self.detail_time = time.perf_counter() - frame_start
+        self.axes[1].set_xlim(start / self.sample_rate, (start + span) / self.sample_rate)
+        self.span_patch.set_x(start / self.sample_rate)
+        self.span_patch.set_width(span / self.sample_rate)
+        title = f'{start / self.sample_rate:.6f} s to {(start + span) / self.sample_rate:.6f} s'
+        if stats is not None:
+            title += '   ' + '   '.join(f'CH{k + 1} mean {stats["mean"][k]:.4g} rms {stats["rms"][k]:.4g}'
+                                        for k in range(self.channels))
+        self.axes[1].set_title(title, fontsize=9)
+        self.draw_idle()
+
+    def set_ylim(self, axes, y):
+        low, high = float(np.min(y)), float(np.max(y))
+        margin = (high - low) * 0.05 or 1.0
+        axes.set_ylim(low - margin, high + margin)
+
+    def on_select(self, xmin, xmax):
+        self.set_span(round(xmin * self.sample_rate), round(xmax * self.sample_rate))
+
+    def on_scroll(self, event):
+        # Zoom the detail span around the cursor; scrolling up zooms in
+        if event.inaxes is not self.axes[1] or event.xdata is None:
+            return
+        start, stop = self.span
+        center = event.xdata * self.sample_rate
+        scale = 1 / ZOOM_STEP if event.button == 'up' else ZOOM_STEP
+        self.set_span(center - (center - start) * scale, center + (stop - center) * scale)
+
+    def resizeEvent(self, event):
+        super(ViewerCanvas, self).resizeEvent(event)
+        self.fig.tight_layout()
+        self.draw_overview()  # Bucket counts follow the pixel width
@@ -0,0 +1,107 @@
+from PySide6 import QtWidgets
+from .viewer_canvas import ViewerCanvas
+import os
+
+class ViewerWindow(QtWidgets.QMainWindow):
+    """
+    记录浏览窗口，用于查看已保存的长记录。
+
+    上方的概览图由摘要索引绘制整段记录，不读取数据文件；在概览图上拖动选择时间段，
+    下方的详细图显示该时间段，范围足够短时才从记录读取原始样本，否则使用索引中足够细的一级。
+    在详细图上滚动鼠标滚轮可以围绕光标缩放，也可以在控制栏直接输入起始时间和长度。
+
+    :param reader: 记录读取器（见 recording.open_recording()）。
+    :param index: 记录的摘要索引（见 summary_index.open_summary()）。
+    """
+
+    def __init__(self, reader, index):
+        """
+        初始化 ViewerWindow 类。
+
+        :param reader: 记录读取器。
+        :param index: 记录的摘要索引。
+        """
+        super().__init__()
+        self.reader = reader
+        self.index = index
+        self.init_ui()
+
+    def init_ui(self):
+        """
+        初始化用户界面，包括控制栏、绘图画布和状态栏。
+        """
+        self.setWindowTitle(f"Recording Viewer - {os.path.basename(self.reader.data_path)}")
+        self.setGeometry(100, 100, 1200, 800)
+        style_path = os.path.join(os.path.dirname(__file__), 'styles.qss')
+        with open(style_path, 'r') as f:
+            self.setStyleSheet(f.read())
+
+        self.central_widget = QtWidgets.QWidget()
+        self.setCentralWidget(self.central_widget)
+        layout = QtWidgets.QVBoxLayout(self.central_widget)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+
+        # 控制栏：详细图的起始时间和长度（秒）
+        controls_widget = QtWidgets.QWidget()
+        controls_widget.setSizePolicy(QtWidgets.QSizePolicy.Preferred, QtWidgets.QSizePolicy.Fixed)
+        controls_layout = QtWidgets.QHBoxLayout(controls_widget)
+        controls_layout.setContentsMargins(5, 5, 5, 5)
+        controls_layout.setSpacing(5)
+        self.start_input = QtWidgets.QLineEdit('0')
+        self.length_input = QtWidgets.QLineEdit(f'{len(self.reader) / self.reader.sample_rate:g}')
+        self.show_button = QtWidgets.QPushButton('Show')
+        self.show_button.clicked.connect(self.show_span)
+        self.full_button = QtWidgets.QPushButton('Full View')
+        self.full_button.clicked.connect(self.show_full)
+        controls_layout.addWidget(QtWidgets.QLabel('Start (s):'))
+        controls_layout.addWidget(self.start_input)
+        controls_layout.addWidget(QtWidgets.QLabel('Length (s):'))
+        controls_layout.addWidget(self.length_input)
+        controls_layout.addWidget(self.show_button)
+        controls_layout.addWidget(self.full_button)
+        controls_layout.addStretch(1)
+        layout.addWidget(controls_widget)
+
+        self.canvas = ViewerCanvas(self, self.reader, self.index)
+        self.canvas.mpl_connect('draw_event', self.update_status)
+        layout.addWidget(self.canvas, 1)
+
+        self.status_label = QtWidgets.QLabel()
+        self.statusBar().addWidget(self.status_label)
+
+    def show_span(self):
+        """
+        按控制栏中的起始时间和长度显示详细图。
+        """
+        try:
+            start = float(self.start_input.text())
+            length = float(self.length_input.text())
+        except ValueError:
+            QtWidgets.QMessageBox.warning(self, "警告", "起始时间和长度必须是数字")
+            return
+        rate = self.reader.sample_rate
+        self.canvas.set_span(round(start * rate), round((start + length) * rate))
+
+    def show_full(self):
+        """
+        详细图显示整段记录。
+        """
+        self.canvas.set_span(0, len(self.reader))
+
+    def update_status(self, event=None):
+        """
+        每次重绘后刷新控制栏中的时间段和状态栏中的数据来源及耗时。
+
+        :param event: Matplotlib 绘制事件。
+        """
+        start, stop = self.canvas.span
+        rate = self.reader.sample_rate
+        self.start_input.setText(f'{start / rate:g}')
+        self.length_input.setText(f'{(stop - start) / rate:g}')
+        overview = self.canvas.overview_time
+        detail = self.canvas.detail_time
+        self.status_label.setText(
+            f"{len(self.reader)} samples, {self.reader.channels} channel(s), {rate} Hz   |   "
+            f"overview {overview * 1000:.1f} ms   |   detail: {self.canvas.detail_source}, "
+            f"{detail * 1000:.1f} ms" if overview is not None and detail is not None else '')
@@ -1,19 +1,23 @@
 from PySide6 import QtWidgets, QtCore, QtGui
 import os
 import sys
+from config import SAVE_ROOT
 
 class WaveformSavePanel(QtWidgets.QWidget):
     """
     波形保存面板类，用于选择保存路径、输入文件名并设置记录时间，发出保存信号。
 
-    该面板包括一个目录树视图用于选择保存路径，文件名输入框，以及一个记录时间选择器。
-    当用户点击保存按钮时，会发出保存信号，包含路径、文件名和记录时间。
+    该面板包括一个目录树视图用于选择保存路径（只显示 SAVE_ROOT 之下的目录，面板显示后再加载），文件名输入框，一个记录时间选择器，
+    文件数量选择器，是否同时导出 CSV 的选项，以及显示保存进度的进度条。
+    当用户点击保存按钮时，会发出一次保存信号，包含路径、文件名、每个文件的记录时间、
+    文件数量和 CSV 导出选项。
 
     信号:
-        save_signal(str, str, int): 发出保存信号，参数分别为路径、文件名和记录时间长度（秒）。
+        save_signal(str, str, int, int, bool): 发出保存信号，参数分别为路径、基本文件名（不含后缀）、
+        每个文件的记录时间长度（秒）、文件数量和是否导出 CSV。
     """
 
-    save_signal = QtCore.Signal(str, str, int)  # 发送保存信号：路径、文件名、记录时间
+    save_signal = QtCore.Signal(str, str, int, int, bool)  # 发送保存信号：路径、文件名、记录时间、文件数量、是否导出 CSV
 
     def __init__(self):
         """
@@ -28,21 +32,12 @@ class WaveformSavePanel(QtWidgets.QWidget):
         """
         layout = QtWidgets.QVBoxLayout(self)
 
-        # 目录树视图
+        # 目录树视图，文件系统模型在面板显示后由 load_directory_tree() 创建
         self.directory_tree = QtWidgets.QTreeView()
-        self.directory_model = QtWidgets.QFileSystemModel()
-        self.directory_model.setRootPath(QtCore.QDir.rootPath())
-        self.directory_tree.setModel(self.directory_model)
-        
-        # 获取主函数所在的路径，并设置为目录树的根路径
-        main_path = os.path.dirname(os.path.abspath(sys.argv[0]))
-        self.directory_tree.setRootIndex(self.directory_model.index(main_path))
-        
-        # 隐藏类型、大小和创建时间列
-        self.directory_tree.setColumnHidden(1, True)  # 隐藏类型列
-        self.directory_tree.setColumnHidden(2, True)  # 隐藏大小列
-        self.directory_tree.setColumnHidden(3, True)  # 隐藏创建时间列
         self.directory_tree.setHeaderHidden(True)  # 隐藏表头
+        self.directory_model = None
+        # 保存根目录，默认为主函数所在的路径
+        self.save_root = os.path.abspath(SAVE_ROOT or os.path.dirname(os.path.abspath(sys.argv[0])))
         layout.addWidget(self.directory_tree)
 
         # 文件名输入框
@@ -93,11 +88,50 @@ class WaveformSavePanel(QtWidgets.QWidget):
         batch_layout.addStretch()
         layout.addLayout(batch_layout)
 
+        # CSV 导出选项，默认只保存二进制记录
+        self.export_csv_checkbox = QtWidgets.QCheckBox("同时导出 CSV")
+        layout.addWidget(self.export_csv_checkbox)
+
         # 保存按钮
         self.save_button = QtWidgets.QPushButton("保存波形")
         self.save_button.clicked.connect(self.save_waveform)
         layout.addWidget(self.save_button)
 
+        # 保存进度
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setTextVisible(True)
+        self.progress_bar.setFormat("未在保存")
+        layout.addWidget(self.progress_bar)
+
+    def showEvent(self, event):
+        """
+        面板第一次显示时再加载目录树，不拖慢窗口的创建和显示。
+        """
+        super().showEvent(event)
+        if self.directory_model is None:
+            QtCore.QTimer.singleShot(0, self.load_directory_tree)
+
+    def load_directory_tree(self):
+        """
+        创建文件系统模型并显示保存根目录。
+
+        模型的根路径设为保存根目录而不是文件系统根目录，只枚举和监视该目录；
+        子目录在展开时才由模型按需读取。
+        """
+        if self.directory_model is not None:
+            return
+        self.directory_model = QtWidgets.QFileSystemModel(self)
+        self.directory_model.setOption(QtWidgets.QFileSystemModel.DontUseCustomDirectoryIcons)
+        self.directory_model.setRootPath(self.save_root)
+        self.directory_tree.setModel(self.directory_model)
+        self.directory_tree.setRootIndex(self.directory_model.index(self.save_root))
+
+        # 隐藏类型、大小和创建时间列
+        self.directory_tree.setColumnHidden(1, True)  # 隐藏类型列
+        self.directory_tree.setColumnHidden(2, True)  # 隐藏大小列
+        self.directory_tree.setColumnHidden(3, True)  # 隐藏创建时间列
+
     def clear_default_filename(self, event):
         """
         清空默认文件名，一旦用户编辑过，清空功能将关闭。
@@ -122,14 +156,14 @@ class WaveformSavePanel(QtWidgets.QWidget):
         """
         处理保存波形的逻辑，获取路径、文件名和记录时间，并发出保存信号。
 
-        如果未选择路径，则默认保存到用户的主目录。
+        如果未选择路径，则默认保存到保存根目录。
         如果文件名为空，则弹出警告提示用户输入文件名。
         """
         selected_indexes = self.directory_tree.selectedIndexes()
-        if selected_indexes:
+        if selected_indexes and self.directory_model is not None:
             path = self.directory_model.filePath(selected_indexes[0])
         else:
-            path = os.path.dirname(os.path.abspath(sys.argv[0]))
+            path = self.save_root
 
         filename = self.filename_input.text()
         if not filename:
@@ -148,6 +182,18 @@ class WaveformSavePanel(QtWidgets.QWidget):
             QtWidgets.QMessageBox.warning(self, "警告", "请输入有效的文件数量")
             return
 
-        for i in range(file_count):
-            file_name = f"{filename}_{str(i+1).zfill(5)}.csv"
-            self.save_signal.emit(path, file_name, record_time)
+        export_to_csv = self.export_csv_checkbox.isChecked()
+        self.save_signal.emit(path, filename, record_time, file_count, export_to_csv)
+
+    def set_progress(self, progress):
+        """
+        显示保存进度。
+
+        :param progress: WaveformSaver.get_progress() 返回的进度字典，为 None 时表示没有保存任务。
+        """
+        if progress is None:
+            self.progress_bar.setValue(0)
+            self.progress_bar.setFormat("未在保存")
+            return
+        self.progress_bar.setValue(int(progress["fraction"] * 1000))
+        self.progress_bar.setFormat(f"文件 {progress['segment']}/{progress['segment_count']}  %p%")
@@ -1,28 +1,222 @@
+import os
 import sys
-from PySide6 import QtWidgets
-from gui.app_window import AppWindow
-from usb_reader import USBReader
+import time
+import argparse
+from usb_reader import USBReader, list_sources, find_sources
+from multi_reader import MultiReader
+from process_reader import ProcessReader
 from signal_generator import SimulatedSignalGenerator
-from config import VENDOR_ID, SHOW_CONNECTION_INFO
+from replay_reader import ReplayReader
+from config import VENDOR_ID, SHOW_CONNECTION_INFO, USB_CHANNELS, ACQUISITION_PROCESS, SAVE_OVERFLOW_POLICY, TRIGGER_EDGE, TRIGGER_HYSTERESIS, SAVE_COMPRESSION
+from config import ANALYSIS_WORKERS, FFT_SIZE, FFT_WINDOW, FILTER_CHAIN
+from spectrum import WINDOW_COEFFICIENTS
+from ring_buffer import OVERFLOW_POLICIES
+from trigger import Trigger, TRIGGER_EDGES
+from chunked_recording import CODECS
 
-def main():
-    # Attempt to find USB device
-    showConnectionInfo=SHOW_CONNECTION_INFO
+def add_source_arguments(parser, defaults=True):
+    # The record subparser adds the same options without defaults, so that it keeps options given before 'record'
+    def default(value):
+        return value if defaults else argparse.SUPPRESS
+    parser.add_argument('--simulate', action='store_true', default=default(False), help="use the simulated signal generator instead of the USB device")
+    parser.add_argument('--replay', metavar='RECORDING', default=default(None), help="replay a saved recording (.f32/.json or base path)")
+    parser.add_argument('--speed', default=default('1'), help="replay speed as a multiple of real time, or 'max' (default: 1)")
+    parser.add_argument('--loop', action='store_true', default=default(False), help="restart the replay when the recording ends")
+    parser.add_argument('--channels', type=int, default=default(1), help="number of simulated channels (default: 1)")
+    parser.add_argument('--all-devices', action='store_true', default=default(False),
+                        help="acquire from every matching USB device and IN endpoint at once")
+    parser.add_argument('--process', action='store_true', default=default(False),
+                        help="run acquisition in a separate process that shares samples through shared memory")
+    parser.add_argument('--filter', metavar='SPEC', default=default(FILTER_CHAIN),
+                        help="filter and decimate the stream before display and saving, "
+                             "e.g. 'dc,notch:50,lowpass:10000,decimate:16' (see dsp_filter.py)")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="USB data real-time plot")
+    add_source_arguments(parser)
+    commands = parser.add_subparsers(dest='command')
+
+    # Headless capture; never imports Qt or Matplotlib
+    record = commands.add_parser('record', help="record to disk without the GUI")
+    add_source_arguments(record, defaults=False)
+    record.add_argument('--seconds', type=float, required=True, help="total recording length in seconds")
+    record.add_argument('--segments', type=int, default=1, help="number of files to split the recording into (default: 1)")
+    record.add_argument('--out', default='.', help="output directory (default: current directory)")
+    record.add_argument('--name', default=None, help="base file name (default: recording-<start time>)")
+    record.add_argument('--csv', action='store_true', help="also export each segment to CSV when done")
+    record.add_argument('--policy', choices=OVERFLOW_POLICIES, default=SAVE_OVERFLOW_POLICY,
+                        help=f"what to do when saving falls behind (default: {SAVE_OVERFLOW_POLICY})")
+    record.add_argument('--compress', choices=list(CODECS), default=SAVE_COMPRESSION,
+                        help="write chunked compressed recordings (.f32z); see SAVE_* in config.py for the other settings")
+    record.add_argument('--interval', type=float, default=5.0, help="seconds between status lines (default: 5)")
+    # Event capture: save one file per trigger instead of a continuous recording
+    events = record.add_argument_group('event capture', "with --trigger-level, save a pre/post-trigger slice per "
+                                                        "trigger for --seconds instead of recording continuously")
+    events.add_argument('--trigger-level', type=float, default=None, help="trigger level; enables event capture")
+    events.add_argument('--trigger-edge', choices=TRIGGER_EDGES, default=TRIGGER_EDGE, help=f"trigger edge (default: {TRIGGER_EDGE})")
+    events.add_argument('--hysteresis', type=float, default=TRIGGER_HYSTERESIS, help=f"trigger hysteresis (default: {TRIGGER_HYSTERESIS})")
+    events.add_argument('--trigger-channel', type=int, default=0, help="channel to trigger on (default: 0)")
+    events.add_argument('--pre', type=float, default=0.01, help="seconds saved before each trigger (default: 0.01)")
+    events.add_argument('--post', type=float, default=0.05, help="seconds saved from each trigger on (default: 0.05)")
+    events.add_argument('--max-events', type=int, default=None, help="stop after this many events")
+
+    # Browse a saved recording from its summary index
+    view = commands.add_parser('view', help="browse a saved recording")
+    view.add_argument('recording', help="recording to open (.f32/.f32z/.json or base path)")
+
+    # Offline batch analysis in a process pool
+    analyze = commands.add_parser('analyze', help="analyze saved recordings in parallel")
+    analyze.add_argument('inputs', nargs='+', help="recordings, directories or glob patterns")
+    analyze.add_argument('--out', default='analysis', help="output directory for the summary table and thumbnails (default: analysis)")
+    analyze.add_argument('--workers', type=int, default=ANALYSIS_WORKERS, help="worker processes (default: CPU count)")
+    analyze.add_argument('--fft-size', type=int, default=FFT_SIZE, help=f"FFT length (default: {FFT_SIZE})")
+    analyze.add_argument('--window', choices=list(WINDOW_COEFFICIENTS), default=FFT_WINDOW, help=f"spectrum window (default: {FFT_WINDOW})")
+    analyze.add_argument('--no-thumbnails', action='store_true', help="skip the PNG thumbnails")
+    return parser.parse_args()
+
+def make_reader(factory, *args, separate_process=False, **kwargs):
+    # Optionally run the reader in its own process, sharing samples through shared memory
+    if separate_process:
+        return ProcessReader(factory, *args, **kwargs)
+    return factory(*args, **kwargs)
+
+def make_usb_reader(args, separate_process):
+    if args.all_devices and not separate_process:
+        # One handle per device, shared by the readers of all its endpoints
+        return MultiReader(find_sources(VENDOR_ID, USB_CHANNELS))
+    if args.all_devices:
+        # Each acquisition process opens its own handle, and a second handle cannot claim the same interface
+        sources = list_sources(VENDOR_ID)
+        if not sources:
+            raise ValueError('no USB device found')
+        device_indices = [device_index for device_index, _ in sources]
+        if len(set(device_indices)) != len(device_indices):
+            raise ValueError('--process reads one IN endpoint per device; drop --process to read '
+                             'several endpoints of the same device')
+        return MultiReader([make_reader(USBReader, VENDOR_ID, USB_CHANNELS, device_index, endpoint_index,
+                                        separate_process=separate_process)
+                            for device_index, endpoint_index in sources])
+    return make_reader(USBReader, VENDOR_ID, separate_process=separate_process)
+
+def make_source(args, separate_process):
+    # Returns the reader and whether it is the simulated signal; raises if the USB device cannot be opened
+    if args.replay:
+        speed = None if args.speed == 'max' else float(args.speed)
+        return make_reader(ReplayReader, args.replay, speed=speed, loop=args.loop, separate_process=separate_process), False
+    if args.simulate:
+        return make_reader(SimulatedSignalGenerator, channels=args.channels, separate_process=separate_process), True
+    return make_usb_reader(args, separate_process), False
+
+def apply_filter(reader, spec, policy):
+    # Put the streaming filter stage between the source and its consumers; raises ValueError on a bad spec.
+    # The stage reads the source with the saver's overflow policy, so block/spill recordings stay lossless
+    if not spec:
+        return reader
+    from filtered_reader import FilteredReader
+    reader = FilteredReader(reader, spec, policy)
+    print(f"Filter: {reader.chain.describe()}")
+    return reader
+
+def record(args, separate_process):
+    from waveform_saver import WaveformSaver
+
+    if args.seconds <= 0 or args.segments < 1:
+        print("--seconds must be positive and --segments at least 1")
+        return 2
+    trigger = None
+    if args.trigger_level is not None:
+        try:
+            trigger = Trigger(args.trigger_level, args.trigger_edge, args.hysteresis, args.trigger_channel)
+        except ValueError as e:
+            print(f"Invalid trigger: {e}")
+            return 2
+    # An unattended capture must not silently fall back to the simulated signal
     try:
-        reader = USBReader(VENDOR_ID)
-        useSimulatedSignal = False
+        reader, _ = make_source(args, separate_process)
     except Exception as e:
-        print(f"Error initializing USB device: {e}. Starting with simulated signal.")
-        reader = SimulatedSignalGenerator()
-        useSimulatedSignal = True
-        #showConnectionInfo = False
+        print(f"Error initializing source: {e}")
+        return 1
+    try:
+        reader = apply_filter(reader, args.filter, args.policy)
+    except ValueError as e:
+        print(f"Invalid filter: {e}")
+        return 2
+
+    saver = WaveformSaver(reader, overflow_policy=args.policy, compression=args.compress)
+    # Register the saver before the source starts so that the first samples are recorded too
+    if trigger is None:
+        name = args.name or time.strftime('recording-%Y%m%d-%H%M%S')
+        saver.start_saving(args.out, name, args.seconds / args.segments, args.segments, args.csv)
+        description = f"{args.seconds:g} s in {args.segments} file(s)"
+    else:
+        name = args.name or time.strftime('event-%Y%m%d-%H%M%S')
+        saver.start_event_capture(args.out, name, trigger, round(args.pre * reader.sample_rate),
+                                  round(args.post * reader.sample_rate), args.seconds, args.max_events, args.csv)
+        description = (f"{args.trigger_edge} edge events at {args.trigger_level:g} "
+                       f"({args.pre:g} s + {args.post:g} s each) for {args.seconds:g} s")
+    reader.start()
+    print(f"Recording {description} to {args.out} "
+          f"({reader.sample_rate} Hz, {getattr(reader, 'channels', 1)} channel(s), policy {args.policy}"
+          + (f", {args.compress} compressed)" if args.compress else ")"))
+    try:
+        while saver.is_saving():
+            saver.save_thread.join(args.interval)
+            progress = saver.get_progress()
+            metrics = reader.metrics.snapshot()
+            print(f"[{time.strftime('%H:%M:%S')}] {progress['fraction'] * 100:5.1f}%  "
+                  f"segment {progress['segment']}/{progress['segment_count']}  "
+                  f"{metrics['samples_per_s']:.0f} S/s  {metrics['bytes_per_s'] / 1024:.1f} KB/s  "
+                  f"missed {progress['missed_samples']}  events {progress['events_captured']}  "
+                  f"usb timeouts {metrics['usb_timeouts']}", flush=True)
+            if not reader.is_alive() and saver.is_saving():
+                # Give the saver one more full poll to pick up what the source wrote before stopping
+                saver.save_thread.join(2 * saver.poll_interval)
+                print("Source stopped before the recording was complete")
+                saver.stop_saving()
+    except KeyboardInterrupt:
+        print("Interrupted, closing the current segment")
+        saver.stop_saving()
+    finally:
+        reader.stop()
+        reader.join()
+    print(f"Saved {len(saver.saved_files)} file(s), {saver.samples_recorded} samples, "
+          f"{saver.missed_samples} missed" + (f", {saver.events_captured} event(s)" if trigger else ""))
+    error = saver.take_error()
+    if error is not None:
+        print(f"Recording failed: {error}")
+        return 1
+    return 0
+
+def run_gui(args, separate_process):
+    # Startup timing (window shown, plots ready, first frame) is measured from here
+    start_time = time.perf_counter()
+    from PySide6 import QtWidgets
+    from gui.app_window import AppWindow
+
+    showConnectionInfo=SHOW_CONNECTION_INFO
+    if args.replay or args.simulate:
+        reader, useSimulatedSignal = make_source(args, separate_process)
+    else:
+        # Attempt to find USB device
+        try:
+            reader, useSimulatedSignal = make_usb_reader(args, separate_process), False
+        except Exception as e:
+            print(f"Error initializing USB device: {e}. Starting with simulated signal.")
+            reader = make_reader(SimulatedSignalGenerator, separate_process=separate_process)
+            useSimulatedSignal = True
+            #showConnectionInfo = False
+    try:
+        reader = apply_filter(reader, args.filter, SAVE_OVERFLOW_POLICY)
+    except ValueError as e:
+        print(f"Invalid filter: {e}")
+        return 2
 
     # Start the reader
     reader.start()
 
     # Initialize and run the application
     app = QtWidgets.QApplication(sys.argv)
-    main_window = AppWindow(reader, useSimulatedSignal, showConnectionInfo)
+    main_window = AppWindow(reader, useSimulatedSignal, showConnectionInfo, start_time)
     main_window.show()
 
     # Run the application
@@ -31,6 +225,72 @@ def main():
     # Clean up
     reader.stop()
     reader.join()
+    return 0
+
+def view(args):
+    from recording import open_recording
+    from summary_index import open_summary, summary_path
+
+    try:
+        reader = open_recording(args.recording)
+    except (OSError, ValueError) as e:
+        print(f"Error opening recording: {e}")
+        return 1
+    start = time.perf_counter()
+    if not os.path.exists(summary_path(args.recording)):
+        print("No summary index, building one (only needed once)...")
+    index = open_summary(args.recording)
+    print(f"Summary index loaded in {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"({len(index.levels)} levels, {len(reader) / reader.sample_rate:.1f} s recorded)")
+
+    from PySide6 import QtWidgets
+    from gui.viewer_window import ViewerWindow
+
+    app = QtWidgets.QApplication(sys.argv)
+    viewer = ViewerWindow(reader, index)
+    viewer.show()
+    app.exec()
+    return 0
+
+def analyze(args):
+    from analysis import find_recordings, analyze_batch, format_table
+
+    paths = find_recordings(args.inputs)
+    if not paths:
+        print("No recordings found")
+        return 1
+    if args.fft_size < 2:
+        print("--fft-size must be at least 2")
+        return 2
+    workers = min(args.workers or os.cpu_count() or 1, len(paths))
+    print(f"Analyzing {len(paths)} recording(s) with {workers} worker process(es)")
+    start = time.perf_counter()
+
+    def progress(done, total, outcome):
+        status = f"failed: {outcome}" if isinstance(outcome, Exception) else f"{outcome['elapsed_s']:.2f} s"
+        print(f"[{done}/{total}] {outcome.get('file', '') if isinstance(outcome, dict) else ''} {status}", flush=True)
+
+    results, errors = analyze_batch(paths, args.out, workers, not args.no_thumbnails, progress,
+                                    fft_size=args.fft_size, window=args.window)
+    elapsed = time.perf_counter() - start
+    samples = sum(result["samples"] * result["channels"] for result in results)
+    print(format_table(results))
+    for path, error in errors.items():
+        print(f"Failed: {path}: {error}")
+    print(f"Analyzed {len(results)} recording(s), {samples / 1e6:.1f} M samples in {elapsed:.2f} s "
+          f"({samples / elapsed / 1e6:.1f} M samples/s); summary written to {os.path.join(args.out, 'analysis.csv')}")
+    return 1 if errors else 0
+
+def main():
+    args = parse_args()
+    if args.command == 'view':
+        return view(args)
+    if args.command == 'analyze':
+        return analyze(args)
+    separate_process = args.process or ACQUISITION_PROCESS
+    if args.command == 'record':
+        return record(args, separate_process)
+    return run_gui(args, separate_process)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    sys.exit(main())
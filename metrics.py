@@ -0,0 +1,189 @@
+import time
+from collections import deque
+from threading import Lock
+from config import METRICS_WINDOW
+
+COUNTERS = ("usb_timeouts", "dropped_samples", "dropped_frames")  # 始终出现在快照中的计数器
+
+
+class SlidingWindow:
+    """
+    滑动时间窗口内的事件统计。
+
+    每次 add() 记录一个 (时间, 数值) 事件，超出窗口的旧事件在下一次访问时被丢弃，
+    窗口内数值之和与事件数随时间增量维护，不需要遍历。调用者负责加锁。
+
+    :param window: 窗口长度（秒）。
+    """
+
+    def __init__(self, window=METRICS_WINDOW):
+        """
+        初始化 SlidingWindow 类。
+
+        :param window: 窗口长度（秒）。
+        """
+        self.window = window
+        self.events = deque()  # (时间, 数值)
+        self.sum = 0.0  # 窗口内数值之和
+        self.first_time = None  # 第一个事件的时间，窗口尚未填满时用于计算速率
+
+    def _trim(self, now):
+        """
+        丢弃窗口之外的事件。
+
+        :param now: 当前时间（time.monotonic()）。
+        """
+        limit = now - self.window
+        while self.events and self.events[0][0] < limit:
+            self.sum -= self.events.popleft()[1]
+
+    def add(self, value, now=None):
+        """
+        记录一个事件。
+
+        :param value: 事件数值（字节数、样本数、耗时等）。
+        :param now: 事件时间，默认为当前时间。
+        """
+        now = time.monotonic() if now is None else now
+        if self.first_time is None:
+            self.first_time = now
+        self.events.append((now, value))
+        self.sum += value
+        self._trim(now)
+
+    def rate(self, now=None):
+        """
+        :return: 窗口内数值之和除以窗口时长，即每秒的数值。
+        """
+        now = time.monotonic() if now is None else now
+        self._trim(now)
+        if self.first_time is None:
+            return 0.0
+        span = min(self.window, now - self.first_time)
+        return self.sum / span if span > 0 else 0.0
+
+    def mean(self, now=None):
+        """
+        :return: 窗口内事件数值的平均值，没有事件时返回 None。
+        """
+        self._trim(time.monotonic() if now is None else now)
+        return self.sum / len(self.events) if self.events else None
+
+    def max(self, now=None):
+        """
+        :return: 窗口内事件数值的最大值，没有事件时返回 None。
+        """
+        self._trim(time.monotonic() if now is None else now)
+        return max(value for _, value in self.events) if self.events else None
+
+
+class PipelineMetrics:
+    """
+    采集、显示和保存流水线共享的运行指标。
+
+    读取器、环形缓冲区、保存器和绘图部件持有同一个实例，在各自的线程中记录事件；
+    所有方法都是线程安全的。速率和耗时按最近 window 秒的滑动窗口统计，能够反映卡顿，
+    计数器（超时、丢弃样本等）从创建起累计。
+
+    常用名称：
+        计数器：usb_timeouts（USB 读取超时次数）、dropped_samples（环形缓冲区溢出覆盖、未被读取的样本数）、
+            dropped_frames（未绘制就被替换的绘图帧数）
+        耗时：lock_wait（环形缓冲区锁等待）、fft（频谱和瀑布图计算）、render（绘图）、save_write（保存写盘）
+
+    脚本中可以直接调用 snapshot() 获取全部指标：
+
+        metrics = reader.metrics
+        print(metrics.snapshot()["samples_per_s"])
+
+    :param window: 滑动窗口长度（秒）。
+    """
+
+    def __init__(self, window=METRICS_WINDOW):
+        """
+        初始化 PipelineMetrics 类。
+
+        :param window: 滑动窗口长度（秒）。
+        """
+        self.window = window
+        self.lock = Lock()
+        self.bytes = SlidingWindow(window)  # 接收字节数
+        self.samples = SlidingWindow(window)  # 接收样本数
+        self.counters = dict.fromkeys(COUNTERS, 0)  # 累计计数器
+        self.timings = {}  # 各阶段耗时的滑动窗口
+
+    def add_transfer(self, byte_count, sample_count):
+        """
+        记录一次数据接收。
+
+        :param byte_count: 字节数。
+        :param sample_count: 样本数。
+        """
+        now = time.monotonic()
+        with self.lock:
+            self.bytes.add(byte_count, now)
+            self.samples.add(sample_count, now)
+
+    def increment(self, name, count=1):
+        """
+        增加一个计数器。
+
+        :param name: 计数器名称。
+        :param count: 增量。
+        """
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + count
+
+    def add_time(self, name, seconds):
+        """
+        记录一次耗时。
+
+        :param name: 阶段名称。
+        :param seconds: 耗时（秒）。
+        """
+        with self.lock:
+            timing = self.timings.get(name)
+            if timing is None:
+                timing = self.timings[name] = SlidingWindow(self.window)
+            timing.add(seconds)
+
+    def byte_rate(self):
+        """
+        :return: 滑动窗口内的接收速率（字节/秒）。
+        """
+        with self.lock:
+            return self.bytes.rate()
+
+    def sample_rate(self):
+        """
+        :return: 滑动窗口内的接收速率（样本/秒）。
+        """
+        with self.lock:
+            return self.samples.rate()
+
+    def counter(self, name):
+        """
+        :param name: 计数器名称。
+        :return: 计数器的当前值，未记录过时为 0。
+        """
+        with self.lock:
+            return self.counters.get(name, 0)
+
+    def snapshot(self):
+        """
+        获取全部指标的快照。
+
+        :return: 字典，包含 bytes_per_s、samples_per_s、各计数器，
+            以及每个耗时阶段的 <名称>_ms（窗口内平均）和 <名称>_max_ms（窗口内最大），窗口内无记录时为 None。
+        """
+        now = time.monotonic()
+        with self.lock:
+            result = {
+                "bytes_per_s": self.bytes.rate(now),
+                "samples_per_s": self.samples.rate(now),
+            }
+            result.update(self.counters)
+            for name, timing in self.timings.items():
+                mean = timing.mean(now)
+                result[f"{name}_ms"] = mean * 1000 if mean is not None else None
+                result[f"{name}_max_ms"] = timing.max(now) * 1000 if mean is not None else None
+            return result
@@ -0,0 +1,233 @@
+import numpy as np
+from config import QUEUE_MAXLEN
+from metrics import PipelineMetrics
+
+
+class MultiConsumer:
+    """
+    多数据源的组合消费者，由 MultiReader.add_consumer() 创建。
+
+    每个数据源各有一个 RingConsumer，各源的新样本先暂存，再按绝对样本序号对齐：
+    只有所有数据源都已到达的样本区间才会输出，输出为各源通道按顺序拼接的 (样本数, 总通道数) 数组。
+    某个数据源丢失样本时，其他数据源在该区间的样本也一并丢弃，read() 报告组合流中跳过的样本数。
+
+    :param consumers: 各数据源的 RingConsumer 列表。
+    :param channels: 各数据源的通道数列表。
+    :param limit: 每个数据源最多暂存的样本数，超过时丢弃最旧的样本。
+    """
+
+    def __init__(self, consumers, channels, limit=QUEUE_MAXLEN):
+        """
+        初始化 MultiConsumer 类。
+
+        :param consumers: 各数据源的 RingConsumer 列表。
+        :param channels: 各数据源的通道数列表。
+        :param limit: 每个数据源最多暂存的样本数。
+        """
+        self.consumers = consumers
+        self.limit = limit
+        self.channels = channels  # 各源的通道数
+        self.starts = [consumer.cursor for consumer in consumers]  # 各源暂存样本的起始绝对序号
+        self.pending = [np.empty((0, ch), dtype=np.float32) for ch in channels]  # 各源暂存的样本
+        self.cursor = max(self.starts)  # 组合流中下一个要输出的绝对序号
+        self.missed = 0  # 累计错过的样本数
+
+    def read(self, max_count=None):
+        """
+        读取所有数据源都已到达的新样本。
+
+        :param max_count: 最多读取的样本数，为 None 时读取全部。
+        :return: (形状为 (样本数, 总通道数) 的新样本数组, 自上次读取以来错过的样本数)，总通道数为 1 时为一维数组。
+        """
+        for k, consumer in enumerate(self.consumers):
+            data, missed = consumer.read()
+            data = data.reshape(len(data), self.channels[k])
+            if missed:
+                # 缺口之前暂存的样本无法与缺口之后的样本拼接，直接丢弃
+                self.pending[k] = data
+                self.starts[k] = consumer.cursor - len(data)
+            elif len(data):
+                self.pending[k] = np.concatenate((self.pending[k], data))
+            excess = len(self.pending[k]) - self.limit
+            if excess > 0:
+                self.pending[k] = self.pending[k][excess:]
+                self.starts[k] += excess
+
+        low = max(self.starts)
+        high = min(start + len(pending) for start, pending in zip(self.starts, self.pending))
+        if max_count is not None:
+            high = min(high, low + max_count)
+        missed = max(0, low - self.cursor)
+        self.missed += missed
+        if high <= low:
+            data = np.empty((0, sum(self.channels)), dtype=np.float32)
+            high = low
+        else:
+            data = np.hstack([p[low - s:high - s] for s, p in zip(self.starts, self.pending)])
+        if data.shape[1] == 1:
+            data = data[:, 0]  # 与单通道环形缓冲区一致，返回一维数组
+        # 丢弃已输出的样本，以及其他数据源已越过、不可能再输出的样本
+        for k, start in enumerate(self.starts):
+            self.pending[k] = self.pending[k][max(0, high - start):]
+            self.starts[k] = max(start, high)
+        self.cursor = max(self.cursor, high)
+        return data, missed
+
+    def close(self):
+        """
+        注销所有数据源上的消费者。
+        """
+        for consumer in self.consumers:
+            consumer.close()
+
+
+class MultiReader:
+    """
+    多设备读取器，把多个读取器（多个 USB 设备或同一设备的多个端点）合并为一个多通道数据源。
+
+    每个读取器仍在自己的线程中采集并写入自己的环形缓冲区；本类只在读取时按绝对样本序号
+    对齐各源的数据，并把各源的通道按顺序拼接。对齐假设各设备共用采样时钟并同时开始采集，
+    即各环形缓冲区中序号相同的样本属于同一采样时刻。
+
+    接口与 USBReader 相同，可以直接交给 GUI 和保存器使用。所有读取器共享同一个 PipelineMetrics，
+    接收速率为各源之和。
+
+    :param readers: 读取器列表，采样率必须一致。
+    """
+
+    def __init__(self, readers):
+        """
+        初始化 MultiReader 类。
+
+        :param readers: 读取器列表，采样率必须一致。
+        :raises ValueError: 当读取器列表为空或采样率不一致时抛出异常。
+        """
+        if not readers:
+            raise ValueError('至少需要一个读取器')
+        rates = {reader.sample_rate for reader in readers}
+        if len(rates) != 1:
+            raise ValueError(f'读取器的采样率不一致: {sorted(rates)}')
+        self.readers = list(readers)
+        self.sample_rate = readers[0].sample_rate  # 采样率
+        self.source_channels = [getattr(reader, 'channels', 1) for reader in readers]  # 各源的通道数
+        self.channels = sum(self.source_channels)  # 总通道数
+        self.metrics = PipelineMetrics()  # 运行指标，由所有读取器共享
+        for reader in self.readers:
+            reader.metrics = self.metrics
+            reader.data_buffer.metrics = self.metrics
+
+    def start(self):
+        """
+        启动所有读取器线程。
+        """
+        for reader in self.readers:
+            reader.start()
+
+    def stop(self):
+        """
+        停止所有读取器线程。
+        """
+        for reader in self.readers:
+            reader.stop()
+
+    def join(self, timeout=None):
+        """
+        等待所有读取器线程结束。
+
+        :param timeout: 每个线程的最长等待时间（秒）。
+        """
+        for reader in self.readers:
+            reader.join(timeout)
+
+    def is_alive(self):
+        """
+        :return: 是否还有读取器线程在运行。
+        """
+        return any(reader.is_alive() for reader in self.readers)
+
+    def get_speed(self):
+        """
+        计算最近一段时间（METRICS_WINDOW 秒）所有数据源的总接收速率。
+
+        :return: 数据接收速率，单位为 KB/s。
+        """
+        return self.metrics.byte_rate() / 1024
+
+    def get_cursor(self):
+        """
+        获取当前游标，即所有数据源都已到达的样本数。
+
+        :return: 当前游标。
+        """
+        return min(reader.get_cursor() for reader in self.readers)
+
+    def get_range(self, start, stop):
+        """
+        获取绝对样本区间 [start, stop) 中所有数据源都仍在缓冲区内的部分。
+
+        :param start: 起始样本序号。
+        :param stop: 结束样本序号（不含）。
+        :return: (实际起始序号, 形状为 (样本数, 总通道数) 的样本数组)。
+        """
+        parts = [reader.data_buffer.get_range(start, stop) for reader in self.readers]
+        low = max(part_start for part_start, _ in parts)
+        high = min(part_start + len(data) for part_start, data in parts)
+        high = max(low, high)
+        data = np.hstack([data.reshape(len(data), channels)[low - part_start:high - part_start]
+                          for (part_start, data), channels in zip(parts, self.source_channels)])
+        return low, data[:, 0] if self.channels == 1 else data
+
+    def get_latest(self, n=None):
+        """
+        获取所有数据源都已到达的最近 n 个样本。
+
+        :param n: 需要的样本数，为 None 时返回缓冲区中全部有效样本。
+        :return: 形状为 (样本数, 总通道数) 的数组，长度可能小于 n。
+        """
+        stop = self.get_cursor()
+        start = 0 if n is None else stop - n
+        return self.get_range(start, stop)[1]
+
+    def get_data(self):
+        """
+        获取当前存储在缓冲区中的全部数据。
+
+        :return: 形状为 (样本数, 总通道数) 的数组。
+        """
+        return self.get_latest()
+
+    def get_data_since(self, cursor):
+        """
+        获取游标之后所有数据源都已到达的新样本。
+
+        :param cursor: 上次读取返回的游标。
+        :return: (新样本数组, 新游标)。
+        """
+        stop = self.get_cursor()
+        return self.get_range(cursor, stop)[1], stop
+
+    def add_consumer(self, name, policy="drop"):
+        """
+        注册一个按游标读取对齐后的新样本、并报告错过样本数的消费者。
+
+        :param name: 消费者名称。
+        :param policy: 溢出策略：drop、block 或 spill，见 RingConsumer，对每个数据源分别生效。
+        :return: MultiConsumer 实例，用完后应调用其 close()。
+        """
+        consumers = [reader.add_consumer(name, policy) for reader in self.readers]
+        return MultiConsumer(consumers, self.source_channels)
+
+    def get_device_info(self):
+        """
+        获取第一个数据源的设备信息，并附加数据源和通道数。
+
+        :return: 包含设备信息的字典。
+        """
+        info = dict(self.readers[0].get_device_info())
+        info["sources"] = len(self.readers)  # 数据源数量
+        info["channels"] = self.channels  # 总通道数
+        for index, reader in enumerate(self.readers[1:], 2):
+            source = reader.get_device_info()
+            info[f"source_{index}"] = (f'{source.get("product")} {source.get("serial_number")} '
+                                       f'ep {source.get("endpoint_address")}, {self.source_channels[index - 1]} ch')
+        return info
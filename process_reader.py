@@ -0,0 +1,182 @@
+import time
+import multiprocessing
+from threading import Thread, Event
+from config import QUEUE_MAXLEN
+from metrics import PipelineMetrics
+from ring_buffer import BufferedReader
+from shared_ring import SharedRingBuffer, STATS
+
+START_TIMEOUT = 30.0  # 等待采集进程创建读取器的最长时间（秒）
+PUBLISH_INTERVAL = 0.05  # 采集进程发布统计量、检查停止请求，以及主进程汇总指标的间隔（秒）
+
+# 共享缓冲区控制字的取值。两个进程之间只通过共享内存和管道通信，不使用跨进程的锁或事件，
+# 任何一方异常退出都不会让另一方卡在锁上
+CONTROL_WAIT, CONTROL_RUN, CONTROL_STOP = 0, 1, 2
+
+
+def _supervise(reader, ring, done):
+    """
+    采集进程中的监督线程：定期把读取器的接收字节数和计数器写入共享缓冲区头部，并在主进程请求时停止读取器。
+
+    :param reader: 读取器实例。
+    :param ring: 共享环形缓冲区。
+    :param done: 读取循环结束时置位的事件。
+    """
+    while True:
+        ring.set_stat("bytes_received", getattr(reader, 'byte_count', 0))
+        for name in STATS[1:]:
+            ring.set_stat(name, reader.metrics.counter(name))
+        if ring.control() == CONTROL_STOP:
+            reader.stop()
+        if done.wait(PUBLISH_INTERVAL):
+            break
+
+
+def _acquisition_main(factory, args, kwargs, conn):
+    """
+    采集进程的入口：创建读取器，把它的环形缓冲区换成主进程提供的共享内存缓冲区，然后运行读取循环。
+
+    与主进程的握手：先发送 ("ready", 采样率, 通道数, 设备信息) 或 ("error", 错误信息)，
+    再接收共享内存名称，等待控制字变为 CONTROL_RUN 后开始采集，变为 CONTROL_STOP 时停止。
+
+    :param factory: 读取器类或可调用对象，在本进程中以 factory(*args, **kwargs) 创建读取器。
+    :param args: 位置参数。
+    :param kwargs: 关键字参数。
+    :param conn: 与主进程通信的管道端点。
+    """
+    try:
+        reader = factory(*args, **kwargs)
+    except Exception as e:
+        conn.send(("error", f'{type(e).__name__}: {e}'))
+        return
+    conn.send(("ready", reader.sample_rate, getattr(reader, 'channels', 1), reader.get_device_info()))
+    ring = SharedRingBuffer.attach(conn.recv())
+    reader.data_buffer = ring  # 读取器直接写入共享内存
+    done = Event()
+    supervisor = Thread(target=_supervise, args=(reader, ring, done))
+    supervisor.start()
+    try:
+        while ring.control() == CONTROL_WAIT:
+            time.sleep(PUBLISH_INTERVAL)
+        if ring.control() == CONTROL_RUN:
+            reader.run()
+    finally:
+        done.set()
+        supervisor.join()
+        ring.close()
+
+
+class ProcessReader(BufferedReader):
+    """
+    在独立进程中运行的读取器。
+
+    读取器（USBReader、SimulatedSignalGenerator 等）在子进程中创建并运行，样本写入
+    共享内存环形缓冲区（见 shared_ring），GUI、保存器等在主进程中直接从共享内存读取，
+    读取循环不再与 Qt 事件循环和绘图争用 GIL，采集节奏不受绘图负载影响。
+
+    接口与被包装的读取器相同，可以直接交给 GUI、保存器和 MultiReader 使用。
+    主进程中的 metrics 由一个后台线程按共享缓冲区的写入计数和子进程发布的计数器汇总。
+    子进程使用 spawn 方式启动，factory 和参数必须可以被 pickle。
+
+    :param factory: 读取器类或可调用对象，在子进程中以 factory(*args, **kwargs) 创建读取器。
+    :param args: 传给 factory 的位置参数。
+    :param capacity: 共享环形缓冲区容量（帧数）。
+    :param kwargs: 传给 factory 的关键字参数。
+    """
+
+    def __init__(self, factory, *args, capacity=QUEUE_MAXLEN, **kwargs):
+        """
+        初始化 ProcessReader 类，启动子进程并等待读取器创建完成。
+
+        :param factory: 读取器类或可调用对象。
+        :param args: 传给 factory 的位置参数。
+        :param capacity: 共享环形缓冲区容量（帧数）。
+        :param kwargs: 传给 factory 的关键字参数。
+        :raises ValueError: 当子进程创建读取器失败或超时时抛出异常。
+        """
+        context = multiprocessing.get_context('spawn')
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_acquisition_main,
+            args=(factory, args, kwargs, child_conn),
+            name=f'acquisition-{getattr(factory, "__name__", "reader")}',
+            daemon=True
+        )
+        self.process.start()
+        if not self.conn.poll(START_TIMEOUT):
+            self.process.terminate()
+            raise ValueError('采集进程启动超时')
+        message = self.conn.recv()
+        if message[0] == "error":
+            self.process.join()
+            raise ValueError(f'采集进程创建读取器失败: {message[1]}')
+        _, self.sample_rate, self.channels, self.device_info = message
+        self.metrics = PipelineMetrics()  # 主进程中的运行指标
+        self.data_buffer = SharedRingBuffer(capacity, self.channels, metrics=self.metrics)  # 共享环形缓冲区
+        self.conn.send(self.data_buffer.name)
+        self.stop_event = Event()  # 主进程内的停止事件
+        self.monitor = Thread(target=self._monitor, daemon=True)  # 汇总子进程统计量的线程
+        self.start_time = time.time()  # 起始时间
+
+    def _monitor(self):
+        """
+        定期把共享缓冲区的写入增量和子进程发布的计数器记入主进程的 metrics。
+        """
+        last_cursor = last_bytes = 0
+        last_counters = dict.fromkeys(STATS[1:], 0)
+        while not self.stop_event.wait(PUBLISH_INTERVAL):
+            cursor = self.data_buffer.get_cursor()
+            byte_count = self.data_buffer.stat("bytes_received")
+            if cursor > last_cursor:
+                self.metrics.add_transfer(byte_count - last_bytes, cursor - last_cursor)
+                last_cursor, last_bytes = cursor, byte_count
+            for name, last in last_counters.items():
+                value = self.data_buffer.stat(name)
+                if value > last:
+                    self.metrics.increment(name, value - last)
+                    last_counters[name] = value
+
+    def start(self):
+        """
+        开始采集。
+        """
+        self.monitor.start()
+        self.data_buffer.set_control(CONTROL_RUN)
+
+    def stop(self):
+        """
+        通知子进程停止采集。
+        """
+        self.stop_event.set()
+        self.data_buffer.set_control(CONTROL_STOP)  # 尚未开始采集时子进程也会直接退出
+
+    def join(self, timeout=None):
+        """
+        等待子进程结束，然后删除共享内存。之后不能再读取数据。
+
+        :param timeout: 最长等待时间（秒），超时后强制结束子进程。
+        """
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        if self.monitor.is_alive():
+            self.monitor.join()
+        self.data_buffer.unlink()
+
+    def is_alive(self):
+        """
+        :return: 子进程是否仍在运行。
+        """
+        return self.process.is_alive()
+
+    def get_device_info(self):
+        """
+        获取子进程中读取器的设备信息，并附加采集进程的信息。
+
+        :return: 包含设备信息的字典。
+        """
+        info = dict(self.device_info)
+        info["throughput"] = f"{self.get_speed():.2f} KB/s"  # 最近的吞吐量
+        info["acquisition_process"] = f"pid {self.process.pid}"  # 采集进程
+        return info
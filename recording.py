@@ -0,0 +1,255 @@
+import os
+import json
+import time
+import numpy as np
+from config import SAVE_SUMMARY
+
+FORMAT_NAME = 'float32-le'  # 样本格式：连续的小端 float32
+FORMAT_VERSION = 1  # 记录格式版本
+DATA_SUFFIX = '.f32'  # 原始样本数据文件后缀
+META_SUFFIX = '.json'  # 元数据文件后缀
+SAMPLE_DTYPE = np.dtype('<f4')  # 样本数据类型
+
+
+def recording_paths(path, data_suffix=DATA_SUFFIX):
+    """
+    根据记录名称或任一记录文件路径，得到数据文件和元数据文件的路径。
+
+    :param path: 记录的基本路径，可以带 .f32、.f32z、.json、.sum 或 .csv 后缀。
+    :param data_suffix: 数据文件后缀，压缩记录为 .f32z（见 chunked_recording）。
+    :return: (数据文件路径, 元数据文件路径)。
+    """
+    base, ext = os.path.splitext(path)
+    if ext.lower() not in (DATA_SUFFIX, META_SUFFIX, '.csv', '.f32z', '.sum'):
+        base = path
+    return base + data_suffix, base + META_SUFFIX
+
+
+def open_recording(path):
+    """
+    按元数据中的格式打开记录：未压缩记录返回 RecordingReader，分块压缩记录返回 ChunkedRecordingReader。
+
+    :param path: 记录的基本路径或任一记录文件路径。
+    :return: 记录读取器，两种读取器的接口相同。
+    """
+    _, meta_path = recording_paths(path)
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        format_name = json.load(f).get("format")
+    if format_name != FORMAT_NAME:
+        from chunked_recording import CHUNKED_FORMAT_NAME, ChunkedRecordingReader
+        if format_name == CHUNKED_FORMAT_NAME:
+            return ChunkedRecordingReader(path)
+    return RecordingReader(path)
+
+
+class RecordingWriter:
+    """
+    二进制波形记录写入器。
+
+    样本以小端 float32 连续追加到数据文件，采样率、起始时间、设备信息和样本数
+    保存在同名的 JSON 元数据文件中。采集中丢失样本的位置记录在元数据的 gaps 列表中。
+    多通道记录按帧交织存储（每个采样时刻依次为各通道的值），样本数和偏移都按帧计数。
+    summary 为 True 时随写入增量构建多分辨率摘要索引（见 summary_index），关闭时写入 <name>.sum。
+
+    :param path: 记录的基本路径。
+    :param sample_rate: 采样率（Hz）。
+    :param device_info: 设备信息字典，通常来自读取器的 get_device_info()。
+    :param start_time: 记录起始时间（Unix 时间戳），默认为当前时间。
+    :param channels: 通道数。
+    :param summary: 是否生成摘要索引。
+    """
+
+    format_name = FORMAT_NAME  # 元数据中的格式名称，子类可覆盖
+    data_suffix = DATA_SUFFIX  # 数据文件后缀，子类可覆盖
+
+    def __init__(self, path, sample_rate, device_info=None, start_time=None, channels=1, summary=SAVE_SUMMARY):
+        """
+        初始化 RecordingWriter 类，创建数据文件并写入初始元数据。
+
+        :param path: 记录的基本路径。
+        :param sample_rate: 采样率（Hz）。
+        :param device_info: 设备信息字典。
+        :param start_time: 记录起始时间（Unix 时间戳）。
+        :param channels: 通道数。
+        :param summary: 是否生成摘要索引。
+        """
+        self.data_path, self.meta_path = recording_paths(path, self.data_suffix)
+        self.metadata = {
+            "format": self.format_name,
+            "version": FORMAT_VERSION,
+            "sample_rate": sample_rate,
+            "channels": int(channels),
+            "start_time": time.time() if start_time is None else start_time,
+            "device_info": {key: str(value) for key, value in (device_info or {}).items()},
+            "sample_count": 0,
+            "gaps": [],  # [样本偏移, 丢失样本数]，偏移处的样本之前有样本丢失
+        }
+        self.channels = int(channels)  # 通道数
+        self.sample_count = 0  # 已写入的样本数（帧数）
+        self.summary = None  # 摘要索引构建器
+        if summary:
+            from summary_index import SummaryBuilder
+            self.summary = SummaryBuilder(self.channels)
+        self.data_file = open(self.data_path, 'wb')
+        self._write_metadata()  # 先写元数据，异常中断时数据文件仍可读取
+
+    def write(self, samples):
+        """
+        追加一块样本。
+
+        :param samples: 样本数组，多通道时形状为 (样本数, channels)。
+        :raises ValueError: 当样本的通道数与记录不一致时抛出异常。
+        """
+        samples = np.asarray(samples, dtype=SAMPLE_DTYPE)
+        if (samples.shape[1] if samples.ndim > 1 else 1) != self.channels:
+            raise ValueError(f'样本通道数与记录不一致: {samples.shape}, 记录为 {self.channels} 通道')
+        self.data_file.write(samples.tobytes())
+        self.sample_count += len(samples)
+        if self.summary is not None:
+            self.summary.update(samples)
+
+    def add_gap(self, offset, count):
+        """
+        记录一个缺口，元数据在关闭时写入。
+
+        :param offset: 缺口之后第一个样本在本记录中的偏移。
+        :param count: 丢失的样本数。
+        """
+        self.metadata["gaps"].append([int(offset), int(count)])
+
+    def close(self):
+        """
+        关闭数据文件，写出摘要索引，并更新元数据中的样本数。
+        """
+        if self.data_file.closed:
+            return
+        self.data_file.close()
+        self.metadata["sample_count"] = self.sample_count
+        if self.summary is not None:
+            from summary_index import summary_path
+            index_path = summary_path(self.meta_path)
+            self.summary.save(index_path)
+            self.metadata["summary"] = self.summary.describe(index_path)
+        self._write_metadata()
+
+    def _write_metadata(self):
+        """
+        将元数据写入 JSON 文件。
+        """
+        with open(self.meta_path, 'w', encoding='utf-8') as f:
+            json.dump(self.metadata, f, ensure_ascii=False, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class RecordingReader:
+    """
+    二进制波形记录读取器，通过内存映射随机访问样本，不会一次性加载整个文件。
+
+    :param path: 记录的基本路径或任一记录文件路径。
+    """
+
+    def __init__(self, path):
+        """
+        初始化 RecordingReader 类，读取元数据并映射数据文件。
+
+        :param path: 记录的基本路径或任一记录文件路径。
+        :raises ValueError: 当记录格式不受支持时抛出异常。
+        """
+        self.data_path, self.meta_path = recording_paths(path)
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            self.metadata = json.load(f)
+        if self.metadata.get("format") != FORMAT_NAME:
+            raise ValueError(f'不支持的记录格式: {self.metadata.get("format")}')
+
+        self.sample_rate = self.metadata["sample_rate"]  # 采样率
+        self.channels = self.metadata.get("channels", 1)  # 通道数，旧记录没有此字段，为单通道
+        self.start_time = self.metadata["start_time"]  # 起始时间
+        self.device_info = self.metadata.get("device_info", {})  # 设备信息
+        self.gaps = self.metadata.get("gaps", [])  # 丢失样本的位置，元素为 [样本偏移, 丢失样本数]
+        # 样本数以数据文件大小为准，记录异常中断时元数据中的样本数可能未更新
+        self.sample_count = os.path.getsize(self.data_path) // (SAMPLE_DTYPE.itemsize * self.channels)
+        shape = (self.sample_count,) if self.channels == 1 else (self.sample_count, self.channels)
+        if self.sample_count:
+            self.samples = np.memmap(self.data_path, dtype=SAMPLE_DTYPE, mode='r', shape=shape)
+        else:
+            self.samples = np.empty(shape, dtype=SAMPLE_DTYPE)  # 空文件无法映射
+
+    def __len__(self):
+        return self.sample_count
+
+    def read(self, start, count):
+        """
+        读取从 start 开始的 count 个样本。
+
+        :param start: 起始样本序号。
+        :param count: 样本数，超出记录末尾的部分会被截断。
+        :return: float32 样本数组（副本），多通道时形状为 (样本数, channels)。
+        """
+        start = max(0, start)
+        return np.array(self.samples[start:start + count])
+
+    def iter_blocks(self, block_size, start=0, stop=None):
+        """
+        按块依次读取样本。
+
+        :param block_size: 每块的样本数。
+        :param start: 起始样本序号。
+        :param stop: 结束样本序号（不含），默认为记录末尾。
+        :return: 生成 (块起始序号, 样本数组) 的迭代器。
+        """
+        stop = self.sample_count if stop is None else min(stop, self.sample_count)
+        for offset in range(start, stop, block_size):
+            yield offset, self.read(offset, min(block_size, stop - offset))
+
+    def time_stamps(self, start, count):
+        """
+        计算样本相对于记录起始的时间戳。
+
+        :param start: 起始样本序号。
+        :param count: 样本数。
+        :return: 时间戳数组（秒）。
+        """
+        return (start + np.arange(count)) / self.sample_rate
+
+
+def _format_csv_chunk(time_stamps, values):
+    """
+    将一块时间戳和样本值格式化为 CSV 文本，整块一次格式化，不逐行调用写入器。
+
+    :param time_stamps: 时间戳数组。
+    :param values: 样本数组，多通道时形状为 (样本数, channels)，每个通道一列。
+    :return: CSV 文本。
+    """
+    values = values.reshape(len(values), -1)
+    interleaved = np.empty((len(values), 1 + values.shape[1]), dtype=np.float64)
+    interleaved[:, 0] = time_stamps
+    interleaved[:, 1:] = values
+    row = '%.6f' + ',%.9g' * values.shape[1] + '\n'
+    return (row * len(values)) % tuple(interleaved.ravel().tolist())
+
+
+def export_csv(path, csv_path=None, chunk_size=65536):
+    """
+    将二进制记录（未压缩或分块压缩）导出为 CSV 文件，每行包含时间戳和对应的信号值，多通道记录每个通道一列。
+
+    :param path: 记录的基本路径或任一记录文件路径。
+    :param csv_path: 输出 CSV 文件路径，默认为与记录同名的 .csv 文件。
+    :param chunk_size: 每次格式化的样本数。
+    :return: CSV 文件路径。
+    """
+    reader = open_recording(path)
+    if csv_path is None:
+        csv_path = os.path.splitext(reader.data_path)[0] + '.csv'
+    with open(csv_path, 'w', newline='') as f:
+        if reader.channels == 1:
+            f.write('Time (s),Signal\n')
+        else:
+            f.write('Time (s),' + ','.join(f'Channel {k + 1}' for k in range(reader.channels)) + '\n')
+        for offset, block in reader.iter_blocks(chunk_size):
+            f.write(_format_csv_chunk(reader.time_stamps(offset, len(block)), block))
+    return csv_path
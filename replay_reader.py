@@ -0,0 +1,104 @@
+import time
+from threading import Thread, Event
+from config import QUEUE_MAXLEN
+from ring_buffer import RingBuffer, BufferedReader
+from metrics import PipelineMetrics
+from recording import open_recording
+
+
+class ReplayReader(BufferedReader, Thread):
+    """
+    记录回放读取器类，将已保存的二进制记录按时间顺序重新送入环形缓冲区。
+
+    接口与 USBReader 和 SimulatedSignalGenerator 相同，可以直接替代它们驱动 GUI 和保存器。
+    记录通过内存映射（压缩记录按块解压）逐块读取，任何时刻只有一个数据块在内存中，多 GB 的记录也不会整体加载。
+    回放节奏由单调时钟驱动，输出速率为记录采样率乘以 speed；speed 为 None 时不做节流，尽快回放。
+
+    :param path: 记录的基本路径或任一记录文件路径。
+    :param speed: 回放倍速，1 为实时，None 表示最快速度。
+    :param loop: 回放到末尾后是否从头重新开始。
+    :param block_size: 单次读取的最大样本数。
+    """
+
+    def __init__(self, path, speed=1.0, loop=False, block_size=65536):
+        """
+        初始化 ReplayReader 类。
+
+        :param path: 记录的基本路径或任一记录文件路径。
+        :param speed: 回放倍速，1 为实时，None 表示最快速度。
+        :param loop: 回放到末尾后是否从头重新开始。
+        :param block_size: 单次读取的最大样本数。
+        :raises ValueError: 当倍速不是正数时抛出异常。
+        """
+        super().__init__()
+        if speed is not None and speed <= 0:
+            raise ValueError(f'回放倍速必须为正数: {speed}')
+        self.recording = open_recording(path)  # 被回放的记录
+        self.sample_rate = self.recording.sample_rate  # 采样率，取自记录元数据
+        self.channels = self.recording.channels  # 通道数，取自记录元数据
+        self.speed = speed  # 回放倍速
+        self.loop = loop  # 是否循环回放
+        self.block_size = block_size  # 单次读取的最大样本数
+        self.position = 0  # 下一个要回放的样本在记录中的位置
+        self.byte_count = 0  # 已回放的字节数
+        self.start_time = time.time()  # 起始时间
+        self.finished = Event()  # 非循环回放到达末尾时置位
+        self.metrics = PipelineMetrics()  # 运行指标，与保存器和绘图部件共享
+        self.data_buffer = RingBuffer(QUEUE_MAXLEN, metrics=self.metrics, channels=self.channels)  # 样本环形缓冲区
+        self.stop_event = Event()  # 停止事件
+
+    def run(self):
+        """
+        线程的主运行函数，按回放节奏从记录中读取样本块并写入环形缓冲区。
+        """
+        if len(self.recording) == 0:
+            self.finished.set()
+            return
+        start = time.monotonic()
+        replayed = 0  # 本次回放已输出的样本数，用于节流
+        while not self.stop_event.is_set():
+            if self.speed is None:
+                target = replayed + self.block_size
+            else:
+                target = int((time.monotonic() - start) * self.sample_rate * self.speed)
+            while replayed < target and not self.stop_event.is_set():
+                if self.position >= len(self.recording):
+                    if not self.loop:
+                        self.finished.set()
+                        return
+                    self.position = 0
+                count = min(self.block_size, target - replayed, len(self.recording) - self.position)
+                block = self.recording.read(self.position, count)
+                self.data_buffer.write(block)
+                self.position += count
+                replayed += count
+                self.byte_count += block.nbytes
+                self.metrics.add_transfer(block.nbytes, count)
+            time.sleep(0 if self.speed is None else 0.005)
+
+    def stop(self):
+        """
+        停止回放。
+        """
+        self.stop_event.set()
+
+    def get_device_info(self):
+        """
+        获取被回放记录中保存的设备信息，并附加回放参数。
+
+        :return: 包含设备信息的字典。
+        """
+        info = {
+            "vendor_id": "N/A",
+            "product_id": "N/A",
+            "manufacturer": "Replay",
+            "product": "Recording Replay",
+            "serial_number": "N/A",
+            "endpoint_address": "N/A",
+            "max_packet_size": "N/A"
+        }
+        info.update(self.recording.device_info)
+        info["channels"] = self.channels  # 通道数
+        info["replay_file"] = self.recording.data_path  # 回放的数据文件
+        info["replay_speed"] = "max" if self.speed is None else f"{self.speed:g}x"  # 回放倍速
+        return info
@@ -0,0 +1,422 @@
+import time
+import tempfile
+import numpy as np
+from contextlib import contextmanager
+from threading import Lock, Condition
+from config import RING_BLOCK_TIMEOUT
+
+OVERFLOW_POLICIES = ("drop", "block", "spill")  # 消费者落后时的处理策略
+
+
+class RingConsumer:
+    """
+    环形缓冲区的消费者，持有自己的读取游标，由 RingBuffer.add_consumer() 创建。
+
+    每次 read() 返回游标之后的新样本，以及自上次读取以来因溢出而错过的样本数。
+    溢出策略：
+        drop：缓冲区写满时覆盖未读样本，错过的样本数由 read() 报告；
+        block：写入方等待该消费者读取（最多 RING_BLOCK_TIMEOUT 秒），超时后按 drop 处理；
+        spill：即将被覆盖的未读样本先写入临时文件，read() 时按顺序先返回它们，不丢失样本。
+
+    :param ring: 所属的 RingBuffer。
+    :param name: 消费者名称，用于统计。
+    :param policy: 溢出策略，见 OVERFLOW_POLICIES。
+    :param cursor: 初始游标。
+    """
+
+    def __init__(self, ring, name, policy, cursor):
+        """
+        初始化 RingConsumer 类。
+
+        :param ring: 所属的 RingBuffer。
+        :param name: 消费者名称。
+        :param policy: 溢出策略。
+        :param cursor: 初始游标。
+        """
+        self.ring = ring
+        self.name = name
+        self.policy = policy
+        self.cursor = cursor  # 下一个要读取的样本在环形缓冲区中的绝对序号
+        self.missed = 0  # 累计错过的样本数
+        self.spilled = 0  # 累计写入溢出文件的样本数
+        self._spill = None  # 溢出临时文件，首次溢出时创建
+        self._spill_write = 0  # 溢出文件写入位置（字节）
+        self._spill_read = 0  # 溢出文件读取位置（字节）
+
+    @property
+    def spill_pending(self):
+        """
+        溢出文件中尚未读取的样本数。
+        """
+        return (self._spill_write - self._spill_read) // self.ring.frame_bytes
+
+    def read(self, max_count=None):
+        """
+        读取游标之后的新样本。
+
+        :param max_count: 最多读取的样本数，为 None 时读取全部。
+        :return: (新样本数组, 自上次读取以来错过的样本数)。
+        """
+        return self.ring._read(self, max_count)
+
+    def close(self):
+        """
+        注销消费者，删除溢出文件，并唤醒等待该消费者的写入方。
+        """
+        self.ring.remove_consumer(self)
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def _spill_samples(self, samples):
+        """
+        将即将被覆盖的样本追加到溢出文件，调用者需持有缓冲区锁。
+        """
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile()
+        self._spill.seek(self._spill_write)
+        self._spill.write(samples.tobytes())
+        self._spill_write += samples.nbytes
+        self.spilled += len(samples)
+
+    def _take_spill(self, max_count):
+        """
+        从溢出文件中取出最多 max_count 个样本，调用者需持有缓冲区锁。
+
+        :return: 样本数组。
+        """
+        frame_bytes = self.ring.frame_bytes
+        count = self.spill_pending if max_count is None else min(max_count, self.spill_pending)
+        self._spill.seek(self._spill_read)
+        data = np.frombuffer(self._spill.read(count * frame_bytes), dtype=self.ring.buffer.dtype)
+        data = data.reshape((count,) + self.ring.buffer.shape[1:])
+        self._spill_read += count * frame_bytes
+        if self._spill_read == self._spill_write:
+            # 全部读完后清空文件，避免溢出文件无限增长
+            self._spill.truncate(0)
+            self._spill_read = self._spill_write = 0
+        return data
+
+
+class RingBuffer:
+    """
+    预分配的 float32 环形缓冲区，供所有数据源共享使用。
+
+    缓冲区维护一个单调递增的样本计数器（写入总数），消费者可以用它作为游标，
+    只获取自上次读取以来的新样本，而无需每次复制整个缓冲区。
+    需要知道自己是否丢失样本的消费者应通过 add_consumer() 注册，由缓冲区维护游标并
+    逐个消费者报告因溢出错过的样本数；注册时还可以选择阻塞写入方或溢出到磁盘的无损策略。
+
+    多通道数据按帧存储：channels 大于 1 时缓冲区形状为 (capacity, channels)，
+    写入和读出的数组形状均为 (样本数, channels)，样本数和游标都按帧计数；单通道时为一维数组。
+
+    若提供 metrics，会记录每次获取锁的等待时间（lock_wait），以及消费者错过的样本总数（dropped_samples）。
+
+    :param capacity: 缓冲区可保存的最大样本数（帧数）。
+    :param dtype: 样本的数据类型，默认为 float32。
+    :param metrics: PipelineMetrics 实例，可选。
+    :param block_timeout: block 策略下写入方最长等待时间（秒）。
+    :param channels: 通道数。
+    """
+
+    def __init__(self, capacity, dtype=np.float32, metrics=None, block_timeout=RING_BLOCK_TIMEOUT, channels=1):
+        """
+        初始化 RingBuffer 类。
+
+        :param capacity: 缓冲区可保存的最大样本数（帧数）。
+        :param dtype: 样本的数据类型，默认为 float32。
+        :param metrics: PipelineMetrics 实例，可选。
+        :param block_timeout: block 策略下写入方最长等待时间（秒）。
+        :param channels: 通道数。
+        """
+        self.capacity = int(capacity)  # 缓冲区容量
+        self.channels = int(channels)  # 通道数
+        shape = (self.capacity,) if self.channels == 1 else (self.capacity, self.channels)
+        self.buffer = np.zeros(shape, dtype=dtype)  # 预分配的样本存储
+        self.frame_bytes = self.buffer.itemsize * self.channels  # 每帧（每个采样时刻）的字节数
+        self.total_written = 0  # 单调递增的写入样本计数
+        self.lock = Lock()  # 保护缓冲区和计数器的锁
+        self.space_available = Condition(self.lock)  # 消费者读取后通知阻塞的写入方
+        self.metrics = metrics  # 运行指标
+        self.block_timeout = block_timeout
+        self.consumers = []  # 已注册的消费者
+
+    @contextmanager
+    def _locked(self):
+        """
+        获取缓冲区锁，并在启用指标时记录等待时间。
+        """
+        if self.metrics is None:
+            with self.lock:
+                yield
+            return
+        start = time.perf_counter()
+        with self.lock:
+            self.metrics.add_time("lock_wait", time.perf_counter() - start)
+            yield
+
+    def add_consumer(self, name, policy="drop"):
+        """
+        注册一个从当前位置开始读取的消费者。
+
+        :param name: 消费者名称，用于统计。
+        :param policy: 溢出策略，见 OVERFLOW_POLICIES。
+        :return: RingConsumer 实例。
+        :raises ValueError: 当溢出策略未知时抛出异常。
+        """
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f'未知的溢出策略: {policy}')
+        with self.lock:
+            consumer = RingConsumer(self, name, policy, self.total_written)
+            self.consumers.append(consumer)
+            return consumer
+
+    def remove_consumer(self, consumer):
+        """
+        注销消费者。
+
+        :param consumer: add_consumer() 返回的 RingConsumer。
+        """
+        with self.lock:
+            if consumer in self.consumers:
+                self.consumers.remove(consumer)
+            self.space_available.notify_all()
+
+    def consumer_stats(self):
+        """
+        获取每个消费者的统计信息。
+
+        :return: 字典，键为消费者名称，值包含 policy、backlog（未读样本数）、missed（累计错过）和 spilled（累计溢出到磁盘）。
+        """
+        with self.lock:
+            return {
+                consumer.name: {
+                    "policy": consumer.policy,
+                    "backlog": self.total_written - consumer.cursor + consumer.spill_pending,
+                    "missed": consumer.missed,
+                    "spilled": consumer.spilled,
+                }
+                for consumer in self.consumers
+            }
+
+    def write(self, samples):
+        """
+        写入一块样本，缓冲区已满时覆盖最旧的样本。
+
+        若有 block 策略的消费者尚未读取即将被覆盖的样本，先等待其读取；
+        若有 spill 策略的消费者，先把它未读的、即将被覆盖的样本写入其溢出文件。
+
+        :param samples: 样本数组或序列。
+        """
+        samples = np.asarray(samples, dtype=self.buffer.dtype)
+        if len(samples) > self.capacity and self.consumers:
+            # 逐段写入，使阻塞和溢出策略能在每段之间生效
+            for start in range(0, len(samples), self.capacity):
+                self.write(samples[start:start + self.capacity])
+            return
+        count = len(samples)
+        if count == 0:
+            return
+        if count > self.capacity:
+            samples = samples[-self.capacity:]  # 只有最后 capacity 个样本会被保留
+        n = len(samples)
+        with self._locked():
+            if self.consumers:
+                self._make_room(samples, count)
+            start = (self.total_written + count - n) % self.capacity
+            first = min(n, self.capacity - start)
+            self.buffer[start:start + first] = samples[:first]
+            self.buffer[:n - first] = samples[first:]
+            self.total_written += count
+
+    def _make_room(self, samples, count):
+        """
+        在覆盖旧样本之前执行消费者的溢出策略，调用者需持有锁且 count 不超过容量。
+
+        :param samples: 即将写入的样本。
+        :param count: 样本数。
+        """
+        new_oldest = self.total_written + count - self.capacity  # 写入后缓冲区中最旧样本的序号
+        deadline = None
+        while True:
+            blocking = [c for c in self.consumers if c.policy == "block" and c.cursor < new_oldest]
+            if not blocking:
+                break
+            if deadline is None:
+                deadline = time.monotonic() + self.block_timeout
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break  # 超时后放弃等待，未读样本被覆盖，消费者下次读取时会得到错过的样本数
+            self.space_available.wait(remaining)
+
+        for consumer in self.consumers:
+            if consumer.policy == "spill" and consumer.cursor < new_oldest:
+                consumer._spill_samples(self._copy_range(consumer.cursor, new_oldest))
+                consumer.cursor = new_oldest
+
+    def _read(self, consumer, max_count):
+        """
+        读取消费者游标之后的新样本，见 RingConsumer.read()。
+        """
+        with self._locked():
+            parts = []
+            if consumer.spill_pending:
+                parts.append(consumer._take_spill(max_count))
+                if max_count is not None:
+                    max_count -= len(parts[0])
+            oldest = max(0, self.total_written - self.capacity)
+            missed = max(0, oldest - consumer.cursor)
+            start = max(consumer.cursor, oldest)
+            stop = self.total_written if max_count is None else min(self.total_written, start + max_count)
+            parts.append(self._copy_range(start, stop))
+            consumer.cursor = stop
+            consumer.missed += missed
+            self.space_available.notify_all()
+        if missed and self.metrics is not None:
+            self.metrics.increment("dropped_samples", missed)
+        data = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        return data, missed
+
+    def _copy_range(self, start, stop):
+        """
+        复制绝对样本区间 [start, stop) 的数据，调用者需持有锁且保证区间有效。
+
+        :return: 新分配的数组。
+        """
+        begin = start % self.capacity
+        end = begin + (stop - start)
+        if end <= self.capacity:
+            return self.buffer[begin:end].copy()
+        return np.concatenate((self.buffer[begin:], self.buffer[:end - self.capacity]))
+
+    def get_range(self, start, stop):
+        """
+        获取绝对样本区间 [start, stop) 中仍在缓冲区内的部分。
+
+        :param start: 起始样本序号。
+        :param stop: 结束样本序号（不含）。
+        :return: (实际起始序号, 样本数组)，已被覆盖或尚未写入的部分被截掉。
+        """
+        with self._locked():
+            start = max(start, self.total_written - self.capacity, 0)
+            stop = min(stop, self.total_written)
+            if stop <= start:
+                return start, self.buffer[:0].copy()
+            return start, self._copy_range(start, stop)
+
+    def get_latest(self, n=None):
+        """
+        获取最近写入的 n 个样本（单次复制）。
+
+        :param n: 需要的样本数，为 None 时返回缓冲区中全部有效样本。
+        :return: 按时间顺序排列的样本数组，长度可能小于 n。
+        """
+        with self._locked():
+            available = min(self.total_written, self.capacity)
+            if n is None or n > available:
+                n = available
+            return self._copy_range(self.total_written - n, self.total_written)
+
+    def get_data_since(self, cursor):
+        """
+        获取游标之后写入的新样本。
+
+        若游标落后于缓冲区中最旧的样本，则从最旧的有效样本开始返回，错过的样本数不会报告；
+        需要丢失统计或无损读取时请使用 add_consumer()。
+
+        :param cursor: 上次读取返回的游标（绝对样本序号）。
+        :return: (新样本数组, 新游标)。
+        """
+        with self._locked():
+            oldest = max(0, self.total_written - self.capacity)
+            start = min(max(cursor, oldest), self.total_written)
+            if cursor < oldest and self.metrics is not None:
+                self.metrics.increment("dropped_samples", oldest - cursor)
+            return self._copy_range(start, self.total_written), self.total_written
+
+    def get_cursor(self):
+        """
+        获取当前游标，即已写入的样本总数。
+
+        :return: 当前写入计数。
+        """
+        with self.lock:
+            return self.total_written
+
+    def __len__(self):
+        """
+        :return: 缓冲区中当前有效的样本数。
+        """
+        with self.lock:
+            return min(self.total_written, self.capacity)
+
+
+class BufferedReader:
+    """
+    读取器公共接口的混入类：速率和样本访问都委托给 self.data_buffer 和 self.metrics。
+
+    USBReader、SimulatedSignalGenerator、ReplayReader、ProcessReader 和 FilteredReader 都把样本写入
+    data_buffer（RingBuffer 或 SharedRingBuffer），GUI、保存器和 MultiReader 只通过这些方法读取。
+    """
+
+    def get_speed(self):
+        """
+        计算最近一段时间（METRICS_WINDOW 秒）的数据接收速率。
+
+        :return: 数据接收速率，单位为 KB/s。
+        """
+        return self.metrics.byte_rate() / 1024
+
+    def get_data(self):
+        """
+        获取当前存储在缓冲区中的全部数据。
+
+        :return: float32 数组，包含最近最多 QUEUE_MAXLEN 个样本。
+        """
+        return self.data_buffer.get_latest()
+
+    def get_latest(self, n):
+        """
+        获取最近的 n 个样本。
+
+        :param n: 需要的样本数。
+        :return: float32 数组，长度不超过 n。
+        """
+        return self.data_buffer.get_latest(n)
+
+    def get_range(self, start, stop):
+        """
+        获取绝对样本区间 [start, stop) 中仍在缓冲区内的部分。
+
+        :param start: 起始样本序号。
+        :param stop: 结束样本序号（不含）。
+        :return: (实际起始序号, 样本数组)。
+        """
+        return self.data_buffer.get_range(start, stop)
+
+    def get_data_since(self, cursor):
+        """
+        获取游标之后的新样本。
+
+        :param cursor: 上次读取返回的游标。
+        :return: (新样本数组, 新游标)。
+        """
+        return self.data_buffer.get_data_since(cursor)
+
+    def add_consumer(self, name, policy="drop"):
+        """
+        注册一个按游标读取新样本、并报告错过样本数的消费者。
+
+        :param name: 消费者名称。
+        :param policy: 溢出策略：drop、block 或 spill，见 RingConsumer（SharedRingBuffer 把 spill 按 block 处理）。
+        :return: 消费者实例，用完后应调用其 close()。
+        """
+        return self.data_buffer.add_consumer(name, policy)
+
+    def get_cursor(self):
+        """
+        获取当前游标，即已写入缓冲区的样本总数。
+
+        :return: 当前游标。
+        """
+        return self.data_buffer.get_cursor()
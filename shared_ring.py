@@ -0,0 +1,381 @@
+import time
+import numpy as np
+from threading import Lock
+from multiprocessing import shared_memory
+from config import RING_BLOCK_TIMEOUT
+from ring_buffer import OVERFLOW_POLICIES
+
+STATS = ("bytes_received", "usb_timeouts", "sequence_gaps", "lost_packets")  # 写入进程发布到头部的统计量
+MAX_CONSUMERS = 16  # 头部中的消费者槽位数
+
+# 头部为 int64 数组，各字段的下标
+WRITE_END = 0  # 写入方正在写入的区间终点，写数据之前更新
+TOTAL_WRITTEN = 1  # 已完成写入的样本总数，写完数据之后更新
+CAPACITY = 2  # 缓冲区容量（帧数）
+CHANNELS = 3  # 通道数
+CONTROL = 4  # 控制字，供读写双方传递启动、停止等状态，含义由使用者约定
+STATS_OFFSET = 5  # 统计量起始下标
+SLOTS_OFFSET = STATS_OFFSET + len(STATS)  # 消费者槽位起始下标，每个槽位为 (状态, 游标)
+HEADER_BYTES = 512  # 头部字节数，数据区从此处开始（按缓存行对齐）
+
+SLOT_FREE, SLOT_DROP, SLOT_BLOCK = 0, 1, 2  # 消费者槽位状态
+
+
+class SharedRingConsumer:
+    """
+    共享内存环形缓冲区的消费者，由 SharedRingBuffer.add_consumer() 创建。
+
+    接口与 RingConsumer 相同；游标保存在共享内存的槽位中，写入进程据此执行 block 策略。
+
+    :param ring: 所属的 SharedRingBuffer。
+    :param name: 消费者名称。
+    :param policy: 溢出策略。
+    :param slot: 头部中的槽位序号。
+    :param cursor: 初始游标。
+    """
+
+    def __init__(self, ring, name, policy, slot, cursor):
+        """
+        初始化 SharedRingConsumer 类。
+
+        :param ring: 所属的 SharedRingBuffer。
+        :param name: 消费者名称。
+        :param policy: 溢出策略。
+        :param slot: 头部中的槽位序号。
+        :param cursor: 初始游标。
+        """
+        self.ring = ring
+        self.name = name
+        self.policy = policy
+        self.slot = slot
+        self.cursor = cursor  # 下一个要读取的样本的绝对序号
+        self.missed = 0  # 累计错过的样本数
+
+    def read(self, max_count=None):
+        """
+        读取游标之后的新样本。
+
+        :param max_count: 最多读取的样本数，为 None 时读取全部。
+        :return: (新样本数组, 自上次读取以来错过的样本数)。
+        """
+        ring = self.ring
+        total = ring.get_cursor()
+        start = max(self.cursor, total - ring.capacity, 0)
+        stop = total if max_count is None else min(total, start + max_count)
+        start_valid, data = ring.get_range(start, stop)
+        missed = start_valid - self.cursor
+        self.cursor = start_valid + len(data)
+        self.missed += missed
+        ring.header[SLOTS_OFFSET + 2 * self.slot + 1] = self.cursor
+        if missed and ring.metrics is not None:
+            ring.metrics.increment("dropped_samples", missed)
+        return data, missed
+
+    def close(self):
+        """
+        注销消费者，释放槽位。
+        """
+        self.ring.remove_consumer(self)
+
+
+class SharedRingBuffer:
+    """
+    基于 multiprocessing.shared_memory 的单写多读环形缓冲区，用于在采集进程和 GUI 进程之间传递样本。
+
+    共享内存由 int64 头部和样本数据区组成。写入方先把 WRITE_END 更新为本次写入的终点，
+    再复制数据，最后更新 TOTAL_WRITTEN，整个过程不加锁；读取方按 TOTAL_WRITTEN 确定可读区间，
+    复制后再读 WRITE_END，判断复制期间是否有样本被覆盖，被覆盖的部分作为错过的样本丢弃。
+    这依赖于对齐的 8 字节整数写入是原子的，在 x86-64 和 ARM64 上成立。
+
+    只允许一个写入方（采集进程）。消费者在读取进程中注册，占用头部中的一个槽位并在其中发布游标，
+    写入方据此执行 block 策略；spill 策略需要写入方访问消费者的溢出文件，在这里按 block 处理，同样不丢失样本。
+    views() 返回直接指向共享内存的视图，不复制数据，使用后应通过 valid_from() 确认数据未被覆盖。
+
+    对象可以传给子进程（按名称重新映射同一块共享内存）；创建者负责在最后调用 unlink()。
+
+    :param capacity: 缓冲区可保存的最大样本数（帧数）。
+    :param channels: 通道数。
+    :param metrics: PipelineMetrics 实例，可选，用于统计读取进程中消费者错过的样本数。
+    :param block_timeout: block 策略下写入方最长等待时间（秒）。
+    :param name: 已有共享内存的名称，为 None 时创建新的共享内存。
+    """
+
+    def __init__(self, capacity=None, channels=1, metrics=None, block_timeout=RING_BLOCK_TIMEOUT, name=None):
+        """
+        初始化 SharedRingBuffer 类，创建或映射共享内存。
+
+        :param capacity: 缓冲区可保存的最大样本数（帧数），映射已有共享内存时忽略。
+        :param channels: 通道数，映射已有共享内存时忽略。
+        :param metrics: PipelineMetrics 实例，可选。
+        :param block_timeout: block 策略下写入方最长等待时间（秒）。
+        :param name: 已有共享内存的名称，为 None 时创建新的共享内存。
+        """
+        if name is None:
+            size = HEADER_BYTES + int(capacity) * int(channels) * np.dtype(np.float32).itemsize
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.header = np.ndarray((HEADER_BYTES // 8,), dtype=np.int64, buffer=self.shm.buf)
+            self.header[:] = 0
+            self.header[CAPACITY] = capacity
+            self.header[CHANNELS] = channels
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.header = np.ndarray((HEADER_BYTES // 8,), dtype=np.int64, buffer=self.shm.buf)
+        self.name = self.shm.name  # 共享内存名称，其他进程用它映射同一缓冲区
+        self.capacity = int(self.header[CAPACITY])  # 缓冲区容量
+        self.channels = int(self.header[CHANNELS])  # 通道数
+        shape = (self.capacity,) if self.channels == 1 else (self.capacity, self.channels)
+        self.buffer = np.ndarray(shape, dtype=np.float32, buffer=self.shm.buf, offset=HEADER_BYTES)
+        self.frame_bytes = self.buffer.itemsize * self.channels  # 每帧的字节数
+        self.metrics = metrics  # 运行指标
+        self.block_timeout = block_timeout
+        self.lock = Lock()  # 保护本进程内的槽位分配
+        self.consumers = []  # 本进程注册的消费者
+
+    @classmethod
+    def attach(cls, name, metrics=None):
+        """
+        映射已有的共享内存环形缓冲区。
+
+        :param name: 共享内存名称。
+        :param metrics: PipelineMetrics 实例，可选。
+        :return: SharedRingBuffer 实例。
+        """
+        return cls(metrics=metrics, name=name)
+
+    def __reduce__(self):
+        return self.attach, (self.name,)
+
+    def write(self, samples):
+        """
+        写入一块样本，缓冲区已满时覆盖最旧的样本。只能由一个写入方调用。
+
+        若有 block（或 spill）策略的消费者尚未读取即将被覆盖的样本，先等待其读取，
+        最多等待 block_timeout 秒。
+
+        :param samples: 样本数组或序列。
+        """
+        samples = np.asarray(samples, dtype=self.buffer.dtype)
+        if len(samples) > self.capacity and len(self._blocking_slots()):
+            for start in range(0, len(samples), self.capacity):
+                self.write(samples[start:start + self.capacity])
+            return
+        count = len(samples)
+        if count == 0:
+            return
+        if count > self.capacity:
+            samples = samples[-self.capacity:]  # 只有最后 capacity 个样本会被保留
+        n = len(samples)
+        total = int(self.header[TOTAL_WRITTEN])
+        self._wait_for_consumers(total + count - self.capacity)
+        self.header[WRITE_END] = total + count
+        start = (total + count - n) % self.capacity
+        first = min(n, self.capacity - start)
+        self.buffer[start:start + first] = samples[:first]
+        self.buffer[:n - first] = samples[first:]
+        self.header[TOTAL_WRITTEN] = total + count
+
+    def _blocking_slots(self):
+        """
+        :return: 处于 block 状态的槽位序号列表。
+        """
+        states = self.header[SLOTS_OFFSET:SLOTS_OFFSET + 2 * MAX_CONSUMERS:2]
+        return np.flatnonzero(states == SLOT_BLOCK)
+
+    def _wait_for_consumers(self, new_oldest):
+        """
+        等待 block 策略的消费者读到 new_oldest 之后，超时后放弃等待。
+
+        :param new_oldest: 写入后缓冲区中最旧样本的序号。
+        """
+        if new_oldest <= 0:
+            return
+        deadline = None
+        while True:
+            slots = self._blocking_slots()
+            cursors = self.header[SLOTS_OFFSET + 2 * slots + 1]
+            if not np.any(cursors < new_oldest):
+                return
+            if deadline is None:
+                deadline = time.monotonic() + self.block_timeout
+            elif time.monotonic() >= deadline:
+                return  # 超时后未读样本被覆盖，消费者下次读取时会得到错过的样本数
+            time.sleep(0.0005)
+
+    def add_consumer(self, name, policy="drop"):
+        """
+        注册一个从当前位置开始读取的消费者。
+
+        :param name: 消费者名称。
+        :param policy: 溢出策略，见 OVERFLOW_POLICIES；spill 按 block 处理。
+        :return: SharedRingConsumer 实例。
+        :raises ValueError: 当溢出策略未知或槽位已满时抛出异常。
+        """
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f'未知的溢出策略: {policy}')
+        with self.lock:
+            states = self.header[SLOTS_OFFSET:SLOTS_OFFSET + 2 * MAX_CONSUMERS:2]
+            free = np.flatnonzero(states == SLOT_FREE)
+            if not len(free):
+                raise ValueError(f'共享环形缓冲区的消费者数量已达上限 {MAX_CONSUMERS}')
+            slot = int(free[0])
+            cursor = self.get_cursor()
+            self.header[SLOTS_OFFSET + 2 * slot + 1] = cursor
+            self.header[SLOTS_OFFSET + 2 * slot] = SLOT_DROP if policy == "drop" else SLOT_BLOCK
+            consumer = SharedRingConsumer(self, name, policy, slot, cursor)
+            self.consumers.append(consumer)
+            return consumer
+
+    def remove_consumer(self, consumer):
+        """
+        注销消费者，释放其槽位。
+
+        :param consumer: add_consumer() 返回的 SharedRingConsumer。
+        """
+        with self.lock:
+            if consumer in self.consumers:
+                self.consumers.remove(consumer)
+                self.header[SLOTS_OFFSET + 2 * consumer.slot] = SLOT_FREE
+
+    def consumer_stats(self):
+        """
+        获取本进程中每个消费者的统计信息。
+
+        :return: 字典，键为消费者名称，值包含 policy、backlog（未读样本数）和 missed（累计错过）。
+        """
+        total = self.get_cursor()
+        with self.lock:
+            return {
+                consumer.name: {
+                    "policy": consumer.policy,
+                    "backlog": total - consumer.cursor,
+                    "missed": consumer.missed,
+                }
+                for consumer in self.consumers
+            }
+
+    def valid_from(self):
+        """
+        :return: 当前仍有效（未被覆盖、也未在覆盖中）的最旧样本序号。
+        """
+        return max(0, int(self.header[WRITE_END]) - self.capacity)
+
+    def views(self, start, stop):
+        """
+        获取绝对样本区间 [start, stop) 在共享内存中的视图，不复制数据。
+
+        区间跨越缓冲区末尾时返回两个视图。视图中的数据可能随时被写入方覆盖，
+        使用后若 valid_from() 大于 start，则前 valid_from() - start 个样本已不可信。
+
+        :param start: 起始样本序号，调用者需保证不早于 valid_from()。
+        :param stop: 结束样本序号（不含），调用者需保证不晚于 get_cursor()。
+        :return: 视图列表，按时间顺序排列。
+        """
+        begin = start % self.capacity
+        end = begin + (stop - start)
+        if end <= self.capacity:
+            return [self.buffer[begin:end]]
+        return [self.buffer[begin:], self.buffer[:end - self.capacity]]
+
+    def get_range(self, start, stop):
+        """
+        复制绝对样本区间 [start, stop) 中仍在缓冲区内的部分。
+
+        :param start: 起始样本序号。
+        :param stop: 结束样本序号（不含）。
+        :return: (实际起始序号, 样本数组)，已被覆盖或尚未写入的部分被截掉。
+        """
+        stop = min(stop, self.get_cursor())
+        start = max(start, self.valid_from())
+        if stop <= start:
+            return start, self.buffer[:0].copy()
+        parts = self.views(start, stop)
+        data = parts[0].copy() if len(parts) == 1 else np.concatenate(parts)
+        # 复制期间写入方可能已开始覆盖区间开头的样本，这部分丢弃
+        skip = min(self.valid_from(), stop) - start
+        if skip > 0:
+            return start + skip, data[skip:]
+        return start, data
+
+    def get_latest(self, n=None):
+        """
+        获取最近写入的 n 个样本。
+
+        :param n: 需要的样本数，为 None 时返回缓冲区中全部有效样本。
+        :return: 按时间顺序排列的样本数组，长度可能小于 n。
+        """
+        total = self.get_cursor()
+        n = self.capacity if n is None else min(n, self.capacity)
+        return self.get_range(total - n, total)[1]
+
+    def get_data_since(self, cursor):
+        """
+        获取游标之后写入的新样本，错过的样本数不会报告。
+
+        :param cursor: 上次读取返回的游标（绝对样本序号）。
+        :return: (新样本数组, 新游标)。
+        """
+        total = self.get_cursor()
+        return self.get_range(cursor, total)[1], total
+
+    def get_cursor(self):
+        """
+        获取当前游标，即已完成写入的样本总数。
+
+        :return: 当前写入计数。
+        """
+        return int(self.header[TOTAL_WRITTEN])
+
+    def set_control(self, value):
+        """
+        设置控制字。
+
+        :param value: 整数状态值。
+        """
+        self.header[CONTROL] = value
+
+    def control(self):
+        """
+        :return: 当前控制字。
+        """
+        return int(self.header[CONTROL])
+
+    def set_stat(self, name, value):
+        """
+        发布一个统计量（由写入进程调用）。
+
+        :param name: 统计量名称，见 STATS。
+        :param value: 累计值。
+        """
+        self.header[STATS_OFFSET + STATS.index(name)] = value
+
+    def stat(self, name):
+        """
+        :param name: 统计量名称，见 STATS。
+        :return: 写入进程发布的累计值。
+        """
+        return int(self.header[STATS_OFFSET + STATS.index(name)])
+
+    def __len__(self):
+        """
+        :return: 缓冲区中当前有效的样本数。
+        """
+        return min(self.get_cursor(), self.capacity)
+
+    def close(self):
+        """
+        解除本进程对共享内存的映射。之后不能再访问缓冲区，views() 返回的视图也必须已释放。
+        """
+        if self.shm is None:
+            return
+        del self.header, self.buffer
+        self.shm.close()
+        self.shm = None
+
+    def unlink(self):
+        """
+        解除映射并删除共享内存，由创建者在所有进程都不再使用后调用。
+        """
+        shm = self.shm
+        self.close()
+        if shm is not None:
+            shm.unlink()
@@ -1,57 +1,99 @@
-import math
-import random
 import time
-from threading import Thread, Event, Lock
-from collections import deque
+import numpy as np
+from threading import Thread, Event
 from config import QUEUE_MAXLEN, SAMPLE_RATE
+from ring_buffer import RingBuffer, BufferedReader
+from metrics import PipelineMetrics
+from signal_models import Tone, UniformNoise, CompositeSignal
 
-class SimulatedSignalGenerator(Thread):
+class SimulatedSignalGenerator(BufferedReader, Thread):
     """
-    模拟信号生成器类，用于生成带有噪声的正弦波信号。
+    模拟信号生成器类，按配置的采样率实时生成信号。
 
-    :param frequency: 信号的频率，默认为 10000 Hz。
-    :param noise_level: 噪声的水平，默认为 0.1。
+    信号由 signal_models 中的模型组合而成，每次用 NumPy 生成一整块样本，相位在块之间连续。
+    生成节奏由单调时钟驱动：每次循环补齐"已经过的时间 × 采样率"与已生成样本数之间的差额，
+    因此实际输出速率与 sample_rate 一致，不受单次循环耗时和 sleep 精度的影响。
+    落后（例如被 block 策略的消费者阻塞）之后补齐的样本同样写入环形缓冲区，不会跳过，
+    来不及读取的消费者会得到错过的样本数，保存器据此记录缺口。
+
+    channels 大于 1 时模拟多通道设备，输出形状为 (样本数, channels) 的帧；
+    models 此时为每个通道一个模型（或模型列表）的列表，为 None 时第 k 个通道（从 0 开始）
+    使用频率为 frequency × (k + 1) 的正弦波加噪声。
+
+    :param frequency: 默认正弦信号的频率，默认为 10000 Hz。
+    :param noise_level: 默认均匀噪声的水平，默认为 0.1。
+    :param models: 信号模型或模型列表，为 None 时使用 frequency 和 noise_level 构造的正弦波加噪声。
+    :param sample_rate: 采样率（Hz）。
+    :param block_size: 单次生成的最大样本数。
+    :param channels: 通道数。
     """
-    
-    def __init__(self, frequency=10000, noise_level=0.1):
+
+    def __init__(self, frequency=10000, noise_level=0.1, models=None, sample_rate=SAMPLE_RATE, block_size=65536,
+                 channels=1):
         """
         初始化 SimulatedSignalGenerator 类。
 
-        :param frequency: 信号的频率，默认为 10000 Hz。
-        :param noise_level: 噪声的水平，默认为 0.1。
+        :param frequency: 默认正弦信号的频率，默认为 10000 Hz。
+        :param noise_level: 默认均匀噪声的水平，默认为 0.1。
+        :param models: 信号模型或模型列表。
+        :param sample_rate: 采样率（Hz）。
+        :param block_size: 单次生成的最大样本数。
+        :param channels: 通道数。
+        :raises ValueError: 当多通道模型列表的长度与通道数不一致时抛出异常。
         """
         super().__init__()
         self.frequency = frequency  # 信号的频率
-        self.sample_rate = SAMPLE_RATE  # 采样率
+        self.sample_rate = sample_rate  # 采样率
         self.noise_level = noise_level  # 噪声水平
-        self.t = 0  # 初始化时间步
+        self.channels = channels  # 通道数
+        if channels == 1:
+            models = [models if models is not None else [Tone(frequency), UniformNoise(noise_level)]]
+        elif models is None:
+            models = [[Tone(frequency * (k + 1)), UniformNoise(noise_level)] for k in range(channels)]
+        elif len(models) != channels:
+            raise ValueError(f'模型列表长度 {len(models)} 与通道数 {channels} 不一致')
+        # 每个通道的组合信号模型
+        self.channel_models = [CompositeSignal(m if isinstance(m, (list, tuple)) else [m]) for m in models]
+        self.model = self.channel_models[0]  # 第一个通道的组合信号模型
+        self.block_size = block_size  # 单次生成的最大样本数
+        self.t = 0  # 已生成的样本数
         self.byte_count = 0  # 已生成的字节数
         self.start_time = time.time()  # 起始时间
-        self.data_queue = deque(maxlen=QUEUE_MAXLEN)  # 数据队列，有限长度
-        self.data_lock = Lock()  # 数据队列的锁
+        self.metrics = PipelineMetrics()  # 运行指标，与保存器和绘图部件共享
+        self.data_buffer = RingBuffer(QUEUE_MAXLEN, metrics=self.metrics, channels=channels)  # 样本环形缓冲区
         self.stop_event = Event()  # 停止事件
 
-    def generate_sample(self):
+    def generate_block(self, count):
         """
-        生成一个模拟的信号样本，包括正弦波和噪声。
+        生成一块连续的信号样本。
 
-        :return: 带有噪声的信号值。
+        :param count: 样本数。
+        :return: float32 信号数组，多通道时形状为 (count, channels)。
         """
-        value = math.sin(2 * math.pi * self.frequency * self.t / self.sample_rate)
-        noise = random.uniform(-self.noise_level, self.noise_level)
-        self.t += 1
-        return value + noise
+        if self.channels == 1:
+            block = self.model.generate(self.t, count, self.sample_rate).astype(np.float32)
+        else:
+            block = np.empty((count, self.channels), dtype=np.float32)
+            for channel, model in enumerate(self.channel_models):
+                block[:, channel] = model.generate(self.t, count, self.sample_rate)
+        self.t += count
+        return block
 
     def run(self):
         """
-        线程的主运行函数，持续生成信号样本并存储在数据队列中。
+        线程的主运行函数，按单调时钟补齐应生成的样本并存储在环形缓冲区中。
         """
+        start = time.monotonic()
         while not self.stop_event.is_set():
-            data = [self.generate_sample() for _ in range(100)]
-            self.byte_count += len(data) * 4  # 假设每个浮点数占 4 个字节
-            with self.data_lock:
-                self.data_queue.extend(data)
-            time.sleep(0.01)  # 模拟数据生成的延迟
+            target = int((time.monotonic() - start) * self.sample_rate)
+            # 积压超过缓冲区容量时也全部生成：被覆盖的样本由环形缓冲区按各消费者的溢出策略处理并计入错过的样本数，
+            # 样本序号和信号相位始终与经过的时间一致
+            while self.t < target and not self.stop_event.is_set():
+                data = self.generate_block(min(self.block_size, target - self.t))
+                self.data_buffer.write(data)
+                self.byte_count += data.nbytes
+                self.metrics.add_transfer(data.nbytes, len(data))
+            time.sleep(0.005)
 
     def stop(self):
         """
@@ -59,26 +101,6 @@ class SimulatedSignalGenerator(Thread):
         """
         self.stop_event.set()
 
-    def get_speed(self):
-        """
-        计算数据生成的速度。
-
-        :return: 数据生成的速度，单位为 KB/s。
-        """
-        elapsed_time = time.time() - self.start_time
-        if elapsed_time > 0:
-            return self.byte_count / elapsed_time / 1024  # 返回速率，单位为 KB/s
-        return 0
-
-    def get_data(self):
-        """
-        获取当前存储在数据队列中的信号数据。
-
-        :return: 信号数据的列表。
-        """
-        with self.data_lock:
-            return list(self.data_queue)
-
     def get_device_info(self):
         """
         获取模拟设备的信息。
@@ -92,5 +114,6 @@ class SimulatedSignalGenerator(Thread):
             "product": "Simulated Signal Generator",  # 产品名称为 "Simulated Signal Generator"
             "serial_number": "N/A",  # 序列号不适用
             "endpoint_address": "N/A",  # 端点地址不适用
-            "max_packet_size": "N/A"  # 最大数据包大小不适用
+            "max_packet_size": "N/A",  # 最大数据包大小不适用
+            "channels": self.channels  # 通道数
         }
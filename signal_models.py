@@ -0,0 +1,202 @@
+import numpy as np
+
+
+class SignalModel:
+    """
+    可组合信号模型的基类。
+
+    子类按块生成样本，跨块所需的状态（相位等）保存在实例中，
+    因此连续调用 generate() 得到的信号是连续的。模型之间可以用 + 组合。
+    """
+
+    def generate(self, start, count, sample_rate):
+        """
+        生成一块样本。
+
+        :param start: 第一个样本的绝对序号。
+        :param count: 样本数。
+        :param sample_rate: 采样率（Hz）。
+        :return: float64 样本数组。
+        """
+        raise NotImplementedError
+
+    def __add__(self, other):
+        return CompositeSignal([self, other])
+
+
+class CompositeSignal(SignalModel):
+    """
+    多个信号模型的叠加。
+
+    :param models: 信号模型列表。
+    """
+
+    def __init__(self, models):
+        self.models = []
+        for model in models:
+            self.models.extend(model.models if isinstance(model, CompositeSignal) else [model])
+
+    def generate(self, start, count, sample_rate):
+        total = np.zeros(count)
+        for model in self.models:
+            total += model.generate(start, count, sample_rate)
+        return total
+
+
+class Tone(SignalModel):
+    """
+    正弦波，相位在块之间连续累加。
+
+    :param frequency: 频率（Hz）。
+    :param amplitude: 幅度。
+    :param phase: 初始相位（弧度）。
+    """
+
+    def __init__(self, frequency, amplitude=1.0, phase=0.0):
+        self.frequency = frequency
+        self.amplitude = amplitude
+        self.phase = phase
+
+    def generate(self, start, count, sample_rate):
+        step = 2 * np.pi * self.frequency / sample_rate
+        phases = self.phase + step * np.arange(count)
+        self.phase = (self.phase + step * count) % (2 * np.pi)
+        return self.amplitude * np.sin(phases)
+
+
+class MultiTone(SignalModel):
+    """
+    多个正弦波之和，一次外积运算生成所有分量。
+
+    :param frequencies: 频率列表（Hz）。
+    :param amplitudes: 幅度列表，默认均为 1。
+    """
+
+    def __init__(self, frequencies, amplitudes=None):
+        self.frequencies = np.asarray(frequencies, dtype=np.float64)
+        self.amplitudes = np.ones(len(self.frequencies)) if amplitudes is None else np.asarray(amplitudes, dtype=np.float64)
+        self.phases = np.zeros(len(self.frequencies))
+
+    def generate(self, start, count, sample_rate):
+        steps = 2 * np.pi * self.frequencies / sample_rate
+        phases = self.phases[:, None] + steps[:, None] * np.arange(count)
+        self.phases = (self.phases + steps * count) % (2 * np.pi)
+        return self.amplitudes @ np.sin(phases)
+
+
+class Chirp(SignalModel):
+    """
+    线性扫频信号，每个周期从 start_frequency 扫到 stop_frequency 后重新开始。
+
+    :param start_frequency: 起始频率（Hz）。
+    :param stop_frequency: 终止频率（Hz）。
+    :param period: 扫频周期（秒）。
+    :param amplitude: 幅度。
+    """
+
+    def __init__(self, start_frequency, stop_frequency, period, amplitude=1.0):
+        self.start_frequency = start_frequency
+        self.stop_frequency = stop_frequency
+        self.period = period
+        self.amplitude = amplitude
+
+    def generate(self, start, count, sample_rate):
+        period_samples = max(1, int(round(self.period * sample_rate)))
+        tau = ((start + np.arange(count)) % period_samples) / sample_rate
+        rate = (self.stop_frequency - self.start_frequency) / self.period
+        return self.amplitude * np.sin(2 * np.pi * (self.start_frequency * tau + rate * tau ** 2 / 2))
+
+
+class AMTone(SignalModel):
+    """
+    调幅正弦波：A * (1 + depth * sin(2π fm t)) * sin(2π fc t)。
+
+    :param carrier: 载波频率（Hz）。
+    :param modulation_frequency: 调制频率（Hz）。
+    :param depth: 调制深度，取值 [0, 1]。
+    :param amplitude: 幅度。
+    """
+
+    def __init__(self, carrier, modulation_frequency, depth=0.5, amplitude=1.0):
+        self.carrier = Tone(carrier, amplitude)
+        self.modulation = Tone(modulation_frequency, depth)
+
+    def generate(self, start, count, sample_rate):
+        envelope = 1 + self.modulation.generate(start, count, sample_rate)
+        return envelope * self.carrier.generate(start, count, sample_rate)
+
+
+class FMTone(SignalModel):
+    """
+    调频正弦波，瞬时频率为 fc + deviation * sin(2π fm t)，相位由瞬时频率累加得到。
+
+    :param carrier: 载波频率（Hz）。
+    :param modulation_frequency: 调制频率（Hz）。
+    :param deviation: 频偏（Hz）。
+    :param amplitude: 幅度。
+    """
+
+    def __init__(self, carrier, modulation_frequency, deviation, amplitude=1.0):
+        self.carrier = carrier
+        self.modulation = Tone(modulation_frequency, deviation)
+        self.amplitude = amplitude
+        self.phase = 0.0
+
+    def generate(self, start, count, sample_rate):
+        frequency = self.carrier + self.modulation.generate(start, count, sample_rate)
+        phases = self.phase + np.cumsum(2 * np.pi * frequency / sample_rate)
+        self.phase = phases[-1] % (2 * np.pi) if count else self.phase
+        return self.amplitude * np.sin(phases)
+
+
+class GaussianNoise(SignalModel):
+    """
+    高斯白噪声。
+
+    :param std: 标准差。
+    :param seed: 随机数种子。
+    """
+
+    def __init__(self, std, seed=None):
+        self.std = std
+        self.rng = np.random.default_rng(seed)
+
+    def generate(self, start, count, sample_rate):
+        return self.rng.normal(0.0, self.std, count)
+
+
+class UniformNoise(SignalModel):
+    """
+    均匀分布噪声，取值范围 [-level, level]。
+
+    :param level: 噪声水平。
+    :param seed: 随机数种子。
+    """
+
+    def __init__(self, level, seed=None):
+        self.level = level
+        self.rng = np.random.default_rng(seed)
+
+    def generate(self, start, count, sample_rate):
+        return self.rng.uniform(-self.level, self.level, count)
+
+
+class Burst(SignalModel):
+    """
+    突发信号：每个周期内只在开头 duration 秒输出被门控的信号，其余时间为零。
+
+    :param model: 被门控的信号模型。
+    :param period: 突发周期（秒）。
+    :param duration: 每次突发的持续时间（秒）。
+    """
+
+    def __init__(self, model, period, duration):
+        self.model = model
+        self.period = period
+        self.duration = duration
+
+    def generate(self, start, count, sample_rate):
+        period_samples = max(1, int(round(self.period * sample_rate)))
+        on_samples = int(round(self.duration * sample_rate))
+        gate = (start + np.arange(count)) % period_samples < on_samples
+        return self.model.generate(start, count, sample_rate) * gate
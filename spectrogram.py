@@ -0,0 +1,124 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from config import SAMPLE_RATE, WATERFALL_FFT_SIZE, WATERFALL_HOP, WATERFALL_HISTORY
+from spectrum import make_window
+
+
+class IncrementalSTFT:
+    """
+    增量短时傅里叶变换，用于瀑布图。
+
+    每次只对新到达的样本计算新的列（时间片），不会重新计算历史数据。
+    第 k 列使用流中 [k*hop, k*hop + fft_size) 的样本；hop 大于 fft_size 时列之间的样本被跳过。
+
+    :param fft_size: 每列的 FFT 长度。
+    :param hop: 相邻两列之间的样本间隔。
+    :param sample_rate: 采样率（Hz）。
+    :param window: 窗函数名称。
+    """
+
+    def __init__(self, fft_size=WATERFALL_FFT_SIZE, hop=WATERFALL_HOP, sample_rate=SAMPLE_RATE, window="hann"):
+        """
+        初始化 IncrementalSTFT 类。
+
+        :param fft_size: 每列的 FFT 长度。
+        :param hop: 相邻两列之间的样本间隔。
+        :param sample_rate: 采样率（Hz）。
+        :param window: 窗函数名称。
+        """
+        self.fft_size = int(fft_size)
+        self.hop = max(1, int(hop))
+        self.sample_rate = sample_rate
+        self.bin_count = self.fft_size // 2 + 1
+        self.freqs = np.fft.rfftfreq(self.fft_size, d=1 / sample_rate)
+        self.window = make_window(window, self.fft_size)
+        self._scale = 2 / self.window.sum()  # 单边幅度校正
+        self._pending = np.empty(0, dtype=np.float32)  # 从下一列起点开始、尚未用完的样本
+        self._skip = 0  # 下一列起点之前还需丢弃的样本数
+
+    def reset(self):
+        """
+        丢弃未处理的样本，下一次从新数据重新开始分列。
+        """
+        self._pending = np.empty(0, dtype=np.float32)
+        self._skip = 0
+
+    def process(self, samples, max_columns=None):
+        """
+        处理新到达的样本，计算所有已完整的新列。
+
+        :param samples: 新样本（按时间顺序，与上次调用的样本连续）。
+        :param max_columns: 最多返回的列数，积压过多时只保留最新的列。
+        :return: 形状为 (列数, bin_count) 的幅度谱数组，单位为 dB。
+        """
+        samples = np.asarray(samples)
+        if self._skip:
+            skipped = min(self._skip, len(samples))
+            samples = samples[skipped:]
+            self._skip -= skipped
+        pending = np.concatenate((self._pending, samples)) if len(self._pending) else samples
+
+        if len(pending) < self.fft_size:
+            self._pending = pending.copy()
+            return np.empty((0, self.bin_count))
+
+        column_count = (len(pending) - self.fft_size) // self.hop + 1
+        first = 0 if max_columns is None else max(0, column_count - max_columns)
+        frames = sliding_window_view(pending, self.fft_size)[::self.hop][first:column_count]
+        spectra = np.abs(np.fft.rfft(frames * self.window, axis=1))
+        spectra *= self._scale
+        rows = 20 * np.log10(spectra + 1e-12)
+
+        consumed = column_count * self.hop
+        if consumed >= len(pending):
+            self._skip = consumed - len(pending)
+            self._pending = np.empty(0, dtype=np.float32)
+        else:
+            self._pending = pending[consumed:].copy()
+        return rows
+
+
+class WaterfallBuffer:
+    """
+    瀑布图的滚动二维图像缓冲区。
+
+    使用长度为 2 倍历史深度的镜像环形缓冲区：每一行同时写入两个位置，
+    因此按时间顺序排列的完整历史始终是一个连续的视图，
+    追加新行时既不移动历史数据，也不分配新的图像数组。
+
+    :param history: 保留的行数（时间片数）。
+    :param bin_count: 每行的频点数。
+    :param floor: 初始填充值（dB）。
+    """
+
+    def __init__(self, history=WATERFALL_HISTORY, bin_count=WATERFALL_FFT_SIZE // 2 + 1, floor=-120.0):
+        """
+        初始化 WaterfallBuffer 类。
+
+        :param history: 保留的行数。
+        :param bin_count: 每行的频点数。
+        :param floor: 初始填充值（dB）。
+        """
+        self.history = int(history)
+        self.bin_count = int(bin_count)
+        self._buffer = np.full((2 * self.history, self.bin_count), floor, dtype=np.float32)
+        self._head = 0  # 下一行写入的位置
+
+    def push(self, rows):
+        """
+        追加若干新行，超过历史深度的旧行被覆盖。
+
+        :param rows: 形状为 (行数, bin_count) 的数组。
+        """
+        rows = rows[-self.history:]
+        for row in rows:
+            self._buffer[self._head] = row
+            self._buffer[self._head + self.history] = row
+            self._head = (self._head + 1) % self.history
+
+    @property
+    def image(self):
+        """
+        按时间顺序（最旧在前）排列的历史视图，与内部缓冲区共享内存。
+        """
+        return self._buffer[self._head:self._head + self.history]
@@ -0,0 +1,206 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from config import SAMPLE_RATE, FFT_SIZE, FFT_WINDOW, FFT_AVERAGING, FFT_AVERAGE_COUNT, FFT_OVERLAP
+
+# 余弦和窗函数系数：w[n] = Σ (-1)^k a_k cos(2πkn/N)
+WINDOW_COEFFICIENTS = {
+    "rectangular": (1.0,),
+    "hann": (0.5, 0.5),
+    "blackmanharris": (0.35875, 0.48829, 0.14128, 0.01168),
+    "flattop": (0.21557895, 0.41663158, 0.277263158, 0.083578947, 0.006947368),
+}
+AVERAGING_MODES = ("none", "linear", "exponential", "peak", "welch")
+
+
+def make_window(name, size):
+    """
+    生成用于频谱分析的周期窗函数。
+
+    :param name: 窗函数名称，见 WINDOW_COEFFICIENTS。
+    :param size: 窗长度。
+    :return: float64 窗函数数组。
+    :raises ValueError: 当窗函数名称未知时抛出异常。
+    """
+    if name not in WINDOW_COEFFICIENTS:
+        raise ValueError(f'未知的窗函数: {name}')
+    phase = 2 * np.pi * np.arange(size) / size
+    window = np.zeros(size)
+    for k, coefficient in enumerate(WINDOW_COEFFICIENTS[name]):
+        window += (-1) ** k * coefficient * np.cos(k * phase)
+    return window
+
+
+class SpectrumEngine:
+    """
+    固定长度的加窗 rFFT 频谱计算引擎。
+
+    窗函数、频率轴和幅度校正系数在配置改变时计算一次并缓存，输出写入预分配的缓冲区。
+    输出为单边幅度谱，幅度为 A 的正弦信号对应的谱峰高度约为 A。
+
+    平均模式：
+        none：只显示当前帧；
+        linear：最近 average_count 帧的功率平均；
+        exponential：功率指数平均，新帧权重为 1/average_count；
+        peak：幅度峰值保持；
+        welch：在最近的样本上取 average_count 个相互重叠的分段做功率平均。
+
+    :param fft_size: FFT 长度。
+    :param sample_rate: 采样率（Hz）。
+    :param window: 窗函数名称。
+    :param averaging: 平均模式。
+    :param average_count: 参与平均的帧数或分段数。
+    :param overlap: Welch 分段的重叠比例，取值 [0, 1)。
+    """
+
+    def __init__(self, fft_size=FFT_SIZE, sample_rate=SAMPLE_RATE, window=FFT_WINDOW,
+                 averaging=FFT_AVERAGING, average_count=FFT_AVERAGE_COUNT, overlap=FFT_OVERLAP):
+        """
+        初始化 SpectrumEngine 类。
+
+        :param fft_size: FFT 长度。
+        :param sample_rate: 采样率（Hz）。
+        :param window: 窗函数名称。
+        :param averaging: 平均模式。
+        :param average_count: 参与平均的帧数或分段数。
+        :param overlap: Welch 分段的重叠比例。
+        """
+        self.fft_size = int(fft_size)
+        self.sample_rate = sample_rate
+        self.overlap = overlap
+        self.bin_count = self.fft_size // 2 + 1  # 单边谱的频点数
+        self.freqs = np.fft.rfftfreq(self.fft_size, d=1 / sample_rate)  # 缓存的频率轴
+        self.magnitude = np.zeros(self.bin_count)  # 输出幅度谱
+        self._frame = np.empty(self.fft_size)  # 加窗后的时域帧
+        self._power = np.empty(self.bin_count)  # 当前帧的功率谱
+        self._power_average = np.zeros(self.bin_count)  # 平均后的功率谱
+        self.set_averaging(averaging, average_count)
+        self.set_window(window)
+
+    def set_window(self, name):
+        """
+        切换窗函数，并重新计算幅度校正系数。
+
+        :param name: 窗函数名称。
+        """
+        self.window_name = name
+        self.window = make_window(name, self.fft_size)
+        # 单边幅度校正：除以窗函数之和，直流和奈奎斯特频点之外乘 2
+        self._scale = np.full(self.bin_count, 2 / self.window.sum())
+        self._scale[0] /= 2
+        if self.fft_size % 2 == 0:
+            self._scale[-1] /= 2
+        self._power_scale = self._scale ** 2
+        self.reset()
+
+    def set_averaging(self, mode, average_count=None):
+        """
+        切换平均模式。
+
+        :param mode: 平均模式，见 AVERAGING_MODES。
+        :param average_count: 参与平均的帧数或分段数，为 None 时保持不变。
+        :raises ValueError: 当平均模式未知时抛出异常。
+        """
+        if mode not in AVERAGING_MODES:
+            raise ValueError(f'未知的平均模式: {mode}')
+        self.averaging = mode
+        if average_count is not None:
+            self.average_count = max(1, int(average_count))
+            self._history = np.zeros((self.average_count, self.bin_count))  # 线性平均的功率谱历史
+        self.reset()
+
+    def reset(self):
+        """
+        清除平均状态。
+        """
+        self.frame_count = 0  # 已参与平均的帧数
+        self.magnitude[:] = 0
+        self._power_average[:] = 0
+        self._history[:] = 0
+
+    @property
+    def hop_size(self):
+        """
+        Welch 分段之间的步长（样本数）。
+        """
+        return max(1, int(self.fft_size * (1 - self.overlap)))
+
+    @property
+    def samples_needed(self):
+        """
+        计算一次频谱所需的最新样本数。
+        """
+        if self.averaging == "welch":
+            return self.fft_size + self.hop_size * (self.average_count - 1)
+        return self.fft_size
+
+    def update(self, samples):
+        """
+        用最新的样本计算频谱并按平均模式更新输出。
+
+        只使用 samples 末尾的 samples_needed 个样本，不足一帧时在前面补零。
+
+        :param samples: 按时间顺序排列的最新样本。
+        :return: 幅度谱数组 self.magnitude（就地更新，调用者不应修改）。
+        """
+        samples = np.asarray(samples)
+        if self.averaging == "welch":
+            self._update_welch(samples)
+            return self.magnitude
+
+        count = min(len(samples), self.fft_size)
+        self._frame[:self.fft_size - count] = 0
+        self._frame[self.fft_size - count:] = samples[len(samples) - count:]
+        self._frame *= self.window
+        spectrum = np.fft.rfft(self._frame)
+        np.multiply(spectrum.real, spectrum.real, out=self._power)
+        self._power += spectrum.imag * spectrum.imag
+        self._power *= self._power_scale
+
+        if self.averaging == "none":
+            np.sqrt(self._power, out=self.magnitude)
+        elif self.averaging == "linear":
+            slot = self.frame_count % self.average_count
+            self._power_average -= self._history[slot]
+            self._history[slot] = self._power
+            self._power_average += self._power
+            frames = min(self.frame_count + 1, self.average_count)
+            np.sqrt(np.maximum(self._power_average, 0) / frames, out=self.magnitude)
+        elif self.averaging == "exponential":
+            if self.frame_count == 0:
+                self._power_average[:] = self._power
+            else:
+                self._power_average += (self._power - self._power_average) / self.average_count
+            np.sqrt(self._power_average, out=self.magnitude)
+        elif self.averaging == "peak":
+            np.sqrt(self._power, out=self._power)
+            np.maximum(self.magnitude, self._power, out=self.magnitude)
+        self.frame_count += 1
+        return self.magnitude
+
+    def _update_welch(self, samples):
+        """
+        Welch 平均：对最近的 average_count 个重叠分段一次性做批量 rFFT 并平均功率。
+
+        :param samples: 按时间顺序排列的最新样本。
+        """
+        if len(samples) < self.fft_size:
+            padded = np.zeros(self.fft_size)
+            padded[self.fft_size - len(samples):] = samples
+            samples = padded
+        # 从末尾对齐分段，保证最后一个分段包含最新的样本
+        start = (len(samples) - self.fft_size) % self.hop_size
+        segments = sliding_window_view(samples[start:], self.fft_size)[::self.hop_size][-self.average_count:]
+        spectra = np.fft.rfft(segments * self.window, axis=1)
+        power = np.mean(spectra.real ** 2 + spectra.imag ** 2, axis=0)
+        np.sqrt(power, out=self.magnitude)
+        self.magnitude *= self._scale
+        self.frame_count += 1
+
+    def peak(self):
+        """
+        查找当前幅度谱中（不含直流分量的）最大频点。
+
+        :return: (频率, 幅度)。
+        """
+        index = np.argmax(self.magnitude[1:]) + 1
+        return self.freqs[index], self.magnitude[index]
@@ -0,0 +1,282 @@
+import os
+import json
+import numpy as np
+from config import SUMMARY_BLOCK, SUMMARY_FACTOR
+from recording import recording_paths, open_recording
+
+SUMMARY_SUFFIX = '.sum'  # 摘要索引文件后缀（NumPy npz 格式）
+SUMMARY_VERSION = 1  # 摘要索引格式版本
+
+
+def summary_path(path):
+    """
+    根据记录名称或任一记录文件路径，得到摘要索引文件的路径。
+
+    :param path: 记录的基本路径或任一记录文件路径。
+    :return: 摘要索引文件路径。
+    """
+    _, meta_path = recording_paths(path)
+    return os.path.splitext(meta_path)[0] + SUMMARY_SUFFIX
+
+
+class SummaryBuilder:
+    """
+    多分辨率摘要索引的增量构建器，随记录写入逐块更新。
+
+    第 0 级每 block 帧为一个桶，第 k 级每个桶合并第 k-1 级的 factor 个桶，
+    每个桶保存每个通道的最小值、最大值、和与平方和（float64，合并上一级时无需回看样本）。
+    不足一个桶的样本和不足 factor 个的桶暂存，到 finish() 时作为各级最后一个不完整的桶写入，
+    因此只有每一级的最后一个桶可能不完整。
+
+    :param channels: 通道数。
+    :param block: 第 0 级每个桶的帧数。
+    :param factor: 相邻两级的桶大小之比。
+    """
+
+    def __init__(self, channels=1, block=SUMMARY_BLOCK, factor=SUMMARY_FACTOR):
+        """
+        初始化 SummaryBuilder 类。
+
+        :param channels: 通道数。
+        :param block: 第 0 级每个桶的帧数。
+        :param factor: 相邻两级的桶大小之比。
+        """
+        self.channels = int(channels)  # 通道数
+        self.block = max(1, int(block))  # 第 0 级每个桶的帧数
+        self.factor = max(2, int(factor))  # 相邻两级的桶大小之比
+        self.sample_count = 0  # 已加入的帧数
+        self.pending = np.empty((0, self.channels), dtype=np.float32)  # 不足一个桶的样本
+        self.levels = []  # 每一级已完成的桶：{"min"、"max"、"sum"、"sumsq": 数组列表}
+        self.carry = []  # 每一级尚未合并到下一级的桶 (min, max, sum, sumsq)
+
+    def update(self, samples):
+        """
+        加入一块样本，完整的桶逐级合并。
+
+        :param samples: 样本数组，多通道时形状为 (样本数, channels)。
+        """
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1, self.channels)
+        self.sample_count += len(samples)
+        if len(self.pending):
+            samples = np.concatenate((self.pending, samples))
+        full = len(samples) // self.block * self.block
+        if full:
+            blocks = samples[:full].reshape(-1, self.block, self.channels)
+            wide = blocks.astype(np.float64)
+            self._add(0, blocks.min(axis=1), blocks.max(axis=1), wide.sum(axis=1), np.square(wide).sum(axis=1))
+        self.pending = samples[full:].copy()
+
+    def _add(self, level, minimum, maximum, total, squares):
+        """
+        把一组桶加入指定的级别，凑满 factor 个的桶合并到下一级。
+
+        :param level: 级别。
+        :param minimum: 每个桶的最小值，形状为 (桶数, channels)，下同。
+        :param maximum: 每个桶的最大值。
+        :param total: 每个桶的样本和。
+        :param squares: 每个桶的样本平方和。
+        """
+        if level == len(self.levels):
+            self.levels.append({"min": [], "max": [], "sum": [], "sumsq": []})
+            self.carry.append(None)
+        stats = (minimum, maximum, total, squares)
+        for key, values in zip(("min", "max", "sum", "sumsq"), stats):
+            self.levels[level][key].append(values)
+        if self.carry[level] is not None:
+            stats = tuple(np.concatenate(pair) for pair in zip(self.carry[level], stats))
+        full = len(stats[0]) // self.factor * self.factor
+        self.carry[level] = tuple(values[full:] for values in stats) if len(stats[0]) > full else None
+        if full:
+            groups = [values[:full].reshape(-1, self.factor, self.channels) for values in stats]
+            self._add(level + 1, groups[0].min(axis=1), groups[1].max(axis=1),
+                      groups[2].sum(axis=1), groups[3].sum(axis=1))
+
+    def finish(self):
+        """
+        写入各级最后一个不完整的桶，之后不应再调用 update()。
+        """
+        if len(self.pending):
+            wide = self.pending.astype(np.float64)
+            self._add(0, self.pending.min(axis=0, keepdims=True), self.pending.max(axis=0, keepdims=True),
+                      wide.sum(axis=0, keepdims=True), np.square(wide).sum(axis=0, keepdims=True))
+            self.pending = self.pending[:0]
+        # 只向已经存在的上一级合并，最高一级保留其全部桶
+        level = 0
+        while level + 1 < len(self.levels):
+            if self.carry[level] is not None:
+                minimum, maximum, total, squares = self.carry[level]
+                self.carry[level] = None
+                self._add(level + 1, minimum.min(axis=0, keepdims=True), maximum.max(axis=0, keepdims=True),
+                          total.sum(axis=0, keepdims=True), squares.sum(axis=0, keepdims=True))
+            level += 1
+
+    def save(self, path):
+        """
+        完成构建并把各级的最小值、最大值、均值和均方根（float32）写入摘要索引文件。
+
+        :param path: 摘要索引文件路径。
+        """
+        self.finish()
+        arrays = {}
+        for level, stats in enumerate(self.levels):
+            bucket = self.block * self.factor ** level
+            counts = np.full(sum(len(values) for values in stats["sum"]), bucket, dtype=np.float64)
+            counts[-1] = self.sample_count - bucket * (len(counts) - 1)
+            counts = counts[:, None]
+            arrays[f"min_{level}"] = np.concatenate(stats["min"]).astype(np.float32)
+            arrays[f"max_{level}"] = np.concatenate(stats["max"]).astype(np.float32)
+            arrays[f"mean_{level}"] = (np.concatenate(stats["sum"]) / counts).astype(np.float32)
+            arrays[f"rms_{level}"] = np.sqrt(np.concatenate(stats["sumsq"]) / counts).astype(np.float32)
+        with open(path, 'wb') as f:  # 传入文件对象，np.savez 不会追加 .npz 后缀
+            np.savez(f, version=SUMMARY_VERSION, block=self.block, factor=self.factor,
+                     sample_count=self.sample_count, channels=self.channels, **arrays)
+
+    def describe(self, path):
+        """
+        :param path: 摘要索引文件路径。
+        :return: 写入记录元数据的摘要索引说明。
+        """
+        return {"file": os.path.basename(path), "block": self.block, "factor": self.factor,
+                "levels": len(self.levels)}
+
+
+def build_summary(path, block=SUMMARY_BLOCK, factor=SUMMARY_FACTOR, block_size=1 << 20):
+    """
+    为已有的记录（没有摘要索引的旧记录，或异常中断未写出索引的记录）补建摘要索引，
+    并把索引说明写入记录的元数据。
+
+    :param path: 记录的基本路径或任一记录文件路径。
+    :param block: 第 0 级每个桶的帧数。
+    :param factor: 相邻两级的桶大小之比。
+    :param block_size: 每次读取的帧数。
+    :return: 摘要索引文件路径。
+    """
+    reader = open_recording(path)
+    builder = SummaryBuilder(reader.channels, block, factor)
+    for _, samples in reader.iter_blocks(block_size):
+        builder.update(samples)
+    index_path = summary_path(path)
+    builder.save(index_path)
+    reader.metadata["summary"] = builder.describe(index_path)
+    with open(reader.meta_path, 'w', encoding='utf-8') as f:
+        json.dump(reader.metadata, f, ensure_ascii=False, indent=2)
+    return index_path
+
+
+def open_summary(path, build=True):
+    """
+    打开记录的摘要索引。索引不存在或与记录的样本数不一致时按 build 补建。
+
+    :param path: 记录的基本路径或任一记录文件路径。
+    :param build: 索引缺失或过期时是否补建。
+    :return: SummaryIndex 实例。
+    :raises ValueError: 当索引缺失或过期且 build 为 False 时抛出异常。
+    """
+    index_path = summary_path(path)
+    if os.path.exists(index_path):
+        index = SummaryIndex(index_path)
+        if index.sample_count == len(open_recording(path)):
+            return index
+    if not build:
+        raise ValueError(f'记录没有可用的摘要索引: {index_path}')
+    return SummaryIndex(build_summary(path))
+
+
+class SummaryIndex:
+    """
+    多分辨率摘要索引读取器。
+
+    每一级的 min、max、mean、rms 数组形状为 (桶数, 通道数)，第 k 级每个桶覆盖 block * factor**k 帧，
+    最后一个桶可能不完整。索引很小，打开时整体加载到内存，查询不访问记录的数据文件。
+
+    :param path: 摘要索引文件路径。
+    """
+
+    def __init__(self, path):
+        """
+        初始化 SummaryIndex 类，加载所有级别。
+
+        :param path: 摘要索引文件路径。
+        :raises ValueError: 当索引格式版本不受支持时抛出异常。
+        """
+        self.path = path
+        with np.load(path) as data:
+            if int(data["version"]) != SUMMARY_VERSION:
+                raise ValueError(f'不支持的摘要索引版本: {int(data["version"])}')
+            self.block = int(data["block"])  # 第 0 级每个桶的帧数
+            self.factor = int(data["factor"])  # 相邻两级的桶大小之比
+            self.sample_count = int(data["sample_count"])  # 记录的帧数
+            self.channels = int(data["channels"])  # 通道数
+            self.levels = []  # 每一级的 {"min", "max", "mean", "rms"} 数组
+            while f"min_{len(self.levels)}" in data:
+                level = len(self.levels)
+                self.levels.append({key: data[f"{key}_{level}"] for key in ("min", "max", "mean", "rms")})
+
+    def bucket_size(self, level):
+        """
+        :param level: 级别。
+        :return: 该级每个桶的帧数。
+        """
+        return self.block * self.factor ** level
+
+    def choose_level(self, start, stop, buckets):
+        """
+        选择在 [start, stop) 内至少有 buckets 个桶的最粗一级。
+
+        :param start: 起始样本序号。
+        :param stop: 结束样本序号（不含）。
+        :param buckets: 需要的桶数，通常为绘图区域的像素宽度。
+        :return: 级别；范围太短、连最细一级也不够 buckets 个桶时返回 None，此时应读取原始样本。
+        """
+        chosen = None
+        for level in range(len(self.levels)):
+            if self.bucket_size(level) * buckets <= stop - start:
+                chosen = level
+        return chosen
+
+    def envelope(self, start, stop, buckets):
+        """
+        从索引中取出 [start, stop) 的最小/最大值包络，桶数多于 buckets 时再合并到 buckets 个。
+
+        :param start: 起始样本序号。
+        :param stop: 结束样本序号（不含）。
+        :param buckets: 输出的桶数上限，通常为绘图区域的像素宽度。
+        :return: (级别, 每个桶的起始样本序号, 最小值, 最大值)，最小值和最大值形状为 (桶数, 通道数)；
+                 范围太短时返回 None，应读取原始样本。
+        """
+        start, stop = max(0, start), min(stop, self.sample_count)
+        level = self.choose_level(start, stop, buckets)
+        if level is None:
+            return None
+        size = self.bucket_size(level)
+        first, last = start // size, -(-stop // size)
+        minimum = self.levels[level]["min"][first:last]
+        maximum = self.levels[level]["max"][first:last]
+        edges = np.arange(len(minimum))
+        if len(minimum) > buckets:
+            edges = np.linspace(0, len(minimum), buckets + 1).astype(np.intp)[:-1]
+            minimum = np.minimum.reduceat(minimum, edges, axis=0)
+            maximum = np.maximum.reduceat(maximum, edges, axis=0)
+        return level, (first + edges) * size, minimum, maximum
+
+    def stats(self, start, stop):
+        """
+        计算 [start, stop) 的统计量，范围按第 0 级的桶边界向外取整。
+
+        :param start: 起始样本序号。
+        :param stop: 结束样本序号（不含）。
+        :return: 每个通道的 {"min", "max", "mean", "rms"} 数组。
+        """
+        level = self.levels[0]
+        first = max(0, start) // self.block
+        last = max(first + 1, -(-min(stop, self.sample_count) // self.block))
+        counts = np.full(len(level["mean"]), self.block, dtype=np.float64)
+        counts[-1] = self.sample_count - self.block * (len(counts) - 1)
+        counts = counts[first:last, None]
+        total = counts.sum()
+        return {
+            "min": level["min"][first:last].min(axis=0),
+            "max": level["max"][first:last].max(axis=0),
+            "mean": (level["mean"][first:last] * counts).sum(axis=0) / total,
+            "rms": np.sqrt((np.square(level["rms"][first:last].astype(np.float64)) * counts).sum(axis=0) / total),
+        }
@@ -0,0 +1,247 @@
+import time
+import numpy as np
+from config import TRIGGER_MODE, TRIGGER_EDGE, TRIGGER_LEVEL, TRIGGER_HYSTERESIS, TRIGGER_POSITION, TRIGGER_AUTO_TIMEOUT
+
+TRIGGER_EDGES = ("rising", "falling")  # 支持的触发边沿
+TRIGGER_MODES = ("off", "auto", "normal", "single")  # 支持的触发模式
+
+
+def find_edges(samples, level, hysteresis=0.0, edge="rising", armed=False):
+    """
+    向量化查找样本中越过触发电平的边沿。
+
+    以上升沿为例：样本低于 level - hysteresis 时触发器布防，布防后第一个不低于 level 的样本即为触发点，
+    触发后需再次低于 level - hysteresis 才能重新布防，因此电平附近的噪声抖动不会产生多次触发。
+    下降沿按取反后的上升沿处理。每个样本先分类为布防、越过电平或两者皆非，
+    触发点就是前一个非零分类为布防的越过电平样本，不需要逐样本循环。
+
+    :param samples: 一维样本数组。
+    :param level: 触发电平。
+    :param hysteresis: 迟滞，不小于 0。
+    :param edge: 触发边沿：rising 或 falling。
+    :param armed: 样本之前触发器是否已布防（上一块末尾的状态）。
+    :return: (触发点下标数组, 样本末尾触发器是否处于布防状态)。
+    :raises ValueError: 当边沿名称未知或迟滞为负时抛出异常。
+    """
+    if edge not in TRIGGER_EDGES:
+        raise ValueError(f'未知的触发边沿: {edge}，可选: {", ".join(TRIGGER_EDGES)}')
+    if hysteresis < 0:
+        raise ValueError(f'触发迟滞不能为负: {hysteresis}')
+    samples = np.asarray(samples)
+    if edge == "falling":
+        samples, level = -samples, -level
+    kinds = np.zeros(len(samples), dtype=np.int8)
+    kinds[samples < level - hysteresis] = 1  # 布防
+    kinds[samples >= level] = 2  # 越过电平
+    index = np.flatnonzero(kinds)
+    if not len(index):
+        return index, armed
+    kinds = kinds[index]
+    previous = np.empty_like(kinds)
+    previous[0] = 1 if armed else 2
+    previous[1:] = kinds[:-1]
+    return index[(kinds == 2) & (previous == 1)], bool(kinds[-1] == 1)
+
+
+class Trigger:
+    """
+    边沿触发器，在连续到达的样本块中查找触发点，触发点用绝对样本序号表示。
+
+    布防状态和释抑（holdoff）跨块保留，样本块必须首尾相接；样本不连续时应先调用 reset()。
+    多通道样本（形状为 (样本数, 通道数)）只在 channel 指定的通道上查找。
+
+    :param level: 触发电平。
+    :param edge: 触发边沿：rising 或 falling。
+    :param hysteresis: 迟滞，不小于 0。
+    :param channel: 触发通道。
+    :param holdoff: 释抑样本数，一个触发点之后这么多样本内的边沿被忽略。
+    """
+
+    def __init__(self, level=TRIGGER_LEVEL, edge=TRIGGER_EDGE, hysteresis=TRIGGER_HYSTERESIS, channel=0, holdoff=0):
+        """
+        初始化 Trigger 类。
+
+        :param level: 触发电平。
+        :param edge: 触发边沿。
+        :param hysteresis: 迟滞。
+        :param channel: 触发通道。
+        :param holdoff: 释抑样本数。
+        :raises ValueError: 当边沿名称未知或迟滞为负时抛出异常。
+        """
+        self.level, self.edge, self.hysteresis = TRIGGER_LEVEL, TRIGGER_EDGE, TRIGGER_HYSTERESIS
+        self.channel, self.holdoff = 0, 0
+        self.configure(level, edge, hysteresis, channel, holdoff)
+        self.armed = False  # 上一块末尾是否处于布防状态
+        self.next_allowed = 0  # 释抑结束后允许的最小触发序号
+
+    def configure(self, level=None, edge=None, hysteresis=None, channel=None, holdoff=None):
+        """
+        修改触发设置，为 None 的参数保持不变。
+
+        :param level: 触发电平。
+        :param edge: 触发边沿。
+        :param hysteresis: 迟滞。
+        :param channel: 触发通道。
+        :param holdoff: 释抑样本数。
+        :raises ValueError: 当边沿名称未知或迟滞为负时抛出异常。
+        """
+        edge = self.edge if edge is None else edge
+        hysteresis = self.hysteresis if hysteresis is None else float(hysteresis)
+        if edge not in TRIGGER_EDGES:
+            raise ValueError(f'未知的触发边沿: {edge}，可选: {", ".join(TRIGGER_EDGES)}')
+        if hysteresis < 0:
+            raise ValueError(f'触发迟滞不能为负: {hysteresis}')
+        self.edge = edge  # 触发边沿
+        self.hysteresis = hysteresis  # 迟滞
+        if level is not None:
+            self.level = float(level)  # 触发电平
+        if channel is not None:
+            self.channel = int(channel)  # 触发通道
+        if holdoff is not None:
+            self.holdoff = max(0, int(holdoff))  # 释抑样本数
+
+    def reset(self):
+        """
+        清除布防和释抑状态，在样本不连续或重新开始查找时调用。
+        """
+        self.armed = False
+        self.next_allowed = 0
+
+    def scan(self, samples, start):
+        """
+        在紧接上一块之后的样本块中查找触发点。
+
+        :param samples: 样本数组，形状为 (样本数,) 或 (样本数, 通道数)。
+        :param start: 样本块第一个样本的绝对序号。
+        :return: 触发点绝对序号数组（int64），按时间顺序排列。
+        """
+        samples = np.asarray(samples)
+        if samples.ndim > 1:
+            samples = samples[:, self.channel]
+        index, self.armed = find_edges(samples, self.level, self.hysteresis, self.edge, self.armed)
+        triggers = index.astype(np.int64) + start
+        triggers = triggers[triggers >= self.next_allowed]
+        if self.holdoff and len(triggers):
+            # 逐个接受触发点，并用二分查找跳过释抑期内的边沿，循环次数等于接受的触发点数
+            accepted = []
+            k = 0
+            while k < len(triggers):
+                accepted.append(triggers[k])
+                k = np.searchsorted(triggers, triggers[k] + self.holdoff)
+            triggers = np.array(accepted, dtype=np.int64)
+        if len(triggers):
+            self.next_allowed = int(triggers[-1]) + self.holdoff
+        return triggers
+
+
+class TriggeredSweep:
+    """
+    示波器式的时域显示触发：根据触发模式决定每一帧时域图显示哪一段样本。
+
+    每帧把自上一帧以来的新样本交给 update()，返回 (状态, 窗口起始序号)：
+
+        off         不触发，显示最新样本（窗口起始为 None）
+        triggered   显示以触发点对齐的窗口 [触发点 - 预触发样本数, 触发点 - 预触发样本数 + x_range)
+        auto        auto 模式下超过 auto_timeout 没有触发，显示最新样本
+        waiting     等待触发，保持上一次的显示
+        stopped     single 模式已触发一次，保持显示，直到调用 arm()
+
+    触发点之后的样本尚未全部到达时，触发点被暂存到下一帧再显示。
+    normal 和 auto 模式显示最新的完整触发窗口，single 模式显示布防后的第一个触发窗口。
+
+    :param x_range: 时域窗口的样本数。
+    :param mode: 触发模式：off、auto、normal 或 single。
+    :param position: 触发点在窗口中的位置（0 到 1），之前的部分为预触发样本。
+    :param auto_timeout: auto 模式下自由运行前等待触发的时间（秒）。
+    :param trigger: Trigger 实例，默认按 config 创建。
+    """
+
+    def __init__(self, x_range, mode=TRIGGER_MODE, position=TRIGGER_POSITION, auto_timeout=TRIGGER_AUTO_TIMEOUT,
+                 trigger=None):
+        """
+        初始化 TriggeredSweep 类。
+
+        :param x_range: 时域窗口的样本数。
+        :param mode: 触发模式。
+        :param position: 触发点在窗口中的位置（0 到 1）。
+        :param auto_timeout: auto 模式下自由运行前等待触发的时间（秒）。
+        :param trigger: Trigger 实例。
+        :raises ValueError: 当触发模式未知时抛出异常。
+        """
+        self.trigger = trigger or Trigger()  # 边沿触发器
+        self.x_range = x_range  # 时域窗口样本数
+        self.position = min(max(position, 0.0), 1.0)  # 触发点在窗口中的位置
+        self.auto_timeout = auto_timeout  # auto 模式的等待时间
+        self.set_mode(mode)
+
+    @property
+    def pre_samples(self):
+        """
+        :return: 窗口中触发点之前的样本数。
+        """
+        return int(round(self.position * self.x_range))
+
+    def set_mode(self, mode):
+        """
+        切换触发模式并重新布防。
+
+        :param mode: 触发模式。
+        :raises ValueError: 当触发模式未知时抛出异常。
+        """
+        if mode not in TRIGGER_MODES:
+            raise ValueError(f'未知的触发模式: {mode}，可选: {", ".join(TRIGGER_MODES)}')
+        self.mode = mode  # 触发模式
+        self.arm()
+
+    def arm(self):
+        """
+        重新布防：清除暂存的触发点，single 模式下允许再次触发。
+        """
+        self.reset()
+        self.stopped = False  # single 模式是否已完成一次触发
+        self.last_trigger_time = time.monotonic()  # 上一次显示触发窗口的时刻
+
+    def reset(self):
+        """
+        样本不连续时调用：清除布防状态和暂存的触发点，不改变 single 模式的停止状态。
+        """
+        self.trigger.reset()
+        self.pending = None  # 后触发样本尚未到齐的触发点
+
+    def update(self, samples, start, now=None):
+        """
+        查找新样本中的触发点，决定本帧显示的窗口。
+
+        :param samples: 自上一帧以来的新样本，紧接上一次传入的样本；不连续时应先调用 reset()。
+        :param start: 新样本第一个样本的绝对序号。
+        :param now: 当前时刻（time.monotonic()），默认取当前时间。
+        :return: (状态, 窗口起始序号)，状态见类说明；不显示触发窗口时起始序号为 None。
+        """
+        if self.mode == "off":
+            return "off", None
+        if self.stopped:
+            return "stopped", None
+        now = time.monotonic() if now is None else now
+        pre = self.pre_samples
+        end = start + len(samples)  # 已到达样本的结束序号
+        triggers = self.trigger.scan(samples, start)
+        if self.pending is not None:
+            triggers = np.concatenate(([self.pending], triggers))
+        complete = triggers[triggers - pre + self.x_range <= end]
+        if len(complete):
+            shown = complete[0] if self.mode == "single" else complete[-1]
+            self.stopped = self.mode == "single"
+        else:
+            shown = None
+        # 只暂存最新一个未完成的触发点；single 模式暂存最早的一个
+        incomplete = triggers[triggers - pre + self.x_range > end]
+        if len(incomplete) and not self.stopped:
+            self.pending = int(incomplete[0] if self.mode == "single" else incomplete[-1])
+        else:
+            self.pending = None
+        if shown is not None:
+            self.last_trigger_time = now
+            return "triggered", int(shown) - pre
+        if self.mode == "auto" and now - self.last_trigger_time > self.auto_timeout:
+            return "auto", None
+        return "waiting", None
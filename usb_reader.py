@@ -1,33 +1,192 @@
 import usb.core
 import usb.util
-import struct
 import time
-from threading import Thread, Event, Lock
-from collections import deque
-from config import QUEUE_MAXLEN, SAMPLE_RATE
+import numpy as np
+from queue import Queue, Empty
+from threading import Thread, Event
+from config import QUEUE_MAXLEN, SAMPLE_RATE, USB_TRANSFER_SIZE, USB_TRANSFER_QUEUE_DEPTH, USB_SEQUENCE_COUNTER, USB_CHANNELS
+from ring_buffer import RingBuffer, BufferedReader
+from metrics import PipelineMetrics
 
-class USBReader(Thread):
+SAMPLE_DTYPE = np.dtype('<f4')  # 设备数据格式：小端 float32
+SEQUENCE_DTYPE = np.dtype('<u4')  # 数据包序号格式：小端 uint32
+
+
+def decode_samples(data):
+    """
+    将 USB 数据包一次性解码为 float32 数组。
+
+    直接在接收缓冲区上创建视图，不逐个样本解包，也不产生 Python 浮点对象；
+    末尾不足 4 字节的残余数据被忽略。
+
+    :param data: 从 USB 设备读取的原始数据（array('B')、bytes 等支持缓冲区协议的对象）。
+    :return: 形状为 (n,) 的 float32 数组，与 data 共享内存。
+    """
+    return np.frombuffer(data, dtype=SAMPLE_DTYPE, count=len(data) // SAMPLE_DTYPE.itemsize)
+
+
+def decode_sequenced(data, packet_size):
+    """
+    解码每个数据包以 32 位序号开头的传输。
+
+    批量传输中除最后一个短包外，每个数据包都是 packet_size 字节：
+    前 4 字节为序号，其余为 float32 样本。所有完整数据包一次性解码。
+
+    :param data: 一次批量传输读取的原始数据。
+    :param packet_size: 端点最大包长（字节）。
+    :return: (序号数组, 样本数组)。
+    """
+    raw = np.frombuffer(data, dtype=np.uint8)
+    full = len(raw) // packet_size
+    packets = raw[:full * packet_size].reshape(full, packet_size)
+    sequence = packets[:, :SEQUENCE_DTYPE.itemsize].copy().view(SEQUENCE_DTYPE).ravel()
+    payload = packets[:, SEQUENCE_DTYPE.itemsize:]
+    payload = payload[:, :payload.shape[1] // SAMPLE_DTYPE.itemsize * SAMPLE_DTYPE.itemsize]
+    samples = payload.copy().view(SAMPLE_DTYPE).ravel()
+    tail = raw[full * packet_size:]
+    if len(tail) >= SEQUENCE_DTYPE.itemsize:  # 末尾的短包
+        sequence = np.append(sequence, tail[:SEQUENCE_DTYPE.itemsize].view(SEQUENCE_DTYPE))
+        samples = np.concatenate((samples, decode_samples(tail[SEQUENCE_DTYPE.itemsize:])))
+    return sequence, samples
+
+
+def decode_frames(samples, channels, pending=None):
+    """
+    将交织的多通道样本流一次性整形为 (样本数, channels) 的帧数组。
+
+    一次传输的长度不一定是帧长的整数倍，末尾不完整的帧作为余量返回，
+    由调用方在下一次传输时通过 pending 传回，拼接在新样本之前。
+
+    :param samples: 一维 float32 样本数组，各通道按帧交织。
+    :param channels: 通道数。
+    :param pending: 上一次传输剩余的不完整帧，为 None 或空数组时没有余量。
+    :return: (形状为 (n, channels) 的帧数组, 剩余的不完整帧)。
+    """
+    if pending is not None and len(pending):
+        samples = np.concatenate((pending, samples))
+    complete = len(samples) // channels * channels
+    return samples[:complete].reshape(-1, channels), samples[complete:].copy()
+
+
+def in_endpoints(device):
+    """
+    列出设备接口 (0, 0) 上的全部 IN 端点。
+
+    :param device: USB 设备实例。
+    :return: IN 端点描述符列表，按描述符顺序排列。
+    """
+    interface = device.get_active_configuration()[(0, 0)]
+    return list(usb.util.find_descriptor(
+        interface,
+        find_all=True,
+        custom_match=lambda e: usb.util.endpoint_direction(e.bEndpointAddress) == usb.util.ENDPOINT_IN
+    ))
+
+
+def list_sources(vendor_id):
+    """
+    列出厂商 ID 匹配的所有设备上的所有 IN 端点。
+
+    :param vendor_id: USB 设备的厂商 ID。
+    :return: (设备序号, 端点序号) 列表，可作为 USBReader 的 device_index 和 endpoint_index。
+    """
+    sources = []
+    for device_index, device in enumerate(usb.core.find(find_all=True, idVendor=vendor_id)):
+        device.set_configuration()
+        sources.extend((device_index, endpoint_index) for endpoint_index in range(len(in_endpoints(device))))
+        usb.util.dispose_resources(device)
+    return sources
+
+
+def find_sources(vendor_id, channels=USB_CHANNELS):
+    """
+    为厂商 ID 匹配的每个设备的每个 IN 端点创建一个读取器。
+
+    每个设备只打开并配置一次，同一设备各端点的读取器共用这个设备实例（同一个 libusb 句柄）；
+    各自打开设备会得到多个句柄，第二个句柄声明接口时在 Linux 上会因 EBUSY 失败。
+    返回的读取器各自在独立的线程中采集，可以交给 MultiReader 合并为一个多通道数据源。
+
+    :param vendor_id: USB 设备的厂商 ID。
+    :param channels: 每个端点数据流的通道数。
+    :return: USBReader 列表。
+    :raises ValueError: 当未找到设备时抛出异常。
+    """
+    readers = []
+    for device_index, device in enumerate(usb.core.find(find_all=True, idVendor=vendor_id)):
+        device.set_configuration()
+        for endpoint_index in range(len(in_endpoints(device))):
+            readers.append(USBReader(vendor_id, channels, device_index, endpoint_index, device=device))
+    if not readers:
+        raise ValueError('未找到 USB 设备')
+    return readers
+
+
+def count_sequence_gaps(sequence, previous=None):
+    """
+    检查数据包序号的连续性（按 32 位回绕）。
+
+    :param sequence: 本次传输的序号数组。
+    :param previous: 上一次传输最后一个数据包的序号，为 None 时不检查跨传输的连续性。
+    :return: (不连续的次数, 丢失的数据包数)。
+    """
+    if previous is not None:
+        sequence = np.concatenate((np.array([previous], dtype=SEQUENCE_DTYPE), sequence))
+    steps = np.diff(sequence.astype(np.int64)) % (1 << 32)
+    gaps = steps != 1
+    return int(np.count_nonzero(gaps)), int(np.sum(steps[gaps] - 1))
+
+
+class USBReader(BufferedReader, Thread):
     """
     USB 设备读取器类，用于从指定的 USB 设备中读取数据。
 
+    若 USB_SEQUENCE_COUNTER 为 True，每个数据包开头的序号会被剥离并检查连续性，
+    不连续的次数和丢失的数据包数计入运行指标（sequence_gaps、lost_packets）。
+
+    channels 大于 1 时数据流按帧交织，解码为形状 (样本数, channels) 的数组后写入环形缓冲区。
+    同一厂商 ID 下有多个设备、或一个设备有多个 IN 端点时，通过 device_index 和 endpoint_index
+    选择其中之一；find_sources() 为全部设备和端点各创建一个读取器，同一设备的读取器共用 device。
+
     :param vendor_id: USB 设备的厂商 ID。
+    :param channels: 数据流的通道数。
+    :param device_index: 使用厂商 ID 匹配的第几个设备（从 0 开始）。
+    :param endpoint_index: 使用接口 (0, 0) 上的第几个 IN 端点（从 0 开始）。
+    :param device: 已打开并配置的设备实例，由同一设备的多个端点读取器共用；为 None 时按 device_index 查找。
     """
     
-    def __init__(self, vendor_id):
+    def __init__(self, vendor_id, channels=USB_CHANNELS, device_index=0, endpoint_index=0, device=None):
         """
         初始化 USBReader 类。
 
         :param vendor_id: USB 设备的厂商 ID。
+        :param channels: 数据流的通道数。
+        :param device_index: 使用厂商 ID 匹配的第几个设备（从 0 开始）。
+        :param endpoint_index: 使用接口 (0, 0) 上的第几个 IN 端点（从 0 开始）。
+        :param device: 共用的已配置设备实例，为 None 时自行查找并配置。
         """
         super().__init__()
         self.vendor_id = vendor_id  # USB 设备的厂商 ID
-        self.dev = None  # USB 设备实例
+        self.channels = channels  # 数据流的通道数
+        self.device_index = device_index  # 设备序号
+        self.endpoint_index = endpoint_index  # IN 端点序号
+        self.endpoint_count = 0  # 设备上 IN 端点的数量
+        self.pending = None  # 上一次传输末尾不完整的帧
+        self.sample_rate = SAMPLE_RATE  # 设备采样率
+        self.dev = device  # USB 设备实例
+        self.owns_device = device is None  # 设备由本读取器打开，销毁时释放；共用的设备由 pyusb 在回收时释放
         self.in_endpoint = None  # 用于接收数据的 IN 端点
+        self.transfer_size = USB_TRANSFER_SIZE  # 单次批量传输的字节数，初始化设备后按包长取整
+        self.queue_depth = max(1, USB_TRANSFER_QUEUE_DEPTH)  # 传输缓冲区池大小
         self.byte_count = 0  # 统计读取的字节数
-        self.start_time = time.time()  # 记录起始时间，用于计算数据传输速率
-        self.data_queue = deque(maxlen=QUEUE_MAXLEN)  # 用于存储接收到的数据的队列，长度有限制
-        self.data_lock = Lock()  # 锁，用于确保线程安全的访问数据队列
+        self.transfer_count = 0  # 已完成的批量传输次数
+        self.transfer_time = 0.0  # 所有批量传输的累计耗时（秒）
+        self.start_time = time.time()  # 记录起始时间
+        self.metrics = PipelineMetrics()  # 运行指标，与保存器和绘图部件共享
+        self.data_buffer = RingBuffer(QUEUE_MAXLEN, metrics=self.metrics, channels=channels)  # 存储接收数据的 float32 环形缓冲区
         self.stop_event = Event()  # 事件，用于指示线程是否应停止
+        self.sequence_counter = USB_SEQUENCE_COUNTER  # 数据包是否带序号
+        self.last_sequence = None  # 上一个数据包的序号
+        self.decode_error = None  # 解码线程异常退出时的异常，由 run() 重新抛出
 
         # 初始化 USB 设备并设置通信
         self.initialize_device()
@@ -38,40 +197,122 @@ class USBReader(Thread):
         
         :raises ValueError: 当未找到设备或 IN 端点时抛出异常。
         """
-        self.dev = usb.core.find(idVendor=self.vendor_id)
-        if self.dev is None:
-            raise ValueError('未找到 USB 设备')
-
-        self.dev.set_configuration()
-        cfg = self.dev.get_active_configuration()
-        interface = cfg[(0, 0)]
-        self.in_endpoint = usb.util.find_descriptor(
-            interface,
-            custom_match=lambda e: usb.util.endpoint_direction(e.bEndpointAddress) == usb.util.ENDPOINT_IN
-        )
-        if self.in_endpoint is None:
+        if self.owns_device:
+            devices = list(usb.core.find(find_all=True, idVendor=self.vendor_id))
+            if self.device_index >= len(devices):
+                raise ValueError('未找到 USB 设备')
+            self.dev = devices[self.device_index]
+            self.dev.set_configuration()
+        endpoints = in_endpoints(self.dev)
+        self.endpoint_count = len(endpoints)
+        if self.endpoint_index >= len(endpoints):
             raise ValueError('未找到 IN 端点')
+        self.in_endpoint = endpoints[self.endpoint_index]
+
+        # 批量传输长度取为包长的整数倍，使 libusb 一次提交多个数据包
+        packet_size = self.in_endpoint.wMaxPacketSize
+        self.transfer_size = max(1, -(-USB_TRANSFER_SIZE // packet_size)) * packet_size
 
     def run(self):
         """
-        线程的主运行函数，持续从 USB 设备中读取数据并存储在数据队列中。
-        
+        线程的主运行函数，持续从 USB 设备中读取数据并存储在环形缓冲区中。
+
+        读取循环只负责提交多包批量传输，读满的缓冲区交给解码线程处理后归还缓冲区池，
+        使下一次传输可以立即提交，解码耗时不会拖慢 USB 读取。
+
         :raises usb.core.USBError: 在 USB 通信发生错误时抛出异常。
+        :raises Exception: 解码线程异常退出时重新抛出其异常。
         """
-        while not self.stop_event.is_set():
+        free_buffers = Queue()  # 可用于下一次传输的缓冲区
+        filled_buffers = Queue()  # 已完成、等待解码的传输
+        for _ in range(self.queue_depth):
+            free_buffers.put(usb.util.create_buffer(self.transfer_size))
+
+        decoder = Thread(target=self._decode_loop, args=(free_buffers, filled_buffers), daemon=True)
+        decoder.start()
+        try:
+            while not self.stop_event.is_set():
+                buffer = self._take_buffer(free_buffers, decoder)
+                if buffer is None:
+                    break
+                try:
+                    transfer_start = time.perf_counter()
+                    length = self.dev.read(self.in_endpoint.bEndpointAddress, buffer, timeout=1000)
+                    self.transfer_time += time.perf_counter() - transfer_start
+                    self.transfer_count += 1
+                    self.byte_count += length
+                    filled_buffers.put((buffer, length))
+                except usb.core.USBError as e:
+                    free_buffers.put(buffer)
+                    if e.errno == 110:  # 超时错误
+                        self.metrics.increment("usb_timeouts")  # 记录超时后继续读取
+                    else:
+                        raise e
+        finally:
+            filled_buffers.put(None)  # 通知解码线程退出
+            decoder.join()
+        if self.decode_error is not None:
+            raise self.decode_error
+
+    def _take_buffer(self, free_buffers, decoder, poll_interval=0.1):
+        """
+        从缓冲区池取出一个缓冲区；解码线程已退出或收到停止事件时不再等待。
+
+        :param free_buffers: 可用缓冲区队列。
+        :param decoder: 解码线程。
+        :param poll_interval: 检查解码线程和停止事件的间隔（秒）。
+        :return: 缓冲区，不再等待时返回 None。
+        """
+        while True:
             try:
-                data = self.dev.read(self.in_endpoint.bEndpointAddress, self.in_endpoint.wMaxPacketSize, timeout=1000)
-                self.byte_count += len(data)
-                with self.data_lock:
-                    for i in range(0, len(data), 4):
-                        if i + 4 <= len(data):
-                            float_val = struct.unpack('<f', data[i:i+4])[0]
-                            self.data_queue.append(float_val)
-            except usb.core.USBError as e:
-                if e.errno == 110:  # 超时错误
-                    pass  # 忽略超时错误，继续读取
+                return free_buffers.get(timeout=poll_interval)
+            except Empty:
+                if not decoder.is_alive() or self.stop_event.is_set():
+                    return None
+
+    def _decode_loop(self, free_buffers, filled_buffers):
+        """
+        解码线程，将已完成的传输解码写入环形缓冲区，并把缓冲区归还给缓冲区池。
+
+        解码或写入出错时保存异常并设置停止事件，读取循环随后退出并重新抛出该异常。
+
+        :param free_buffers: 可用缓冲区队列。
+        :param filled_buffers: 已完成传输的队列，元素为 (缓冲区, 有效字节数)，None 表示退出。
+        """
+        try:
+            while True:
+                item = filled_buffers.get()
+                if item is None:
+                    break
+                buffer, length = item
+                if self.sequence_counter:
+                    samples = self._decode_sequenced(memoryview(buffer)[:length])
                 else:
-                    raise e
+                    samples = decode_samples(memoryview(buffer)[:length])
+                if self.channels > 1:
+                    samples, self.pending = decode_frames(samples, self.channels, self.pending)
+                self.data_buffer.write(samples)
+                self.metrics.add_transfer(length, len(samples))
+                free_buffers.put(buffer)
+        except Exception as e:
+            self.decode_error = e
+            self.stop_event.set()
+
+    def _decode_sequenced(self, data):
+        """
+        解码带序号的传输并检查与上一次传输之间的连续性。
+
+        :param data: 一次批量传输读取的原始数据。
+        :return: float32 样本数组。
+        """
+        sequence, samples = decode_sequenced(data, self.in_endpoint.wMaxPacketSize)
+        if len(sequence):
+            gaps, lost = count_sequence_gaps(sequence, self.last_sequence)
+            if gaps:
+                self.metrics.increment("sequence_gaps", gaps)
+                self.metrics.increment("lost_packets", lost)
+            self.last_sequence = sequence[-1]
+        return samples
 
     def stop(self):
         """
@@ -79,26 +320,16 @@ class USBReader(Thread):
         """
         self.stop_event.set()
 
-    def get_speed(self):
+    def get_transfer_latency(self):
         """
-        计算数据传输速率。
+        计算单次批量传输的平均耗时。
 
-        :return: 数据传输速率，单位为 KB/s。
+        :return: 平均传输耗时，单位为毫秒。
         """
-        elapsed_time = time.time() - self.start_time
-        if elapsed_time > 0:
-            return self.byte_count / elapsed_time / 1024  # 速率以 KB/s 为单位
+        if self.transfer_count > 0:
+            return self.transfer_time / self.transfer_count * 1000
         return 0
 
-    def get_data(self):
-        """
-        获取当前存储在数据队列中的数据。
-
-        :return: 包含浮点数的列表，表示接收到的数据。
-        """
-        with self.data_lock:
-            return list(self.data_queue)
-
     def get_device_info(self):
         """
         获取 USB 设备的详细信息。
@@ -112,12 +343,18 @@ class USBReader(Thread):
             "product": self.dev.product,  # 产品字符串
             "serial_number": self.dev.serial_number,  # 序列号字符串
             "endpoint_address": f"0x{self.in_endpoint.bEndpointAddress:02x}",  # IN 端点地址，十六进制表示
-            "max_packet_size": f"{self.in_endpoint.wMaxPacketSize} bytes"  # 最大数据包大小，单位为字节
+            "max_packet_size": f"{self.in_endpoint.wMaxPacketSize} bytes",  # 最大数据包大小，单位为字节
+            "channels": self.channels,  # 通道数
+            "device_index": self.device_index,  # 设备序号
+            "transfer_size": f"{self.transfer_size} bytes",  # 单次批量传输大小
+            "queue_depth": self.queue_depth,  # 传输缓冲区池大小
+            "throughput": f"{self.get_speed():.2f} KB/s",  # 最近的吞吐量
+            "transfer_latency": f"{self.get_transfer_latency():.2f} ms"  # 平均单次传输耗时
         }
 
     def __del__(self):
         """
         清理资源，在对象销毁时释放 USB 设备的资源。
         """
-        if self.dev:
+        if self.dev and self.owns_device:
             usb.util.dispose_resources(self.dev)
@@ -1,38 +1,77 @@
 import os
 import time
 import numpy as np
-import csv
+from queue import Queue, Empty
 from threading import Thread, Event
-from collections import deque
-from config import SAMPLE_RATE
+from config import SAMPLE_RATE, QUEUE_MAXLEN, SAVE_BLOCK_SIZE, SAVE_OVERFLOW_POLICY, SAVE_COMPRESSION
+from recording import RecordingWriter, export_csv
+from chunked_recording import ChunkedRecordingWriter, make_executor
 
 class WaveformSaver:
     """
     用于保存波形数据的类。
     
-    这个类可以从USB读取器获取数据，并将其保存到CSV文件中。
-    它支持异步保存和可配置的记录时间。
+    这个类从USB读取器增量获取新样本，按固定大小的数据块交给独立的写入线程，
+    边采集边写入二进制记录文件（见 recording 模块），内存占用与记录时长无关。
+    它支持异步保存、可配置的记录时间以及记录结束后导出CSV。
+
+    保存器作为读取器环形缓冲区的一个消费者读取数据，落后时按 overflow_policy 处理：
+    drop 策略下错过的样本会被统计，并以 (分段内偏移, 样本数) 的形式写入该分段元数据的 gaps 列表；
+    block 和 spill 策略分别阻塞采集或把未读样本暂存到磁盘，保证记录无损。
+
+    多通道读取器的样本按帧交织写入记录，导出的 CSV 中每个通道一列。
+    compression 不为 None 时写分块压缩记录（见 chunked_recording），每个保存任务共用一个压缩线程池（或进程池）。
+
+    除连续记录外还支持事件捕获（start_event_capture）：按触发器扫描新样本，
+    每个触发点前后的一段样本（预触发 + 后触发）保存为一个独立的记录文件，适合长时间无人值守运行。
     """
 
-    def __init__(self, usb_reader):
+    def __init__(self, usb_reader, block_size=SAVE_BLOCK_SIZE, overflow_policy=SAVE_OVERFLOW_POLICY,
+                 compression=SAVE_COMPRESSION):
         """
         初始化WaveformSaver实例。
 
-        :param usb_reader: 一个能够获取波形数据的对象，需实现get_data()方法。
+        :param usb_reader: 一个能够获取波形数据的对象，需实现add_consumer()和get_device_info()方法。
+        :param block_size: 每个写入数据块的样本数。
+        :param overflow_policy: 保存落后时的溢出策略：drop、block 或 spill。
+        :param compression: 压缩编码：None（不压缩）、zlib、lzma 或 bz2，其余压缩参数取自 config。
         """
         self.usb_reader = usb_reader
-        self.save_thread = None  # 保存数据的线程
+        self.block_size = block_size  # 写入数据块大小
+        self.overflow_policy = overflow_policy  # 保存落后时的溢出策略
+        self.compression = compression  # 压缩编码，None 表示不压缩
+        self.executor = None  # 保存任务期间共用的压缩执行器
+        self.sample_rate = getattr(usb_reader, 'sample_rate', SAMPLE_RATE)  # 读取器的采样率，写入记录元数据
+        self.metrics = getattr(usb_reader, 'metrics', None)  # 读取器的运行指标，记录写盘耗时
+        self.channels = getattr(usb_reader, 'channels', 1)  # 读取器的通道数
+        self.save_thread = None  # 采集数据的线程
         self.stop_event = Event()  # 用于停止保存线程的事件
-        # 使用双端队列存储数据，最多存储1小时的数据
-        self.data_buffer = deque(maxlen=int(SAMPLE_RATE) * 3600)
+        # 轮询间隔需保证读取器的环形缓冲区在两次读取之间不会被写满
+        self.poll_interval = min(0.1, QUEUE_MAXLEN / self.sample_rate / 4)
+        # 分段调度状态，由 start_saving 重置，可通过 get_progress() 查询
+        self.segment_samples = 1  # 每个分段的样本数
+        self.segment_count = 0  # 分段总数
+        self.samples_recorded = 0  # 已交给写入线程的样本数
+        self.segments_completed = 0  # 已关闭的分段文件数
+        self.saved_files = []  # 已保存的数据文件路径
+        self.missed_samples = 0  # 因保存落后而错过的样本数
+        self.gaps = []  # 记录中的缺口，元素为 (分段序号, 分段内偏移, 样本数)
+        self.events_captured = 0  # 事件捕获中已保存的事件数
+        self.error = None  # 保存任务因异常（如目录不存在、磁盘已满）终止时的异常，由 take_error() 取走
 
-    def start_saving(self, path, filename, record_time):
+    def start_saving(self, path, filename, record_time, segment_count=1, export_to_csv=False):
         """
         开始异步保存波形数据。
 
+        记录按样本数分段：每段包含 record_time * 采样率 个样本，写满后在样本边界处
+        切换到下一个文件，相邻文件之间没有丢失或重复的样本。
+        文件名为 "<filename>_<序号>"，序号从 00001 开始。
+
         :param path: 保存文件的路径
-        :param filename: 保存的文件名
-        :param record_time: 录制时间（秒）
+        :param filename: 保存文件的基本名称（不含后缀）
+        :param record_time: 每个分段的录制时间（秒）
+        :param segment_count: 分段（文件）数量
+        :param export_to_csv: 记录结束后是否额外导出CSV文件
         :return: 如果成功启动保存任务，返回True；否则返回False。
         """
         if self.save_thread and self.save_thread.is_alive():
@@ -40,7 +79,17 @@ class WaveformSaver:
             return False
 
         self.stop_event.clear()
-        self.save_thread = Thread(target=self._save_process, args=(path, filename, record_time))
+        self.segment_samples = max(1, int(round(record_time * self.sample_rate)))
+        self.segment_count = segment_count
+        self.samples_recorded = 0
+        self.segments_completed = 0
+        self.missed_samples = 0
+        self.gaps = []
+        self.events_captured = 0
+        self.error = None
+        # 在调用线程中注册消费者，记录从调用时刻开始，不受保存线程启动延迟影响
+        consumer = self.usb_reader.add_consumer("saver", self.overflow_policy)
+        self.save_thread = Thread(target=self._save_process, args=(consumer, path, filename, export_to_csv))
         self.save_thread.start()
         return True
 
@@ -55,48 +104,354 @@ class WaveformSaver:
         else:
             print("没有正在进行的保存任务")
 
-    def _save_process(self, path, filename, record_time):
+    def get_progress(self):
+        """
+        查询当前保存任务的进度。
+
+        事件捕获时 samples_recorded 为已扫描的样本数，分段总数为 1（不限时长时为 0）。
+
+        :return: 包含当前分段序号、分段总数、已完成分段数、已记录样本数、总样本数、完成比例、错过样本数和已捕获事件数的字典。
+        """
+        total_samples = self.segment_samples * self.segment_count
+        return {
+            "segment": min(self.samples_recorded // self.segment_samples + 1, self.segment_count),  # 当前分段，从 1 开始
+            "segment_count": self.segment_count,  # 分段总数
+            "segments_completed": self.segments_completed,  # 已关闭的文件数
+            "samples_recorded": self.samples_recorded,  # 已交给写入线程的样本数
+            "total_samples": total_samples,  # 计划记录的样本总数
+            "fraction": self.samples_recorded / total_samples if total_samples else 0.0,  # 完成比例
+            "missed_samples": self.missed_samples,  # 因保存落后而错过的样本数
+            "events_captured": self.events_captured  # 事件捕获中已保存的事件数
+        }
+
+    def save_event(self, path, filename, samples, trigger_offset, start_time=None, trigger=None):
         """
-        保存数据的后台线程，按指定时间段进行数据采集并保存至文件。
+        把一段触发前后的样本直接保存为一个记录文件，触发信息写入元数据的 trigger 字段。
 
         :param path: 保存文件的路径
-        :param filename: 保存的文件名
-        :param record_time: 录制时间（秒）
+        :param filename: 保存文件的名称（不含后缀）
+        :param samples: 样本数组，多通道时形状为 (样本数, 通道数)
+        :param trigger_offset: 触发点在样本中的偏移，即预触发样本数
+        :param start_time: 第一个样本的时间（Unix 时间戳），默认为当前时间
+        :param trigger: 产生该事件的 Trigger 实例，可选，其设置写入元数据
+        :return: 数据文件路径
         """
+        recording = self._open_recording(os.path.join(path, filename), self.usb_reader.get_device_info(), start_time)
+        recording.metadata["trigger"] = {"offset": int(trigger_offset)}  # 触发点在记录中的偏移
+        if trigger is not None:
+            recording.metadata["trigger"].update(level=trigger.level, edge=trigger.edge,
+                                                 hysteresis=trigger.hysteresis, channel=trigger.channel)
+        with recording:
+            recording.write(samples)
+        self.saved_files.append(recording.data_path)
+        return recording.data_path
+
+    def start_event_capture(self, path, filename, trigger, pre_samples, post_samples, duration=None,
+                            max_events=None, export_to_csv=False):
+        """
+        开始异步事件捕获：每个触发点保存 [触发点 - pre_samples, 触发点 + post_samples) 的样本，
+        文件名为 "<filename>_<序号>"，序号从 00001 开始。
+
+        触发器的释抑至少设为 post_samples，一个事件的后触发部分中不会产生新事件。
+        数据流开始处或缺口之后的事件，预触发部分可能不足 pre_samples；跨越缺口的事件被丢弃。
+
+        :param path: 保存文件的路径
+        :param filename: 保存文件的基本名称（不含后缀）
+        :param trigger: Trigger 实例
+        :param pre_samples: 每个事件保存的触发前样本数
+        :param post_samples: 每个事件保存的触发后样本数（含触发点），至少为 1
+        :param duration: 捕获时长（秒），为 None 时一直运行到 stop_saving()
+        :param max_events: 最多捕获的事件数，为 None 时不限
+        :param export_to_csv: 捕获结束后是否额外导出CSV文件
+        :return: 如果成功启动捕获任务，返回True；否则返回False。
+        """
+        if self.save_thread and self.save_thread.is_alive():
+            print("已有保存任务正在进行")
+            return False
+
+        self.stop_event.clear()
+        total_samples = None if duration is None else max(1, int(round(duration * self.sample_rate)))
+        self.segment_samples = total_samples or 1
+        self.segment_count = 0 if total_samples is None else 1
+        self.samples_recorded = 0
+        self.segments_completed = 0
+        self.missed_samples = 0
+        self.gaps = []
+        self.events_captured = 0
+        self.error = None
+        self.saved_files = []
+        trigger.configure(holdoff=max(trigger.holdoff, post_samples))
+        trigger.reset()
+        consumer = self.usb_reader.add_consumer("events", self.overflow_policy)
+        self.save_thread = Thread(target=self._capture_process,
+                                  args=(consumer, path, filename, trigger, max(0, int(pre_samples)),
+                                        max(1, int(post_samples)), total_samples, max_events, export_to_csv))
+        self.save_thread.start()
+        return True
+
+    def _save_process(self, consumer, path, filename, export_to_csv):
+        """
+        采集数据的后台线程，作为环形缓冲区的消费者获取新样本，填满一个数据块后交给写入线程。
+
+        采用双缓冲：两个预分配的数据块在采集线程和写入线程之间轮换，
+        写入线程落后时采集线程会在取空闲块时等待，内存不会增长。
+        数据块不会跨越分段边界，分段的最后一块可能不满。
+
+        :param consumer: 读取器环形缓冲区上的消费者，本线程结束时关闭
+        :param path: 保存文件的路径
+        :param filename: 保存文件的基本名称
+        :param export_to_csv: 记录结束后是否额外导出CSV文件
+        """
+        free_blocks = Queue()  # 空闲数据块
+        full_blocks = Queue()  # 待写入的数据块，元素为 (分段序号, 数据块, 有效样本数)，None 表示结束
+        for _ in range(2):
+            shape = self.block_size if self.channels == 1 else (self.block_size, self.channels)
+            free_blocks.put(np.empty(shape, dtype=np.float32))
+
         start_time = time.time()
-        full_path = os.path.join(path, filename)
+        total_samples = self.segment_samples * self.segment_count
+        self.executor = make_executor() if self.compression else None
+        writer = Thread(target=self._write_process, args=(path, filename, start_time, free_blocks, full_blocks))
+        writer.start()
 
-        while time.time() - start_time < record_time and not self.stop_event.is_set():
-            new_data = self.usb_reader.get_data()
-            self.data_buffer.extend(new_data)
-            time.sleep(0.1)  # 短暂休眠以减少CPU使用
+        block = self._take_block(free_blocks, writer)
+        fill = 0
+        try:
+            while self.samples_recorded < total_samples and not self.stop_event.is_set():
+                new_data, missed = consumer.read()  # 只获取新样本
+                if missed:
+                    self._record_gap(missed)
+                new_data = new_data[:total_samples - self.samples_recorded]
+                offset = 0
+                while offset < len(new_data) and block is not None:
+                    segment = self.samples_recorded // self.segment_samples
+                    segment_left = (segment + 1) * self.segment_samples - self.samples_recorded
+                    count = min(self.block_size - fill, len(new_data) - offset, segment_left)
+                    block[fill:fill + count] = new_data[offset:offset + count]
+                    fill += count
+                    offset += count
+                    self.samples_recorded += count
+                    if fill == self.block_size or count == segment_left:
+                        full_blocks.put((segment, block, fill))
+                        block = self._take_block(free_blocks, writer)
+                        fill = 0
+                if block is None:
+                    break  # 写入线程已因异常退出，错误保存在 self.error 中
+                if self.samples_recorded < total_samples:
+                    time.sleep(self.poll_interval)  # 短暂休眠以减少CPU使用
+            if fill and block is not None:
+                full_blocks.put(((self.samples_recorded - 1) // self.segment_samples, block, fill))
+        finally:
+            consumer.close()
+            full_blocks.put(None)
+            writer.join()
+            self._shutdown_executor()
 
-        data_to_save = list(self.data_buffer)
-        actual_duration = time.time() - start_time
-        self._save_to_csv(full_path, data_to_save, actual_duration)
-        print(f"波形已保存至 {full_path}")
+        if export_to_csv and self.error is None:
+            for data_path in self.saved_files:
+                csv_path = export_csv(data_path)
+                print(f"CSV已导出至 {csv_path}")
+
+    def _capture_process(self, consumer, path, filename, trigger, pre_samples, post_samples, total_samples,
+                         max_events, export_to_csv):
+        """
+        事件捕获的后台线程：扫描新样本中的触发点，后触发样本到齐后保存该事件。
 
-        self.data_buffer.clear()
+        只保留最近 pre_samples 个样本和尚未保存的事件所需的样本，内存占用与运行时长无关。
 
-    def _save_to_csv(self, full_path, data, actual_duration):
+        :param consumer: 读取器环形缓冲区上的消费者，本线程结束时关闭
+        :param path: 保存文件的路径
+        :param filename: 保存文件的基本名称
+        :param trigger: Trigger 实例
+        :param pre_samples: 触发前样本数
+        :param post_samples: 触发后样本数
+        :param total_samples: 扫描的样本总数，为 None 时不限
+        :param max_events: 最多捕获的事件数，为 None 时不限
+        :param export_to_csv: 捕获结束后是否额外导出CSV文件
         """
-        将数据保存到CSV文件，每行包含时间戳和对应的信号值。
+        start_time = time.time()
+        stream_start = consumer.cursor  # 捕获开始时的绝对序号
+        history_start = consumer.cursor  # history 第一个样本的绝对序号
+        history = np.empty((0, self.channels) if self.channels > 1 else 0, dtype=np.float32)
+        pending = []  # 后触发样本尚未到齐的触发点
+        self.executor = make_executor() if self.compression else None
+        try:
+            while not self.stop_event.is_set() and (max_events is None or self.events_captured < max_events):
+                new_data, missed = consumer.read()
+                if missed:
+                    self.missed_samples += missed
+                    if pending:
+                        print(f"警告：保存落后，丢失 {missed} 个样本，丢弃 {len(pending)} 个未完成的事件")
+                    trigger.reset()
+                    pending = []
+                    history = history[:0]
+                    history_start = consumer.cursor - len(new_data)
+                if total_samples is not None:
+                    new_data = new_data[:max(0, stream_start + total_samples - (history_start + len(history)))]
+                history = np.concatenate((history, new_data))
+                end = history_start + len(history)
+                pending.extend(int(t) for t in trigger.scan(new_data, end - len(new_data)))
+                while pending and pending[0] + post_samples <= end:
+                    if max_events is not None and self.events_captured >= max_events:
+                        break
+                    trigger_index = pending.pop(0)
+                    first = max(trigger_index - pre_samples, history_start)
+                    self.events_captured += 1
+                    data_path = self.save_event(
+                        path, f"{filename}_{str(self.events_captured).zfill(5)}",
+                        history[first - history_start:trigger_index + post_samples - history_start],
+                        trigger_index - first, start_time + (first - stream_start) / self.sample_rate, trigger)
+                    print(f"事件 {self.events_captured} 已保存至 {data_path}")
+                # 丢弃不再需要的样本：保留预触发长度，以及未完成事件的全部样本
+                keep_from = min([end - pre_samples] + [t - pre_samples for t in pending])
+                if keep_from > history_start:
+                    history = history[keep_from - history_start:]
+                    history_start = keep_from
+                self.samples_recorded = end - stream_start
+                if total_samples is not None and self.samples_recorded >= total_samples:
+                    break
+                time.sleep(self.poll_interval)
+        except Exception as e:
+            self._set_error(e)
+        finally:
+            consumer.close()
+            self._shutdown_executor()
+        if self.error is not None:
+            return
+        self.segments_completed = self.segment_count
 
-        :param full_path: 保存文件的完整路径
-        :param data: 要保存的信号数据列表
-        :param actual_duration: 实际的数据采集持续时间（秒）
+        if export_to_csv:
+            for data_path in self.saved_files:
+                csv_path = export_csv(data_path)
+                print(f"CSV已导出至 {csv_path}")
+
+    def _record_gap(self, missed):
         """
-        with open(full_path, 'w', newline='') as csvfile:
-            csv_writer = csv.writer(csvfile)
-            csv_writer.writerow(['Time (s)', 'Signal'])
-            
-            # 根据实际持续时间和数据点数量计算时间戳
-            num_samples = len(data)
-            time_stamps = np.linspace(0, actual_duration, num_samples)
-            
-            # 写入每个时间戳和对应的信号值
-            for time_stamp, data_point in zip(time_stamps, data):
-                csv_writer.writerow([f"{time_stamp:.6f}", data_point])
+        记录一个缺口：下一个样本之前有 missed 个样本因保存落后而丢失。
+
+        :param missed: 丢失的样本数
+        """
+        segment = self.samples_recorded // self.segment_samples
+        offset = self.samples_recorded - segment * self.segment_samples
+        self.gaps.append((segment, offset, missed))
+        self.missed_samples += missed
+        print(f"警告：保存落后，分段 {segment + 1} 的第 {offset} 个样本之前丢失 {missed} 个样本")
+
+    def _take_block(self, free_blocks, writer):
+        """
+        取一个空闲数据块，写入线程落后时等待；写入线程已退出时不再等待。
+
+        :param free_blocks: 空闲数据块队列
+        :param writer: 写入线程
+        :return: 数据块，写入线程已退出时返回 None
+        """
+        while True:
+            try:
+                return free_blocks.get(timeout=self.poll_interval)
+            except Empty:
+                if not writer.is_alive():
+                    return None
+
+    def _set_error(self, error):
+        """
+        记录使保存任务终止的异常并提示。
+
+        :param error: 异常
+        """
+        self.error = error
+        print(f"保存失败：{type(error).__name__}: {error}")
+
+    def take_error(self):
+        """
+        取走上一次保存任务终止时的异常，每个异常只返回一次。
+
+        :return: 异常，没有时返回 None
+        """
+        error, self.error = self.error, None
+        return error
+
+    def _write_process(self, path, filename, start_time, free_blocks, full_blocks):
+        """
+        写入线程，逐块将数据追加到对应分段的记录文件，写完后归还数据块。
+
+        分段文件的打开和关闭都在本线程中完成，不占用采集线程的时间。
+        打开、写入或关闭文件出错时记录异常并退出，采集线程随后停止。
+
+        :param path: 保存文件的路径
+        :param filename: 保存文件的基本名称
+        :param start_time: 第一个样本的时间（Unix 时间戳）
+        :param free_blocks: 空闲数据块队列
+        :param full_blocks: 待写入的数据块队列
+        """
+        self.saved_files = []
+        recording = None
+        current_segment = -1
+        try:
+            device_info = self.usb_reader.get_device_info()
+            try:
+                while True:
+                    item = full_blocks.get()
+                    if item is None:
+                        break
+                    segment, block, count = item
+                    if segment != current_segment:
+                        if recording is not None:
+                            closing, recording = recording, None
+                            self._close_segment(closing, current_segment)
+                        current_segment = segment
+                        full_path = os.path.join(path, f"{filename}_{str(segment + 1).zfill(5)}")
+                        segment_start = start_time + segment * self.segment_samples / self.sample_rate
+                        recording = self._open_recording(full_path, device_info, segment_start)
+                    write_start = time.perf_counter()
+                    recording.write(block[:count])
+                    if self.metrics is not None:
+                        self.metrics.add_time("save_write", time.perf_counter() - write_start)
+                    free_blocks.put(block)
+            finally:
+                if recording is not None:
+                    self._close_segment(recording, current_segment)
+        except Exception as e:
+            self._set_error(e)
+
+    def _open_recording(self, path, device_info, start_time):
+        """
+        创建一个记录文件，按 compression 选择未压缩或分块压缩格式。
+
+        :param path: 记录的基本路径
+        :param device_info: 设备信息字典
+        :param start_time: 第一个样本的时间（Unix 时间戳）
+        :return: RecordingWriter 或 ChunkedRecordingWriter 实例
+        """
+        if self.compression is None:
+            return RecordingWriter(path, self.sample_rate, device_info, start_time, self.channels)
+        return ChunkedRecordingWriter(path, self.sample_rate, device_info, start_time, self.channels,
+                                      codec=self.compression, executor=self.executor)
+
+    def _shutdown_executor(self):
+        """
+        关闭保存任务共用的压缩执行器。
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def _close_segment(self, recording, segment):
+        """
+        关闭一个分段文件并更新进度，该分段的缺口写入元数据。
+
+        :param recording: 要关闭的 RecordingWriter 实例
+        :param segment: 分段序号
+        """
+        for gap_segment, offset, count in self.gaps:
+            if gap_segment == segment:
+                recording.add_gap(offset, count)
+        recording.close()
+        self.saved_files.append(recording.data_path)
+        self.segments_completed += 1
+        if isinstance(recording, ChunkedRecordingWriter) and recording.compression_ratio():
+            print(f"波形已保存至 {recording.data_path}，压缩比 {recording.compression_ratio():.2f}")
+        else:
+            print(f"波形已保存至 {recording.data_path}")
 
     def is_saving(self):
         """
@@ -108,17 +463,28 @@ class WaveformSaver:
 
 # 测试代码
 if __name__ == "__main__":
+    class MockConsumer:
+        def read(self):
+            """模拟从USB读取数据，每次返回100个新的随机数据点，没有丢失样本。"""
+            return np.random.rand(100).astype(np.float32), 0
+
+        def close(self):
+            pass
+
     class MockUSBReader:
-        def get_data(self):
-            """模拟从USB读取数据，返回100个随机数据点。"""
-            return np.random.rand(100).tolist()
+        def add_consumer(self, name, policy="drop"):
+            return MockConsumer()
+
+        def get_device_info(self):
+            return {"product": "Mock USB Reader"}
 
     usb_reader = MockUSBReader()
     saver = WaveformSaver(usb_reader)
 
     # 开始保存波形数据
-    saver.start_saving(".", "waveform.csv", 10)
+    saver.start_saving(".", "waveform", 0.05, segment_count=3, export_to_csv=True)
 
     # 等待5秒后停止保存
     time.sleep(5)
+    print(saver.get_progress())
     saver.stop_saving()
\ No newline at end of file